@@ -35,6 +35,7 @@ class GrayscaleImageClient:
         self.last_stat_time = None
         self.frames_in_last_second = 0
         self.total_bytes = 0
+        self.timestamp = ""  # 文件名中的时间戳，每秒随统计刷新一次，不逐帧调用strftime
 
     def connect(self):
         """连接到ESP32服务器"""
@@ -85,6 +86,7 @@ class GrayscaleImageClient:
         self.last_stat_time = self.start_time
         self.frames_in_last_second = 0
         self.saved_count = 0
+        self.timestamp = time.strftime("%Y%m%d_%H%M%S")
 
         while self.running:
             try:
@@ -132,6 +134,7 @@ class GrayscaleImageClient:
                           f"速率: {data_rate:6.1f} KB/s")
                     self.last_stat_time = current_time
                     self.frames_in_last_second = 0
+                    self.timestamp = time.strftime("%Y%m%d_%H%M%S")
 
                 # 保存PNG图像
                 success = self._save_as_png(self.frame_count, image_data)
@@ -181,8 +184,7 @@ class GrayscaleImageClient:
             gray_array = gray_array.reshape((w, h))
 
             # 生成文件名
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            filename = f"{save_path}/frame_{frame_num:06d}_{timestamp}.png"
+            filename = f"{save_path}/frame_{frame_num:06d}_{self.timestamp}.png"
 
             # 保存为PNG
             cv2.imwrite(filename, gray_array)
@@ -4,6 +4,7 @@ import socket
 import select
 import camera
 from machine import Pin
+import log  # example/log.py，与本脚本一起上传
 
 
 # ===========================
@@ -62,20 +63,20 @@ def create_wifi_ap():
             break
         max_wait -= 1
         time.sleep(1)
-        print('.', end='')
+        log.debug("等待AP启动...")
 
     if not ap.active():
-        print("\nAP启动失败")
+        log.error("\nAP启动失败")
         return None
 
     # 获取IP配置
     ip_info = ap.ifconfig()
-    print('\nWiFi热点已创建:')
-    print(f'SSID: {AP_SSID}')
-    print(f'密码: {AP_PASSWORD}')
-    print(f'IP地址: {ip_info[0]}')
-    print(f'子网掩码: {ip_info[1]}')
-    print(f'网关: {ip_info[2]}')
+    log.info("\nWiFi热点已创建:")
+    log.info("SSID: %s", AP_SSID)
+    log.info("密码: %s", AP_PASSWORD)
+    log.info("IP地址: %s", ip_info[0])
+    log.info("子网掩码: %s", ip_info[1])
+    log.info("网关: %s", ip_info[2])
 
     return ip_info[0]
 
@@ -106,11 +107,11 @@ def init_camera():
         except:
             pass
 
-        print("摄像头初始化成功")
+        log.info("摄像头初始化成功")
         return True
 
     except Exception as e:
-        print(f"摄像头初始化失败: {e}")
+        log.error("摄像头初始化失败: %s", e)
         return False
 
 
@@ -125,6 +126,7 @@ class ImageServer:
         self.client_socket = None
         self.running = False
         self.frame_count = 0
+        self.frame_log = log.Site(log.INFO, 1000)  # 每帧都发送，串口上每秒只打一条
 
     def start(self):
         """启动TCP服务器"""
@@ -132,14 +134,14 @@ class ImageServer:
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind(('', self.port))
         self.server_socket.listen(1)
-        print(f"图像服务器已启动，等待连接...")
-        print(f"IP: {self.ip}:{self.port}")
+        log.info("图像服务器已启动，等待连接...")
+        log.info("IP: %s:%s", self.ip, self.port)
 
         # 等待客户端连接
         while not self.client_socket:
             try:
                 self.client_socket, addr = self.server_socket.accept()
-                print(f"客户端已连接: {addr}")
+                log.info("客户端已连接: %s", addr)
                 self.running = True
             except socket.timeout:
                 # 检查是否需要退出
@@ -163,10 +165,10 @@ class ImageServer:
                         self.client_socket.sendall(header + buf)
                         self.frame_count += 1
 
-                        print(f"{self.frame_count} 已发送 {frame_size} 字节")
+                        self.frame_log("%d 已发送 %d 字节", self.frame_count, frame_size)
 
                     except Exception as e:
-                        print(f"发送失败: {e}")
+                        log.error("发送失败: %s", e)
                         continue
 
                 # 检查客户端是否断开
@@ -176,14 +178,14 @@ class ImageServer:
                     if ready[0]:
                         data = self.client_socket.recv(1, socket.MSG_PEEK)
                         if not data:
-                            print("客户端断开连接")
+                            log.warning("客户端断开连接")
                             break
                 except:
                     pass
 
 
             except Exception as e:
-                print(f"错误: {e}")
+                log.error("错误: %s", e)
 
         self.cleanup()
 
@@ -193,16 +195,16 @@ class ImageServer:
             self.client_socket.close()
         if self.server_socket:
             self.server_socket.close()
-        print(f"服务器已停止，总共发送 {self.frame_count} 帧")
+        log.info("服务器已停止，总共发送 %s 帧", self.frame_count)
 
 
 # ===========================
 # 主程序
 # ===========================
 def main():
-    print("=" * 50)
-    print("ESP32-S3 摄像头服务器 (AP模式)")
-    print("=" * 50)
+    log.info("=" * 50)
+    log.info("ESP32-S3 摄像头服务器 (AP模式)")
+    log.info("=" * 50)
 
     # 1. 创建WiFi热点
     ip = create_wifi_ap()
@@ -215,15 +217,15 @@ def main():
             try:
                 server.start()
             except KeyboardInterrupt:
-                print("\n程序被用户中断")
+                log.info("\n程序被用户中断")
             except Exception as e:
-                print(f"服务器错误: {e}")
+                log.error("服务器错误: %s", e)
             finally:
                 server.cleanup()
         else:
-            print("摄像头初始化失败，服务器未启动")
+            log.error("摄像头初始化失败，服务器未启动")
     else:
-        print("WiFi热点创建失败")
+        log.error("WiFi热点创建失败")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,198 @@
+import _thread
+import binascii
+import json
+import time
+
+import audio_format
+import log
+from jitter_buffer import ticks_ms
+
+# 流式ASR上传：检测到说话就建立连接，录音过程中按chunked编码边录边传
+# 结束说话时只剩最后几个chunk在路上
+
+# 请求体以音频base64为界拆成前后两段
+BODY_PREFIX = b'{"model":"qwen3-asr-flash","input":{"messages":[{"role":"user","content":[{"audio":"data:audio/wav;base64,'
+BODY_SUFFIX = b'"}]}]},"parameters":{"result_format":"message","language":"zh-CN"}}'
+STREAM_DATASIZE = 0xFFFFFFFF - 36  # 流式WAV长度未知，按惯例填最大值
+B64_SLICE = 3 * 512  # 整段上传时每次编码的音频字节数，必须是3的倍数
+
+
+def body_length(audio_len):
+    """请求体长度：base64长度由音频长度直接算出，不必先编码"""
+    return len(BODY_PREFIX) + (audio_len + 2) // 3 * 4 + len(BODY_SUFFIX)
+
+
+def write_request(sock, host, path, api_key, audio, slice_size=B64_SLICE):
+    """整段音频的ASR请求：先算好Content-Length，音频按3字节对齐分片编码后直接写socket
+    峰值内存只有一个分片，编码与发送交替进行"""
+    request = (
+        f"POST {path} HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        f"Authorization: Bearer {api_key}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {body_length(len(audio))}\r\n\r\n"
+    )
+    sock.write(request.encode('utf-8'))
+    sock.write(BODY_PREFIX)
+    audio = memoryview(audio)
+    for start in range(0, len(audio), slice_size):
+        encoded = binascii.b2a_base64(audio[start:start + slice_size])
+        sock.write(memoryview(encoded)[:-1])  # 去掉末尾换行
+    sock.write(BODY_SUFFIX)
+
+
+class Cancelled(Exception):
+    """result超时或下一轮已开始，发送线程停止上传"""
+
+
+class StreamingUpload:
+    def __init__(self, pool, host, path, api_key, bits=16, gain_shift=0, sample_rate=16000, chunk_size=3200):
+        self.pool = pool  # conn_pool.ConnectionPool，与其他API调用共用长连接
+        self.host = host
+        self.path = path
+        self.api_key = api_key
+        self.bits = bits
+        self.gain_shift = gain_shift
+        self.sample_rate = sample_rate
+        self.scratch = bytearray(chunk_size)  # 32位转16位的工作区，避免改动录音缓冲区
+        self.carry = bytearray(3)  # 未凑满3字节的尾巴，下次编码时补齐
+        self.carry_len = 0
+        self.capture = None
+        self.ended = False
+        self.finished = False
+        self.response = None
+        self.error = None  # 发送线程出错时的异常
+        self.session = 0  # 每次start加一；发送线程发现不一致就停下，不再读录音缓冲区
+        self.sent_bytes = 0
+        self.sent_at = 0  # 请求发完的ticks_ms
+        self.done_at = 0  # 收到响应的ticks_ms
+
+    def start(self, capture):
+        """检测到说话时调用：后台线程建立连接并追着录音缓冲区发送"""
+        self.capture = capture
+        self.carry_len = 0
+        self.ended = False
+        self.finished = False
+        self.response = None
+        self.error = None
+        self.sent_bytes = 0
+        self.session += 1
+        _thread.start_new_thread(self._run, (self.session,))
+
+    def end(self):
+        """说话结束时调用：发送线程发完剩余chunk后收尾"""
+        self.ended = True
+
+    def result(self, timeout_ms=30000):
+        """等待识别结果，返回解析后的JSON，超时返回None"""
+        for _ in range(timeout_ms // 10):
+            if self.finished:
+                return self.response
+            time.sleep(0.01)
+        self.session += 1  # 让仍在发送的线程停下，录音缓冲区接下来要给下一轮用
+        log.warning("[ASR] 流式识别等待超时")
+        return None
+
+    # ===================== 发送线程 =====================
+    def _run(self, session):
+        """出错时关闭连接、记下异常，无论如何都置finished，result不必等到超时"""
+        conn = None
+        try:
+            conn = self.pool.request(lambda sock: self._send(sock, session))
+            body = conn.read_body()
+            self.done_at = ticks_ms()
+            self.pool.release(conn, conn.status != 0 and conn.keep_alive())
+            response = json.loads(body) if conn.status else None
+            conn = None
+            if session == self.session:
+                self.response = response
+        except (OSError, ValueError, Cancelled) as e:
+            log.error("[ASR] 流式上传失败: %r", e)
+            if conn:
+                self.pool.release(conn, False)
+            if session == self.session:
+                self.error = e
+        finally:
+            if session == self.session:
+                self.finished = True
+
+    def _send(self, sock, session):
+        """写出整个请求：追着录音缓冲区发送，直到说话结束；连接失效重发时从头开始"""
+        self.write_head(sock)
+        capture = self.capture
+        index = capture.start
+        while True:
+            if session != self.session:
+                raise Cancelled()
+            ended = self.ended  # 先取结束标志，保证结束前写入的chunk都会被发送
+            if index < capture.head:
+                self.write_pcm(sock, capture.views[index])
+                index += 1
+            elif ended:
+                break
+            else:
+                time.sleep(0.01)
+        self.write_tail(sock)
+        self.sent_at = ticks_ms()
+
+    # ===================== 请求编码 =====================
+    # sock只需要write方法，asyncio的StreamWriter也可以直接传入（写完由调用方drain）
+    def write_head(self, sock):
+        """请求头、JSON前缀与流式WAV头"""
+        self.carry_len = 0
+        self.sent_bytes = 0
+        request = (
+            f"POST {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            f"Authorization: Bearer {self.api_key}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        sock.write(request.encode('utf-8'))
+        self._write_chunk(sock, BODY_PREFIX)
+        self._encode(sock, audio_format.wav_header(STREAM_DATASIZE, self.bits, self.sample_rate))
+
+    def write_tail(self, sock):
+        """剩余不足3字节的尾巴、JSON后缀与结束chunk"""
+        if self.carry_len:
+            self._write_b64(sock, self.carry, self.carry_len)
+            self.carry_len = 0
+        self._write_chunk(sock, BODY_SUFFIX)
+        sock.write(b"0\r\n\r\n")
+        log.info("[ASR] 流式上传完成: %s字节音频", self.sent_bytes)
+
+    def write_pcm(self, sock, chunk):
+        """一个32位录音chunk：按需转16位后编码发送"""
+        if self.bits == 16:
+            self.scratch[:] = chunk
+            chunk = audio_format.pcm32_to_pcm16(self.scratch, self.gain_shift)
+        self.sent_bytes += len(chunk)
+        self._encode(sock, chunk)
+
+    def _encode(self, sock, data):
+        """按3字节对齐做base64，余数留到下一段"""
+        data = memoryview(data)
+        start = 0
+        if self.carry_len:
+            start = min(3 - self.carry_len, len(data))
+            self.carry[self.carry_len:self.carry_len + start] = data[:start]
+            self.carry_len += start
+            if self.carry_len < 3:
+                return
+            self._write_b64(sock, self.carry, 3)
+            self.carry_len = 0
+        end = start + (len(data) - start) // 3 * 3
+        if end > start:
+            self._write_b64(sock, data[start:end], end - start)
+        rest = len(data) - end
+        self.carry[:rest] = data[end:]
+        self.carry_len = rest
+
+    def _write_b64(self, sock, data, length):
+        encoded = binascii.b2a_base64(memoryview(data)[:length])
+        self._write_chunk(sock, memoryview(encoded)[:-1])  # 去掉末尾换行
+
+    def _write_chunk(self, sock, data):
+        sock.write(('%x\r\n' % len(data)).encode())
+        sock.write(data)
+        sock.write(b"\r\n")
@@ -0,0 +1,51 @@
+import array
+
+import vad_kernel
+
+# 采样格式转换与WAV头
+# INMP441输出32位样本，有效数据只在高16位，上传前原地压成16位单声道，体积减半
+
+WAV_HEADER_SIZE = 44
+
+
+def wav_header(datasize, bits=16, sample_rate=16000, channels=1):
+    """生成44字节PCM WAV头"""
+    block_align = channels * bits // 8
+    return (b"RIFF" + (datasize + 36).to_bytes(4, 'little') + b"WAVE" +
+            b"fmt " + b"\x10\x00\x00\x00" + b"\x01\x00" + channels.to_bytes(2, 'little') +
+            sample_rate.to_bytes(4, 'little') + (sample_rate * block_align).to_bytes(4, 'little') +
+            block_align.to_bytes(2, 'little') + bits.to_bytes(2, 'little') +
+            b"data" + datasize.to_bytes(4, 'little'))
+
+
+# ===================== 32位转16位 =====================
+def _to_pcm16_array(buf, count, shift):
+    samples = vad_kernel._as_array(buf[:count * 4], 'i')
+    out = array.array('h', (max(-32768, min(32767, s >> shift)) for s in samples))
+    buf[:count * 2] = bytes(out)
+
+
+def _to_pcm16_viper(buf, count, shift):
+    from viper_kernels import pcm32_to_pcm16
+    pcm32_to_pcm16(buf, count, shift)
+
+
+def _to_pcm16_numpy(buf, count, shift):
+    import numpy as np
+    samples = np.frombuffer(buf, dtype='<i4', count=count) >> shift
+    np.frombuffer(buf, dtype='<i2', count=count)[:] = np.clip(samples, -32768, 32767)
+
+
+BACKENDS = {
+    "array": _to_pcm16_array,
+    "viper": _to_pcm16_viper,
+    "numpy": _to_pcm16_numpy,
+}
+_to_pcm16 = BACKENDS[vad_kernel.available_backends()[0]]
+
+
+def pcm32_to_pcm16(buf, gain_shift=0):
+    """原地把32位样本转换为16位，gain_shift为额外左移的增益位数，返回转换后数据的memoryview"""
+    count = len(buf) // 4
+    _to_pcm16(buf, count, 16 - gain_shift)
+    return memoryview(buf)[:count * 2]
@@ -0,0 +1,63 @@
+import argparse
+import binascii
+import os
+import time
+import tracemalloc
+
+import asr_upload
+import audio_format
+
+# PC端对比ASR请求体的两种写法：整体base64后拼接JSON vs 分片编码直接写socket
+# 统计峰值内存（tracemalloc）与耗时；socket用只计字节数的空写入代替
+
+
+class NullSock:
+    def __init__(self):
+        self.sent = 0
+
+    def write(self, data):
+        self.sent += len(data)
+        return len(data)
+
+
+def concat_request(sock, wav):
+    """原asr_api_call写法：完整base64字符串嵌进f-string JSON"""
+    audio_b64 = binascii.b2a_base64(wav)[:-1].decode('utf-8')
+    json_data = f'''{{"model":"qwen3-asr-flash","input":{{"messages":[{{"role":"user","content":[{{"audio":"data:audio/wav;base64,{audio_b64}"}}]}}]}},"parameters":{{"result_format":"message","language":"zh-CN"}}}}'''
+    request = f"POST / HTTP/1.1\r\nHost: x\r\nContent-Length: {len(json_data)}\r\nConnection: close\r\n\r\n"
+    sock.write(request.encode('utf-8'))
+    sock.write(json_data.encode('utf-8'))
+
+
+def sliced_request(sock, wav):
+    asr_upload.write_request(sock, "x", "/", "key", wav)
+
+
+def measure(fn, wav, rounds):
+    sock = NullSock()
+    tracemalloc.start()
+    fn(sock, wav)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(sock, wav)
+    return peak, (time.perf_counter() - start) / rounds, sock.sent // (rounds + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    pcm = os.urandom(int(args.seconds * 16000) * 2)
+    wav = memoryview(audio_format.wav_header(len(pcm)) + pcm)
+    print(f"{args.seconds}秒16位音频, WAV {len(wav)} 字节, 请求体 {asr_upload.body_length(len(wav))} 字节")
+    for name, fn in (("整体拼接", concat_request), ("分片写出", sliced_request)):
+        peak, cost, sent = measure(fn, wav, args.rounds)
+        print(f"{name}: 峰值内存 {peak / 1024:8.1f} KB, 耗时 {cost * 1000:6.2f} ms, 写出 {sent} 字节")
+
+
+if __name__ == "__main__":
+    main()
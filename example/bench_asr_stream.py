@@ -0,0 +1,92 @@
+import argparse
+import json
+import math
+import struct
+import time
+
+import audio_format
+import vad_kernel
+from asr_upload import StreamingUpload, write_request
+from conn_pool import ConnectionPool
+from capture_buffer import CaptureBuffer
+from mock_dashscope import API_PATH_ASR, start_server
+from vad import AdaptiveVAD, VAD_START, VAD_END, VAD_FULL, vad_frames
+
+# PC端对比：说完话后再整体上传 vs 说话过程中流式上传，统计说话结束到拿到识别结果的耗时
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 3200
+PRE_ROLL_CHUNKS = 10
+VOICE_FRAMES = 10
+SILENCE_FRAMES = 10
+NOISE_FLOOR = 300
+
+
+class FakeMic:
+    """按真实节奏产出32位I2S数据：静音 - 正弦语音 - 静音"""
+
+    def __init__(self, lead_s, speech_s):
+        self.index = 0
+        self.speech = range(int(lead_s * 20), int((lead_s + speech_s) * 20))
+        samples = CHUNK_SIZE // 4
+        tone = [int(8000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)) << 16 for i in range(samples)]
+        self.voice = struct.pack(f'<{samples}i', *tone)
+        self.silence = bytes(CHUNK_SIZE)
+
+    def readinto(self, buf):
+        time.sleep(CHUNK_SIZE / 4 / SAMPLE_RATE)
+        buf[:] = self.voice if self.index in self.speech else self.silence
+        self.index += 1
+        return len(buf)
+
+
+def capture(mic, buf, upload=None):
+    """与chatbot.collect_audio相同的端点逻辑，返回说话结束时刻"""
+    vad = AdaptiveVAD(NOISE_FLOOR, VOICE_FRAMES, SILENCE_FRAMES)
+    for chunk, rms, event in vad_frames(mic, buf, vad, vad_kernel.rms_i32):
+        if event == VAD_START and upload:
+            upload.start(buf)
+        elif event == VAD_END or event == VAD_FULL:
+            break
+    if upload:
+        upload.end()
+    return time.time()
+
+
+def batch_asr(pool, wav):
+    """现有asr_api_call流程：录音缓冲区内原地封装的WAV，说完后分片编码、Content-Length上传"""
+    conn = pool.request(lambda sock: write_request(sock, "127.0.0.1", API_PATH_ASR, "mock-key", wav))
+    body = conn.read_body()
+    pool.release(conn, conn.keep_alive())
+    return json.loads(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--speech-seconds", type=float, default=3.0)
+    parser.add_argument("--upload-kbps", type=float, default=48, help="模拟ESP32的TLS上行带宽")
+    parser.add_argument("--asr-delay-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    server, port = start_server(upload_kbps=args.upload_kbps, asr_delay_ms=args.asr_delay_ms)
+    pool = ConnectionPool("127.0.0.1", port, tls=False)
+    max_chunks = int((args.speech_seconds + 2) * 20)
+    buf = CaptureBuffer(CHUNK_SIZE, PRE_ROLL_CHUNKS, max_chunks, audio_format.WAV_HEADER_SIZE)
+    print(f"语音{args.speech_seconds}秒, 上行{args.upload_kbps}KB/s, 识别耗时{args.asr_delay_ms}ms")
+
+    speech_end = capture(FakeMic(0.5, args.speech_seconds), buf)
+    result = batch_asr(pool, buf.wav(16, SAMPLE_RATE))
+    batch_cost = time.time() - speech_end
+    print(f"整体上传: 说话结束到结果 {batch_cost * 1000:7.0f} ms  {result['output']['choices'][0]['message']['content'][0]['text']}")
+
+    upload = StreamingUpload(pool, "127.0.0.1", API_PATH_ASR, "mock-key", chunk_size=CHUNK_SIZE)
+    speech_end = capture(FakeMic(0.5, args.speech_seconds), buf, upload)
+    result = upload.result()
+    stream_cost = time.time() - speech_end
+    print(f"流式上传: 说话结束到结果 {stream_cost * 1000:7.0f} ms  {result['output']['choices'][0]['message']['content'][0]['text']}")
+    print(f"连接池: {pool.stats()}")
+    pool.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import struct
+
+from chatbot_async import VoicePipeline, AsyncPool, FakeSpeaker, SAMPLE_RATE
+from jitter_buffer import ticks_ms, ticks_diff
+from mock_dashscope import add_arguments, config_from_args, start_server
+from tracer import percentile
+from vad_replay import PCMFileSource, synth_recording
+
+# 端到端首音基准：录音按真实节奏回放给chatbot_async的完整流水线
+# （流式ASR上传、流式对话分句、逐句TTS、抖动缓冲播放），云端换成mock_dashscope，各环节耗时可按分布随机
+#   python bench_e2e.py                                  # 合成录音（vad_replay.synth_recording）
+#   python bench_e2e.py rec.wav --turns 5                # 16/32位单声道16kHz录音，读完从头循环
+#   python bench_e2e.py --chat-first-ms 500:200 --tts-first-ms 400:150 --http-chunk-bytes 1400
+# 每轮从说话结束起计时：识别结果、第一句交给TTS、第一个TTS音频事件、首音（抖动缓冲起播），输出p50/p95
+# 回复播放期间不读麦克风（与设备一致），录音在这段时间相当于暂停
+
+STAGES = (
+    ("asr", "识别"),
+    ("first_sentence", "大模型首句"),
+    ("tts_audio", "TTS首个音频"),
+    ("first_audio", "首音"),
+)
+
+
+class ReplayMic:
+    """整段录音读进内存，按真实节奏给出32位样本（16位录音左移成32位），读完从头循环"""
+
+    def __init__(self, source):
+        if source.sample_rate != SAMPLE_RATE:
+            raise ValueError(f"录音须为{SAMPLE_RATE}Hz，文件为{source.sample_rate}Hz")
+        data = source.f.read()
+        if source.bits == 16:
+            samples = struct.unpack(f'<{len(data) // 2}h', data[:len(data) // 2 * 2])
+            data = struct.pack(f'<{len(samples)}i', *[s << 16 for s in samples])
+        self.data = data
+        self.pos = 0
+
+    async def readinto(self, buf):
+        n = len(buf)
+        await asyncio.sleep(n / 4 / SAMPLE_RATE)
+        if self.pos + n > len(self.data):
+            self.pos = 0
+        buf[:] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+class TimedPipeline(VoicePipeline):
+    """在各阶段的入口记录相对说话结束的时刻，每轮一条记录"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.speech_end = 0
+        self.marks = {}
+        self.records = []
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = ticks_diff(ticks_ms(), self.speech_end)
+
+    async def listen(self):
+        speech_end, text = await super().listen()
+        self.speech_end = speech_end
+        self.marks = {}
+        self.mark("asr")
+        return speech_end, text
+
+    async def synthesize(self, text):
+        self.mark("first_sentence")
+        await super().synthesize(text)
+
+    async def put_audio(self, src, start, end):
+        self.mark("tts_audio")
+        await super().put_audio(src, start, end)
+
+    async def respond(self, text, speech_end):
+        await super().respond(text, speech_end)
+        self.marks["first_audio"] = self.ring.jitter.first_audio
+        self.records.append(self.marks)
+
+
+def report(records):
+    print(f"\n{'阶段（从说话结束起）':<20s}{'p50':>8s}{'p95':>8s}{'最大':>8s}   {'阶段增量p50':>10s}")
+    previous = None
+    for key, label in STAGES:
+        values = [record[key] for record in records if key in record]
+        if not values:
+            continue
+        delta = ""
+        if previous:
+            delta = f"{percentile([r[key] - r[previous] for r in records if key in r and previous in r], 50):>8d}ms"
+        print(f"{label:<20s}{percentile(values, 50):>6d}ms{percentile(values, 95):>6d}ms{max(values):>6d}ms   {delta}")
+        previous = key
+
+
+async def run(args, mic, turns):
+    server, port = start_server(**config_from_args(args))
+    pipeline = TimedPipeline(mic, FakeSpeaker(), AsyncPool("127.0.0.1", port, tls=False), "127.0.0.1")
+    await pipeline.run(turns)
+    server.shutdown()
+    print(f"\n[Pool] {pipeline.pool.stats()}")
+    print(f"共{len(pipeline.records)}轮")
+    report(pipeline.records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端首音基准")
+    parser.add_argument("recording", nargs="?", help="16kHz单声道WAV或32位裸PCM，不给时使用合成录音")
+    parser.add_argument("--turns", type=int, default=0, help="对话轮数，合成录音默认为其中的语音段数")
+    parser.add_argument("--synth-seconds", type=int, default=40)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.recording:
+        f = open(args.recording, "rb")
+        turns = args.turns or 5
+    else:
+        f, labels = synth_recording(args.synth_seconds, SAMPLE_RATE, args.seed)
+        turns = args.turns or len(labels)
+    asyncio.run(run(args, ReplayMic(PCMFileSource(f)), turns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import base64
+import random
+import threading
+import time
+
+from i2s_player import IRQPlayer, IRQ_IBUF
+from jitter_buffer import JitterBuffer
+from pcm_ring import PCMRing
+from soft_i2s import SoftI2S
+
+# PC端对比两种TTS播放方式：播放线程阻塞在I2S.write vs I2S回调续数据（不需要播放线程）
+#   python bench_i2s_player.py
+#   python bench_i2s_player.py --seconds 10 --jitter 0.3
+# 接收端按TTS事件的节奏把base64音频写入PCM环形缓冲区，播放端用soft_i2s按24kHz时钟消耗
+# 统计播放端自身的CPU时间（线程方式为播放线程的thread_time，IRQ方式为回调累计耗时；
+# soft_i2s模拟非阻塞DMA用的定时线程不计入）、播放端被唤醒的次数、抖动缓冲的首音/欠载/卡顿，以及soft_i2s的断音与回调延迟
+# 两种方式的I2S内部缓冲区都是IRQ_IBUF：ibuf过大时数据很快被搬进ibuf，PCM环形缓冲区常被"播空"，抖动缓冲的统计失真
+
+RATE = 24000
+BYTES_PER_MS = RATE * 2 // 1000
+EVENT_MS = 100  # 每个TTS事件携带的音频时长
+
+
+def producer(ring, seconds, jitter, seed):
+    """模拟TTS接收：平均略快于实时到达，间隔随机抖动"""
+    rng = random.Random(seed)
+    event = base64.b64encode(bytes(EVENT_MS * BYTES_PER_MS))
+    ring.begin()
+    for _ in range(seconds * 1000 // EVENT_MS):
+        time.sleep(max(0.0, rng.gauss(EVENT_MS * 0.8 / 1000, jitter)))
+        ring.put_b64(event, 0, len(event))
+    ring.end()
+
+
+class TimedIRQPlayer(IRQPlayer):
+    cpu = 0.0
+
+    def _refill(self, i2s):
+        start = time.thread_time()
+        super()._refill(i2s)
+        self.cpu += time.thread_time() - start
+
+
+def run_thread(ring, i2s, done, result):
+    """原audio_player的方式：专用线程阻塞在write上，记录唤醒次数与线程CPU时间"""
+    start = time.thread_time()
+    wakeups = 0
+    while not done.is_set():
+        wakeups += 1
+        chunk = ring.get(4096)
+        if chunk is None:
+            time.sleep(0.05)
+            continue
+        i2s.write(chunk)
+        ring.consume(len(chunk))
+    result["wakeups"] = wakeups
+    result["cpu"] = time.thread_time() - start
+
+
+def run(mode, args):
+    ring = PCMRing(96000, JitterBuffer(200, BYTES_PER_MS, 1000))
+    i2s = SoftI2S(rate=RATE, ibuf=IRQ_IBUF)
+    done = threading.Event()
+    result = {}
+    player = None
+    if mode == "irq":
+        player = TimedIRQPlayer(i2s, ring)
+        player.start()
+    else:
+        thread = threading.Thread(target=run_thread, args=(ring, i2s, done, result))
+        thread.start()
+    start = time.monotonic()
+    producer(ring, args.seconds, args.jitter, args.seed)
+    while ring.used() > 1:
+        time.sleep(0.01)
+    time.sleep(i2s.ibuf / i2s.bytes_per_sec)  # 等内部缓冲区播完
+    wall = time.monotonic() - start
+    done.set()
+    if player:
+        player.stop()
+        result["wakeups"] = player.refills
+        result["cpu"] = player.cpu
+    else:
+        thread.join()
+    i2s.deinit()
+    print(f"[{mode:6s}] 播放端CPU {result['cpu'] * 1000:6.1f} ms / 墙钟 {wall:.1f} s, 唤醒 {result['wakeups']} 次")
+    print(f"         {ring.stats()}")
+    print(f"         {i2s.stats()}" + (f", {player.stats()}" if player else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="I2S播放方式基准")
+    parser.add_argument("--seconds", type=int, default=6, help="合成回复的音频时长")
+    parser.add_argument("--jitter", type=float, default=0.05, help="事件到达间隔的标准差（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for mode in ("thread", "irq"):
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
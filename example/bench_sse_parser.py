@@ -0,0 +1,111 @@
+import argparse
+import base64
+import json
+import os
+import random
+import time
+
+from sse_parser import SSEParser
+
+# PC端对比TTS事件流的两种解析：原来的str缓冲区逐行切片 vs sse_parser字节增量解析
+#   python bench_sse_parser.py                            # 合成的DashScope风格事件流
+#   python bench_sse_parser.py --recording tts_body.sse   # 录制的响应正文（已去掉chunked分帧）
+#   python bench_sse_parser.py --recording ../data/tts_stream_data.json  # TTSService保存的事件
+# 按相同的读取大小分段输入，分别统计只切出事件、以及再做json.loads的耗时
+# CPython会原地扩展str且memcpy极快，耗时体现不出设备上的差距；另外统计复制的字节数，
+# MicroPython上每次str拼接和切片都会在堆上分配并复制，这个量直接决定耗时与GC压力
+
+
+def synth_stream(events=60, seconds_per_event=0.2, seed=0):
+    """合成DashScope TTS风格的SSE正文：每个事件携带一段base64音频"""
+    rng = random.Random(seed)
+    out = bytearray()
+    for i in range(events):
+        pcm = rng.randbytes(int(24000 * 2 * seconds_per_event))
+        chunk = {"output": {"finish_reason": "null", "audio": {"data": base64.b64encode(pcm).decode(), "id": f"audio_{i}"}},
+                 "usage": {"characters": 40}, "request_id": "合成事件流"}
+        out += f"id:{i + 1}\nevent:result\n:HTTP_STATUS/200\ndata:{json.dumps(chunk, ensure_ascii=False)}\n\n".encode()
+    last = {"output": {"finish_reason": "stop", "audio": {"data": "", "id": "audio_end"}}, "request_id": "合成事件流"}
+    out += f"id:{events + 1}\nevent:result\ndata:{json.dumps(last, ensure_ascii=False)}\n\n".encode()
+    return bytes(out)
+
+
+def load_recording(path):
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        return "".join(r["line"] + "\n\n" for r in records.values()).encode()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def legacy_parse(body, read_size, decode=json.loads):
+    """原stream_tts_response的解析方式，返回(事件, 复制字节数)"""
+    events = []
+    copied = 0
+    sse_buffer = ""
+    for i in range(0, len(body), read_size):
+        text = body[i:i + read_size].decode('utf-8', 'ignore')
+        sse_buffer += text
+        copied += len(text) + len(sse_buffer)
+        while '\n' in sse_buffer:
+            line_end = sse_buffer.find('\n')
+            line = sse_buffer[:line_end]
+            sse_buffer = sse_buffer[line_end + 1:]
+            copied += len(line) * 3 + len(sse_buffer)  # 取行、strip、去掉"data:"，以及剩余部分重新切片
+            line = line.strip()
+            if not line.startswith('data:') or line[5:] == '[DONE]':
+                continue
+            events.append(decode(line[5:]))  # 被读取边界切断的多字节字符已被'ignore'丢掉
+    return events, copied
+
+
+def parser_parse(body, read_size, parser, decode=json.loads):
+    """返回(事件, 复制字节数)：写入解析缓冲区、缓冲区内搬移、取出payload"""
+    events = []
+    parser.reset()
+    moved = parser.moved
+    copied = len(body)
+    view = memoryview(body)
+    for i in range(0, len(body), read_size):
+        for payload in parser.feed(view[i:i + read_size]):
+            copied += len(payload)
+            events.append(decode(bytes(payload)))
+    return events, copied + parser.moved - moved
+
+
+def measure(fn, rounds):
+    result = fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return result, (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SSE解析基准")
+    parser.add_argument("--recording", help="录制的SSE正文或TTSService保存的json")
+    parser.add_argument("--read-size", type=int, default=1024, help="每次读取的字节数（原代码为1024）")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    body = load_recording(args.recording) if args.recording else synth_stream()
+    name = os.path.basename(args.recording) if args.recording else "合成事件流"
+    print(f"{name}: {len(body) / 1024:.1f} KB, 每次读取 {args.read_size} 字节")
+
+    sse = SSEParser()
+    for mode, decode in (("仅切分事件", lambda payload: payload), ("切分+json", json.loads)):
+        (legacy, legacy_copied), legacy_cost = measure(lambda: legacy_parse(body, args.read_size, decode), args.rounds)
+        (fast, fast_copied), fast_cost = measure(lambda: parser_parse(body, args.read_size, sse, decode), args.rounds)
+        print(f"[{mode}]")
+        for label, events, cost, copied in (("str逐行切片", legacy, legacy_cost, legacy_copied),
+                                            ("字节增量解析", fast, fast_cost, fast_copied)):
+            print(f"  {label}: {len(events)} 个事件, {cost * 1000:7.2f} ms, {len(body) / cost / 1e6:7.1f} MB/s, "
+                  f"复制 {copied / 1024:8.0f} KB")
+        print(f"  耗时比 {legacy_cost / fast_cost:.1f}x, 复制量比 {legacy_copied / fast_copied:.1f}x")
+    broken = sum(1 for old, new in zip(legacy, fast) if old != new)
+    print(f"结果不一致的事件 {broken} 个, 解析缓冲区 {len(sse.buf)} 字节 (扩容 {sse.grows} 次)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import binascii
+import json
+import os
+
+import tts_event
+from bench_sse_parser import synth_stream, load_recording, measure
+from sse_parser import SSEParser
+
+# PC端对比TTS事件的两种处理：json.loads整条事件后取output.audio.data解码 vs tts_event直接在缓冲区上定位base64
+#   python bench_tts_event.py                            # 合成的DashScope风格事件流
+#   python bench_tts_event.py --recording ../data/tts_stream_data.json
+# 两条路径都从sse_parser切出的事件开始，最后都解码出PCM，校验两者完全一致
+# 另外统计json路径为每个事件创建的str字节数，MicroPython上这部分都要在堆上分配
+
+
+def json_path(body, read_size, parser):
+    """原handle_chunk_data的处理方式，返回(PCM, 结束事件数, 分配字节数)"""
+    pcm = bytearray()
+    finished = 0
+    allocated = 0
+    parser.reset()
+    view = memoryview(body)
+    for i in range(0, len(body), read_size):
+        for payload in parser.feed(view[i:i + read_size]):
+            chunk = json.loads(bytes(payload))
+            allocated += len(payload) * 2  # bytes副本 + 解码出的str
+            if "output" not in chunk:
+                continue
+            if chunk["output"].get("finish_reason") == "stop":
+                finished += 1
+                continue
+            audio_info = chunk["output"].get("audio", {})
+            if "data" in audio_info:
+                pcm += binascii.a2b_base64(audio_info["data"])
+    return bytes(pcm), finished, allocated
+
+
+def fast_path(body, read_size, parser):
+    """tts_event快速路径，形状不符时回退json，返回(PCM, 结束事件数, 回退次数)"""
+    pcm = bytearray()
+    finished = 0
+    fallback = 0
+    parser.reset()
+    view = memoryview(body)
+    for i in range(0, len(body), read_size):
+        for payload in parser.feed(view[i:i + read_size]):
+            event = tts_event.parse_event(parser.buf, parser.payload_start, parser.payload_end)
+            if event is None:
+                fallback += 1
+                chunk = json.loads(bytes(payload))
+                if chunk.get("output", {}).get("finish_reason") == "stop":
+                    finished += 1
+                elif "data" in chunk.get("output", {}).get("audio", {}):
+                    pcm += binascii.a2b_base64(chunk["output"]["audio"]["data"])
+                continue
+            data_start, data_end, stop = event
+            if stop:
+                finished += 1
+            elif data_end > data_start:
+                pcm += binascii.a2b_base64(parser.mv[data_start:data_end])
+    return bytes(pcm), finished, fallback
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS事件提取基准")
+    parser.add_argument("--recording", help="录制的SSE正文或TTSService保存的json")
+    parser.add_argument("--events", type=int, default=60, help="合成事件流的事件数")
+    parser.add_argument("--read-size", type=int, default=1024)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    body = load_recording(args.recording) if args.recording else synth_stream(args.events)
+    name = os.path.basename(args.recording) if args.recording else "合成事件流"
+    print(f"{name}: {len(body) / 1024:.1f} KB, 每次读取 {args.read_size} 字节")
+
+    sse = SSEParser()
+    (json_pcm, json_finished, allocated), json_cost = measure(lambda: json_path(body, args.read_size, sse), args.rounds)
+    events = sse.events
+    (fast_pcm, fast_finished, fallback), fast_cost = measure(lambda: fast_path(body, args.read_size, sse), args.rounds)
+    events = (sse.events - events) // (args.rounds + 1)
+    for label, cost in (("json.loads", json_cost), ("tts_event", fast_cost)):
+        print(f"  {label:10s}: {cost * 1000:7.2f} ms, {events / cost:8.0f} 事件/s, {len(body) / cost / 1e6:7.1f} MB/s")
+    print(f"  耗时比 {json_cost / fast_cost:.1f}x, json路径每轮分配 {allocated / 1024:.0f} KB, 快速路径回退 {fallback} 次")
+    print(f"PCM {len(fast_pcm)} 字节, 一致: {json_pcm == fast_pcm and json_finished == fast_finished}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import random
+import struct
+import sys
+import time
+
+import vad_kernel
+
+# 基准：对比原struct.unpack逐样本实现与vad_kernel各后端的单chunk耗时，计时前先校验各后端结果与原实现一致
+#   PC上：python bench_vad_kernel.py，另外用viper内核的32位整数模型校验分块、拆分累加的算术
+#   设备上：mpremote run bench_vad_kernel.py，直接校验viper后端
+CHUNK_SIZE = 3200  # 50ms的32位I2S数据
+SAMPLE_RATE = 16000
+ROUNDS = 200
+MODEL_BLOCK = 256  # 与viper_kernels.SUM_SQ_BLOCK一致
+
+if sys.implementation.name == "micropython":
+    def perf_counter():
+        return time.ticks_us() / 1e6
+else:
+    perf_counter = time.perf_counter
+
+
+def legacy_rms(chunk):
+    """chatbot.py原实现，作为基准"""
+    sample_count = len(chunk) // 4
+    sum_squares = 0
+    for i in range(sample_count):
+        sample_32 = struct.unpack('<i', chunk[i * 4:(i + 1) * 4])[0]
+        sample_16 = sample_32 >> 16
+        sum_squares += sample_16 * sample_16
+    return (sum_squares / sample_count) ** 0.5
+
+
+def legacy_energy(chunk):
+    """16位PCM的均方能量，逐样本unpack"""
+    sample_count = len(chunk) // 2
+    sum_squares = 0
+    for i in range(sample_count):
+        sample = struct.unpack('<h', chunk[i * 2:(i + 1) * 2])[0]
+        sum_squares += sample * sample
+    return sum_squares / sample_count
+
+
+def make_chunks(count, size):
+    """随机幅度的32位样本，右移到24位时只剩最低几位，覆盖安静环境下的底噪"""
+    random.seed(0)
+    chunks = []
+    for _ in range(count):
+        shift = random.randint(0, 24)
+        samples = [(random.getrandbits(32) - 2 ** 31) >> shift for _ in range(size // 4)]
+        chunks.append(bytearray(struct.pack('<%di' % len(samples), *samples)))
+    return chunks
+
+
+def model_sum_sq(kernel_samples, chunk, count):
+    """viper后端在CPython上的模型：按MODEL_BLOCK分块、平方和拆成高低两部分累加，
+    每步都检查累加器仍在32位有符号整数范围内"""
+    acc = 0
+    low = 0
+    for start in range(0, count, MODEL_BLOCK):
+        block_acc = block_low = 0
+        for s in kernel_samples(chunk, start, min(MODEL_BLOCK, count - start)):
+            sq = s * s
+            block_acc += sq >> 8
+            block_low += sq & 0xFF
+            assert block_acc < 2 ** 31 and block_low < 2 ** 31, "viper累加器溢出"
+        acc += block_acc
+        low += block_low
+    return (acc << 8) + low
+
+
+def hi16_samples(chunk, start, n):
+    return [v >> 16 for v in struct.unpack_from('<%di' % n, chunk, start * 4)]
+
+
+def i16_samples(chunk, start, n):
+    return struct.unpack_from('<%dh' % n, chunk, start * 2)
+
+
+def check_model(chunks):
+    for chunk in chunks:
+        count = len(chunk) // 4
+        assert (model_sum_sq(hi16_samples, chunk, count) / count) ** 0.5 == legacy_rms(chunk), "viper模型rms_i32不一致"
+        pcm16 = chunk[:len(chunk) // 2]
+        count = len(pcm16) // 2
+        assert model_sum_sq(i16_samples, pcm16, count) / count == legacy_energy(pcm16), "viper模型energy_i16不一致"
+
+
+def check_backend(name, chunks):
+    """当前后端的两个内核与逐样本原实现逐chunk比较"""
+    for chunk in chunks:
+        expected = legacy_rms(chunk)
+        assert abs(vad_kernel.rms_i32(chunk) - expected) <= 1e-6 * expected, f"{name}: rms_i32不一致"
+        pcm16 = chunk[:len(chunk) // 2]
+        expected = legacy_energy(pcm16)
+        assert abs(vad_kernel.energy_i16(pcm16) - expected) <= 1e-6 * expected, f"{name}: energy_i16不一致"
+
+
+def per_chunk_us(func, chunks):
+    start = perf_counter()
+    for _ in range(ROUNDS // len(chunks)):
+        for chunk in chunks:
+            func(chunk)
+    elapsed = perf_counter() - start
+    return elapsed / (ROUNDS // len(chunks) * len(chunks)) * 1e6
+
+
+def main():
+    chunks = make_chunks(20, CHUNK_SIZE)
+    chunk_ms = CHUNK_SIZE / 4 / SAMPLE_RATE * 1000
+    boot_chunks = int(SAMPLE_RATE * 2 / (CHUNK_SIZE / 4)) * 2  # calculate_noise_floor的2秒采集
+
+    print(f"chunk: {CHUNK_SIZE}字节 ({chunk_ms:.0f}ms音频), 轮数: {ROUNDS}")
+    base = per_chunk_us(legacy_rms, chunks)
+    print(f"{'struct(原实现)':<16} {base:10.1f} us/chunk  底噪标定: {base * boot_chunks / 1000:8.2f} ms")
+
+    if sys.implementation.name != "micropython":
+        check_model(chunks)
+        print("viper模型: 与原实现一致")
+    for name in vad_kernel.available_backends():
+        vad_kernel.use_backend(name)
+        check_backend(name, chunks)
+        cost = per_chunk_us(vad_kernel.rms_i32, chunks)
+        print(f"{name:<16} {cost:10.1f} us/chunk  底噪标定: {cost * boot_chunks / 1000:8.2f} ms  加速: {base / cost:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
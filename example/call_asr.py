@@ -1,21 +1,34 @@
 import time
 import ujson as json
 import urequests as requests
-import ubinascii
 from machine import I2S, Pin
 import network
 import socket
 import gc
+import asr_upload
+import audio_format
+import conn_pool
+import dns_cache
+import log
+from tracer import Tracer
 
 # --- 配置 ---
 WIFI_SSID = "CMCC-huahua"
 WIFI_PASSWORD = "*HUAHUAshi1zhimao"
 API_KEY = 'sk-943f95da67d04893b70c02be400e2935'
-MODEL_NAME = "qwen3-asr-flash"
-API_URL = "https://dashscope.aliyuncs.com/api/v1/services/aigc/multimodal-generation/generation"
+API_HOST = "dashscope.aliyuncs.com"
+API_PATH = "/api/v1/services/aigc/multimodal-generation/generation"
+api_pool = conn_pool.ConnectionPool(API_HOST)  # 跨轮次复用TLS连接
 
 SAMPLE_RATE = 16000
 COLLECT_SECONDS = 2  # 采集5秒
+COMPARE_FORMATS = False  # 对比实验：每轮分别用32位和16位上传，对比负载大小与API耗时（每轮多调用一次API）
+PCM_GAIN_SHIFT = 0  # 32位转16位时的额外增益（左移位数）
+TRACE_FILE = None  # 每次API调用的阶段记录以JSON行追加到这个文件（如"/asr_trace.jsonl"）
+
+# API调用的阶段节点，记录相对调用开始的毫秒数
+BUILD, DNS, CONNECT, SENT, RESPONSE, PARSED = range(6)
+api_trace = Tracer(("build", "dns", "connect", "sent", "response", "parsed"), turns=8)
 
 # 引脚
 mic = I2S(0, sck=Pin(12), ws=Pin(13), sd=Pin(14),
@@ -26,7 +39,7 @@ mic = I2S(0, sck=Pin(12), ws=Pin(13), sd=Pin(14),
 # --- 网络延迟检测函数 ---
 def measure_network_latency():
     """全面测量网络延迟"""
-    print(f"\n[{time.time():.3f}] === 开始网络延迟检测 ===")
+    log.info("\n[%.3f] === 开始网络延迟检测 ===", time.time())
 
     test_servers = [
         ("DNS服务器", "8.8.8.8", 53),  # Google DNS
@@ -38,7 +51,7 @@ def measure_network_latency():
     gc.collect()  # 垃圾回收，确保内存干净
 
     for server_name, host, port in test_servers:
-        print(f"\n[{time.time():.3f}] 测试 {server_name} ({host}:{port})...")
+        log.info("\n[%.3f] 测试 %s (%s:%s)...", time.time(), server_name, host, port)
 
         try:
             # 1. DNS解析延迟（如果是域名）
@@ -48,10 +61,10 @@ def measure_network_latency():
                     addr_info = socket.getaddrinfo(host, port)
                     dns_end = time.time()
                     ip_address = addr_info[0][4][0]
-                    print(f"[{time.time():.3f}]   DNS解析: {dns_end - dns_start:.3f}秒 -> {ip_address}")
+                    log.info("[%.3f]   DNS解析: %.3f秒 -> %s", time.time(), dns_end - dns_start, ip_address)
                     host = ip_address  # 使用解析后的IP进行ping测试
                 except Exception as e:
-                    print(f"[{time.time():.3f}]   ❌ DNS解析失败: {e}")
+                    log.error("[%.3f]   ❌ DNS解析失败: %s", time.time(), e)
                     continue
 
             # 2. TCP连接延迟（类似ping）
@@ -70,11 +83,11 @@ def measure_network_latency():
 
                     sock.close()
 
-                    print(f"[{time.time():.3f}]   Ping {i + 1}: {latency:.1f}ms")
+                    log.info("[%.3f]   Ping %s: %.1fms", time.time(), i + 1, latency)
                     time.sleep(0.5)  # 间隔0.5秒
 
                 except Exception as e:
-                    print(f"[{time.time():.3f}]   Ping {i + 1}失败: {e}")
+                    log.error("[%.3f]   Ping %s失败: %s", time.time(), i + 1, e)
                     break
                 finally:
                     if 'sock' in locals():
@@ -90,11 +103,11 @@ def measure_network_latency():
                 max_latency = max(ping_results)
                 jitter = max_latency - min_latency  # 抖动
 
-                print(f"[{time.time():.3f}]   📊 统计:")
-                print(f"[{time.time():.3f}]     平均延迟: {avg_latency:.1f}ms")
-                print(f"[{time.time():.3f}]     最小延迟: {min_latency:.1f}ms")
-                print(f"[{time.time():.3f}]     最大延迟: {max_latency:.1f}ms")
-                print(f"[{time.time():.3f}]     抖动: {jitter:.1f}ms")
+                log.info("[%.3f]   📊 统计:", time.time())
+                log.info("[%.3f]     平均延迟: %.1fms", time.time(), avg_latency)
+                log.info("[%.3f]     最小延迟: %.1fms", time.time(), min_latency)
+                log.info("[%.3f]     最大延迟: %.1fms", time.time(), max_latency)
+                log.info("[%.3f]     抖动: %.1fms", time.time(), jitter)
 
                 # 延迟评级
                 if avg_latency < 50:
@@ -108,11 +121,11 @@ def measure_network_latency():
                 else:
                     rating = "很差 ❌"
 
-                print(f"[{time.time():.3f}]     评级: {rating}")
+                log.info("[%.3f]     评级: %s", time.time(), rating)
 
             # 4. 针对API服务器的额外测试
             if server_name == "阿里云API":
-                print(f"\n[{time.time():.3f}]   执行API服务器额外测试...")
+                log.info("\n[%.3f]   执行API服务器额外测试...", time.time())
 
                 # 测试HTTPS连接建立时间
                 try:
@@ -137,33 +150,33 @@ def measure_network_latency():
 
                     ssl_end = time.time()
 
-                    print(f"[{time.time():.3f}]     TCP握手: {(tcp_end - tcp_start) * 1000:.1f}ms")
-                    print(f"[{time.time():.3f}]     SSL/TLS握手: {(ssl_end - ssl_start) * 1000:.1f}ms")
-                    print(f"[{time.time():.3f}]     总连接建立: {(ssl_end - tcp_start) * 1000:.1f}ms")
+                    log.info("[%.3f]     TCP握手: %.1fms", time.time(), (tcp_end - tcp_start) * 1000)
+                    log.info("[%.3f]     SSL/TLS握手: %.1fms", time.time(), (ssl_end - ssl_start) * 1000)
+                    log.info("[%.3f]     总连接建立: %.1fms", time.time(), (ssl_end - tcp_start) * 1000)
 
                     if b"HTTP" in response or b"TLS" in response or b"SSL" in response:
-                        print(f"[{time.time():.3f}]     服务器响应: 正常")
+                        log.info("[%.3f]     服务器响应: 正常", time.time())
                     else:
-                        print(f"[{time.time():.3f}]     服务器响应: 异常或无响应")
+                        log.info("[%.3f]     服务器响应: 异常或无响应", time.time())
 
                     sock.close()
 
                 except Exception as e:
-                    print(f"[{time.time():.3f}]     API服务器测试失败: {e}")
+                    log.error("[%.3f]     API服务器测试失败: %s", time.time(), e)
 
         except Exception as e:
-            print(f"[{time.time():.3f}]   ❌ {server_name}测试失败: {e}")
+            log.error("[%.3f]   ❌ %s测试失败: %s", time.time(), server_name, e)
 
         time.sleep(1)  # 测试间隔
 
-    print(f"\n[{time.time():.3f}] === 网络延迟检测完成 ===")
+    log.info("\n[%.3f] === 网络延迟检测完成 ===", time.time())
     gc.collect()
 
 
 # --- 网络速度测试函数 ---
 def measure_network_speed():
     """简单网络速度测试"""
-    print(f"\n[{time.time():.3f}] === 开始网络速度测试 ===")
+    log.info("\n[%.3f] === 开始网络速度测试 ===", time.time())
 
     test_urls = [
         ("小型测试", "http://httpbin.org/bytes/1024"),  # 1KB
@@ -171,7 +184,7 @@ def measure_network_speed():
     ]
 
     for test_name, url in test_urls:
-        print(f"\n[{time.time():.3f}] {test_name} ({url})...")
+        log.info("\n[%.3f] %s (%s)...", time.time(), test_name, url)
 
         try:
             # 先解析域名
@@ -190,11 +203,11 @@ def measure_network_speed():
                 speed_kbps = (data_size * 8) / total_time / 1024  # Kbps
                 speed_mbps = speed_kbps / 1024  # Mbps
 
-                print(f"[{time.time():.3f}]   ✅ 下载成功")
-                print(f"[{time.time():.3f}]   数据大小: {data_size} 字节")
-                print(f"[{time.time():.3f}]   DNS时间: {dns_time:.3f}秒")
-                print(f"[{time.time():.3f}]   下载时间: {total_time:.3f}秒")
-                print(f"[{time.time():.3f}]   下载速度: {speed_kbps:.2f} Kbps ({speed_mbps:.2f} Mbps)")
+                log.info("[%.3f]   ✅ 下载成功", time.time())
+                log.info("[%.3f]   数据大小: %s 字节", time.time(), data_size)
+                log.info("[%.3f]   DNS时间: %.3f秒", time.time(), dns_time)
+                log.info("[%.3f]   下载时间: %.3f秒", time.time(), total_time)
+                log.info("[%.3f]   下载速度: %.2f Kbps (%.2f Mbps)", time.time(), speed_kbps, speed_mbps)
 
                 # 速度评级
                 if speed_mbps > 10:
@@ -208,46 +221,46 @@ def measure_network_speed():
                 else:
                     rating = "很慢 ❌"
 
-                print(f"[{time.time():.3f}]   评级: {rating}")
+                log.info("[%.3f]   评级: %s", time.time(), rating)
 
             else:
-                print(f"[{time.time():.3f}]   ❌ 下载失败: {response.status_code}")
+                log.error("[%.3f]   ❌ 下载失败: %s", time.time(), response.status_code)
 
         except Exception as e:
-            print(f"[{time.time():.3f}]   ❌ {test_name}测试失败: {e}")
+            log.error("[%.3f]   ❌ %s测试失败: %s", time.time(), test_name, e)
 
         time.sleep(2)
 
-    print(f"\n[{time.time():.3f}] === 网络速度测试完成 ===")
+    log.info("\n[%.3f] === 网络速度测试完成 ===", time.time())
 
 
 # --- 网络状态检查函数 ---
 def check_network_status():
     """检查网络状态，包括AP模式和WiFi连接"""
     start_time = time.time()
-    print(f"\n[{start_time:.3f}] === 网络状态检查 ===")
+    log.info("\n[%.3f] === 网络状态检查 ===", start_time)
 
     # 检查AP模式
     ap = network.WLAN(network.AP_IF)
     ap_active = ap.active()
-    print(f"[{time.time():.3f}] AP模式状态: {'开启' if ap_active else '关闭'}")
+    log.info("[%.3f] AP模式状态: %s", time.time(), '开启' if ap_active else '关闭')
     if ap_active:
-        print(f"[{time.time():.3f}] ⚠️ 警告: AP模式已开启，建议关闭以节省资源")
+        log.warning("[%.3f] ⚠️ 警告: AP模式已开启，建议关闭以节省资源", time.time())
         ap.active(False)
-        print(f"[{time.time():.3f}] 已关闭AP模式")
+        log.info("[%.3f] 已关闭AP模式", time.time())
 
     # 检查STA模式
     sta = network.WLAN(network.STA_IF)
     sta_active = sta.active()
-    print(f"[{time.time():.3f}] STA模式状态: {'开启' if sta_active else '关闭'}")
+    log.info("[%.3f] STA模式状态: %s", time.time(), '开启' if sta_active else '关闭')
 
     if sta.isconnected():
-        print(f"[{time.time():.3f}] WiFi连接状态: 已连接")
+        log.info("[%.3f] WiFi连接状态: 已连接", time.time())
         config = sta.ifconfig()
-        print(f"[{time.time():.3f}] IP地址: {config[0]}")
-        print(f"[{time.time():.3f}] 子网掩码: {config[1]}")
-        print(f"[{time.time():.3f}] 网关: {config[2]}")
-        print(f"[{time.time():.3f}] DNS: {config[3]}")
+        log.info("[%.3f] IP地址: %s", time.time(), config[0])
+        log.info("[%.3f] 子网掩码: %s", time.time(), config[1])
+        log.info("[%.3f] 网关: %s", time.time(), config[2])
+        log.info("[%.3f] DNS: %s", time.time(), config[3])
 
         # 信号强度
         try:
@@ -256,7 +269,7 @@ def check_network_status():
                 # 尝试获取RSSI
                 try:
                     rssi = sta.status('rssi')
-                    print(f"[{time.time():.3f}] 信号强度: {rssi} dBm")
+                    log.info("[%.3f] 信号强度: %s dBm", time.time(), rssi)
 
                     # 信号质量评级
                     if rssi >= -50:
@@ -270,19 +283,19 @@ def check_network_status():
                     else:
                         quality = "很差 ❌"
 
-                    print(f"[{time.time():.3f}] 信号质量: {quality}")
+                    log.info("[%.3f] 信号质量: %s", time.time(), quality)
                 except:
                     # 如果status方法不支持参数
                     status_info = sta.status()
-                    print(f"[{time.time():.3f}] 连接状态: {status_info}")
+                    log.info("[%.3f] 连接状态: %s", time.time(), status_info)
         except Exception as e:
-            print(f"[{time.time():.3f}] 信号强度: 无法获取 ({e})")
+            log.info("[%.3f] 信号强度: 无法获取 (%s)", time.time(), e)
     else:
-        print(f"[{time.time():.3f}] WiFi连接状态: 未连接")
+        log.info("[%.3f] WiFi连接状态: 未连接", time.time())
 
     end_time = time.time()
-    print(f"[{end_time:.3f}] 网络检查总耗时: {end_time - start_time:.3f}秒")
-    print(f"[{end_time:.3f}] === 网络检查结束 ===\n")
+    log.info("[%.3f] 网络检查总耗时: %.3f秒", end_time, end_time - start_time)
+    log.info("[%.3f] === 网络检查结束 ===\n", end_time)
 
     return sta.isconnected()
 
@@ -290,7 +303,7 @@ def check_network_status():
 # --- 核心函数 ---
 def connect_wifi():
     start_time = time.time()
-    print(f"[{start_time:.3f}] 开始连接Wi-Fi...")
+    log.info("[%.3f] 开始连接Wi-Fi...", start_time)
 
     wlan = network.WLAN(network.STA_IF)
     wlan.active(True)
@@ -298,21 +311,21 @@ def connect_wifi():
     # 先检查是否已连接
     if wlan.isconnected():
         end_time = time.time()
-        print(f"[{end_time:.3f}] ✅ 已连接Wi-Fi，IP: {wlan.ifconfig()[0]}")
+        log.info("[%.3f] ✅ 已连接Wi-Fi，IP: %s", end_time, wlan.ifconfig()[0])
         return True
 
     # 连接Wi-Fi
     connect_start = time.time()
     wlan.connect(WIFI_SSID, WIFI_PASSWORD)
-    print(f"[{time.time():.3f}]   正在连接到 {WIFI_SSID}...")
+    log.info("[%.3f]   正在连接到 %s...", time.time(), WIFI_SSID)
 
     for i in range(30):  # 增加到30次尝试
         if wlan.isconnected():
             connect_end = time.time()
             end_time = time.time()
-            print(f"[{end_time:.3f}] ✅ Wi-Fi连接成功")
-            print(f"[{end_time:.3f}]   连接耗时: {connect_end - connect_start:.2f}秒")
-            print(f"[{end_time:.3f}]   IP地址: {wlan.ifconfig()[0]}")
+            log.info("[%.3f] ✅ Wi-Fi连接成功", end_time)
+            log.info("[%.3f]   连接耗时: %.2f秒", end_time, connect_end - connect_start)
+            log.info("[%.3f]   IP地址: %s", end_time, wlan.ifconfig()[0])
 
             return True
 
@@ -327,19 +340,19 @@ def connect_wifi():
                 201: "未找到AP",
             }
             status_text = status_map.get(status, f"未知({status})")
-            print(f"[{time.time():.3f}]   连接状态: {status_text} (尝试 {i + 1}/30)")
+            log.info("[%.3f]   连接状态: %s (尝试 %s/30)", time.time(), status_text, i + 1)
 
         time.sleep(0.5)
 
     end_time = time.time()
-    print(f"[{end_time:.3f}] ❌ Wi-Fi连接失败，总耗时: {end_time - start_time:.2f}秒")
+    log.error("[%.3f] ❌ Wi-Fi连接失败，总耗时: %.2f秒", end_time, end_time - start_time)
     return False
 
 
 def collect_5s_audio():
     """采集5秒音频（441模块格式）"""
     start_time = time.time()
-    print(f"[{start_time:.3f}] 🎤 开始采集{COLLECT_SECONDS}秒音频...")
+    log.info("[%.3f] 🎤 开始采集%s秒音频...", start_time, COLLECT_SECONDS)
 
     # 计算需要的数据量：5秒 × 16000样本/秒 × 4字节/样本
     total_bytes = COLLECT_SECONDS * SAMPLE_RATE * 4
@@ -357,184 +370,140 @@ def collect_5s_audio():
         progress = len(collected) / total_bytes * 100
         if time.time() - progress_start >= 1:
             current_time = time.time()
-            print(f"[{current_time:.3f}]   进度: {progress:.0f}%")
+            log.info("[%.3f]   进度: %.0f%%", current_time, progress)
             progress_start = time.time()
 
     end_time = time.time()
-    print(f"[{end_time:.3f}] ✅ 采集完成: {len(collected)} 字节，耗时: {end_time - start_time:.2f}秒")
+    log.info("[%.3f] ✅ 采集完成: %s 字节，耗时: %.2f秒", end_time, len(collected), end_time - start_time)
     return collected
 
 
-def create_wav_441(audio_data):
-    """为441模块音频创建WAV"""
+def create_wav_441(audio_data, bits=32):
+    """为441模块音频创建WAV，bits为16时audio_data需已转换为16位"""
     start_time = time.time()
-    print(f"[{start_time:.3f}] 🎵 开始创建WAV文件...")
-
-    # WAV头 (32位, 16000Hz, 单声道)
-    datasize = len(audio_data)
-    header = (
-            b"RIFF" + (datasize + 36).to_bytes(4, 'little') + b"WAVE" +
-            b"fmt " + b"\x10\x00\x00\x00" + b"\x01\x00" +  # PCM格式
-            b"\x01\x00" +  # 单声道
-            b"\x80\x3e\x00\x00" +  # 16000Hz
-            b"\x00\xFA\x00\x00" +  # 字节率 = 16000*4 = 64000
-            b"\x04\x00" +  # 块对齐 = 4字节
-            b"\x20\x00" +  # 32位
-            b"data" + datasize.to_bytes(4, 'little')
-    )
+    log.info("[%.3f] 🎵 开始创建WAV文件（%s位）...", start_time, bits)
+
+    # WAV头 (16000Hz, 单声道)
+    header = audio_format.wav_header(len(audio_data), bits, SAMPLE_RATE)
 
     wav = bytearray()
     wav.extend(header)
     wav.extend(audio_data)
 
     end_time = time.time()
-    print(f"[{end_time:.3f}] ✅ WAV文件创建完成，大小: {len(wav)} 字节，耗时: {end_time - start_time:.2f}秒")
+    log.info("[%.3f] ✅ WAV文件创建完成，大小: %s 字节，耗时: %.2f秒", end_time, len(wav), end_time - start_time)
     return wav
 
 
 def call_api_with_detailed_timing(wav_data):
-    """调用API，包含详细的耗时分析"""
-    total_start = time.time()
-    print(f"\n[{total_start:.3f}] ========== 开始API调用 ==========")
-
-    # 1. Base64编码
-    encode_start = time.time()
-    print(f"[{encode_start:.3f}] 1. Base64编码开始...")
-    audio_b64 = ubinascii.b2a_base64(wav_data)[:-1].decode('utf-8')
-    encode_end = time.time()
-    encode_time = encode_end - encode_start
-    print(f"[{encode_end:.3f}]   ✅ Base64编码完成，数据长度: {len(audio_b64)} 字符")
-    print(f"[{encode_end:.3f}]   编码耗时: {encode_time:.3f}秒")
-
-    # 2. 构建请求数据（使用字符串拼接代替json.dumps）
-    build_start = time.time()
-    print(f"[{build_start:.3f}] 2. 构建请求数据...")
-
-    # 直接构建JSON字符串，避免使用json.dumps的序列化耗时
-    json_start = time.time()
-    json_data = f'''{{
-    "model": "{MODEL_NAME}",
-    "input": {{
-        "messages": [
-            {{
-                "role": "user",
-                "content": [
-                    {{
-                        "audio": "data:audio/wav;base64,{audio_b64}"
-                    }}
-                ]
-            }}
-        ]
-    }},
-    "parameters": {{
-        "result_format": "message",
-        "language": "zh-CN"
-    }}
-}}'''
-    json_end = time.time()
-
-    headers = {
-        'Authorization': f'Bearer {API_KEY}',
-        'Content-Type': 'application/json'
-    }
-
-    build_end = time.time()
-    build_time = build_end - build_start
-    json_time = json_end - json_start
-
-    print(f"[{build_end:.3f}]   ✅ 请求数据构建完成")
-    print(f"[{build_end:.3f}]   JSON大小: {len(json_data)} 字节")
-    print(f"[{build_end:.3f}]   JSON构建耗时: {json_time:.3f}秒")
-    print(f"[{build_end:.3f}]   总构建耗时: {build_time:.3f}秒")
-    print(f"[{build_end:.3f}]   使用字符串拼接替代json.dumps()")
-
-    # 3. DNS解析
-    dns_start = time.time()
-    print(f"[{dns_start:.3f}] 3. DNS解析开始...")
+    """调用API，各阶段在api_trace中打点，结束时打印一行阶段耗时并导出为JSON行"""
+    api_trace.begin()
+    log.info("\n[%.3f] ========== 开始API调用 ==========", time.time())
+
+    # 1. 计算请求体长度：base64不再预先整体编码，而是在发送时分片编码直接写socket
+    content_length = asr_upload.body_length(len(wav_data))
+    api_trace.mark(BUILD)
+    log.info("[%.3f]   请求体: %s 字节，编码窗口: %s 字节/片", time.time(), content_length, asr_upload.B64_SLICE)
+
+    # 2. DNS解析
     try:
-        # 解析域名
-        domain = "dashscope.aliyuncs.com"
-        dns_resolve_start = time.time()
-        addr_info = socket.getaddrinfo(domain, 443)
-        dns_resolve_end = time.time()
-        ip_address = addr_info[0][4][0]
-        dns_time = dns_resolve_end - dns_resolve_start
-        print(f"[{time.time():.3f}]   ✅ DNS解析成功")
-        print(f"[{time.time():.3f}]   域名: {domain} -> IP: {ip_address}")
-        print(f"[{time.time():.3f}]   DNS解析耗时: {dns_time:.3f}秒")
+        addr_info = dns_cache.resolve(API_HOST, 443)  # 与连接池共用缓存，连接时不再重复解析
+        api_trace.mark(DNS)
+        log.info("[%.3f]   %s -> %s (%s)", time.time(), API_HOST, addr_info[4][0], dns_cache.cache.stats())
     except Exception as e:
-        print(f"[{time.time():.3f}]   ❌ DNS解析失败: {e}")
+        log.error("[%.3f]   ❌ DNS解析失败: %s", time.time(), e)
         return None
 
-    # 4. HTTP请求
-    request_start = time.time()
-    print(f"[{request_start:.3f}] 4. 发送HTTP请求...")
+    # 3. HTTP请求：经连接池发送，复用的连接已被服务端关闭时自动重连重发
+    def send(sock):
+        api_trace.mark(CONNECT)
+        asr_upload.write_request(sock, API_HOST, API_PATH, API_KEY, wav_data)  # 边编码边发送
+        api_trace.mark(SENT)
 
+    conn = None
     try:
-        # 发送请求
-        send_start = time.time()
-        response = requests.post(API_URL, headers=headers, data=json_data, timeout=30)
-        send_end = time.time()
-
-        request_time = send_end - send_start
-        print(f"[{send_end:.3f}]   ✅ HTTP响应接收完成")
-        print(f"[{send_end:.3f}]   状态码: {response.status_code}")
-        print(f"[{send_end:.3f}]   HTTP请求耗时: {request_time:.3f}秒")
-
-        # 检查响应大小
-        if hasattr(response, 'text'):
-            response_size = len(response.text)
-            print(f"[{time.time():.3f}]   响应大小: {response_size} 字节")
-
-        # 5. 解析响应
-        parse_start = time.time()
-        print(f"[{parse_start:.3f}] 5. 解析响应数据...")
-
-        if response.status_code == 200:
-            # 这里还是需要json解析响应
-            result = response.json()
+        handshakes = api_pool.handshakes
+        conn = api_pool.request(send)
+        reused = api_pool.handshakes == handshakes
+        status = conn.status
+        body = conn.read_body()
+        api_pool.release(conn, status != 0 and conn.keep_alive())
+        conn = None
+        api_trace.mark(RESPONSE)
+        log.info("[%.3f]   %s，状态码: %s，响应: %s 字节，连接池: %s", time.time(), '复用长连接' if reused else '新建TLS连接', status, len(body), api_pool.stats())
+
+        # 4. 解析响应
+        if status == 200:
+            result = json.loads(body)
             text = result['output']['choices'][0]['message']['content'][0]['text']
-            parse_end = time.time()
-            parse_time = parse_end - parse_start
-
-            print(f"[{parse_end:.3f}]   ✅ 响应解析成功")
-            print(f"[{parse_end:.3f}]   解析耗时: {parse_time:.3f}秒")
-
-            # 总耗时统计
-            total_end = time.time()
-            total_time = total_end - total_start
-
-            print(f"\n[{total_end:.3f}] ========== API调用完成 ==========")
-            print(f"[{total_end:.3f}] 识别结果: {text}")
-            print(f"[{total_end:.3f}] 各阶段耗时统计:")
-            print(f"[{total_end:.3f}]   Base64编码: {encode_time:.3f}秒 ({encode_time / total_time * 100:.1f}%)")
-            print(f"[{total_end:.3f}]   请求构建: {build_time:.3f}秒 ({build_time / total_time * 100:.1f}%)")
-            print(f"[{total_end:.3f}]   DNS解析: {dns_time:.3f}秒 ({dns_time / total_time * 100:.1f}%)")
-            print(f"[{total_end:.3f}]   HTTP请求: {request_time:.3f}秒 ({request_time / total_time * 100:.1f}%)")
-            print(f"[{total_end:.3f}]   响应解析: {parse_time:.3f}秒 ({parse_time / total_time * 100:.1f}%)")
-            print(f"[{total_end:.3f}]   总耗时: {total_time:.3f}秒")
-            print(f"[{total_end:.3f}] ================================\n")
-
+            api_trace.mark(PARSED)
+            api_trace.end()
+            log.info("[%.3f] 识别结果: %s", time.time(), text)
+            log.info("[%.3f] 各阶段耗时: %s", time.time(), stage_durations(api_trace))
+            if TRACE_FILE:
+                api_trace.export_file(TRACE_FILE)
+            log.info("[%.3f] ================================\n", time.time())
             return text
         else:
-            print(f"[{time.time():.3f}]   ❌ API返回错误: {response.status_code}")
-            if hasattr(response, 'text'):
-                print(f"[{time.time():.3f}]   错误信息: {response.text[:200]}...")
+            api_trace.end()
+            log.error("[%.3f]   ❌ API返回错误: %s", time.time(), status)
+            log.error("[%.3f]   错误信息: %s...", time.time(), body[:200])
             return None
 
     except Exception as e:
-        error_time = time.time()
-        print(f"[{error_time:.3f}]   ❌ HTTP请求失败: {e}")
-        print(f"[{error_time:.3f}]   请求总耗时: {error_time - request_start:.3f}秒")
+        if conn:
+            api_pool.release(conn, False)  # 请求发到一半或响应没读完，关闭而不放回池里
+        api_trace.end()
+        log.error("[%.3f]   ❌ HTTP请求失败: %s", time.time(), e)
+        log.info("[%.3f]   已记录: %s", time.time(), api_trace.summary())
         return None
+
+
+def stage_durations(trace):
+    """最近一轮记录中相邻节点的差，即各阶段耗时与占比"""
+    record = trace.last()
+    total = max(record[-1], 1)
+    parts = []
+    previous = 0
+    for name, value in zip(trace.spans, record):
+        parts.append(f"{name}={value - previous}ms({(value - previous) * 100 // total}%)")
+        previous = value
+    return ", ".join(parts) + f", 总耗时={record[-1]}ms"
+
+
+def compare_pcm_formats(raw_audio):
+    """同一段录音分别以32位和16位上传，对比负载大小与API耗时"""
+    results = []
+    for bits in (32, 16):
+        if bits == 16:
+            # 原地转换，32位数据在此之后不再可用
+            audio = audio_format.pcm32_to_pcm16(raw_audio, PCM_GAIN_SHIFT)
+        else:
+            audio = raw_audio
+        wav_data = create_wav_441(audio, bits)
+        payload_size = (len(wav_data) + 2) // 3 * 4  # base64后的音频字段长度
+        gc.collect()
+        api_start = time.ticks_ms()
+        text = call_api_with_detailed_timing(wav_data)
+        api_ms = time.ticks_diff(time.ticks_ms(), api_start)
+        results.append((bits, len(wav_data), payload_size, api_ms, text))
+        del wav_data
+
+    log.info("\n[%.3f] ====== 采样格式对比 ======", time.time())
+    for bits, wav_size, payload_size, api_ms, text in results:
+        log.info("[%.3f]   %s位: WAV %s 字节, base64 %s 字节, API耗时 %sms, 结果: %s", time.time(), bits, wav_size, payload_size, api_ms, text)
+    log.info("[%.3f] ==========================\n", time.time())
+    return results[-1][4]
+
+
 # --- 主循环 ---
 def main():
     total_start_time = time.time()
-    print(f"[{total_start_time:.3f}] ====== 语音识别程序启动 ======")
+    log.info("[%.3f] ====== 语音识别程序启动 ======", total_start_time)
 
     # 连接Wi-Fi
     if not connect_wifi():
-        print(f"[{time.time():.3f}] ❌ Wi-Fi连接失败，程序退出")
+        log.error("[%.3f] ❌ Wi-Fi连接失败，程序退出", time.time())
         return
 
     # 检查网络状态
@@ -547,20 +516,20 @@ def main():
     gc.collect()
     free_mem = gc.mem_free()
     total_mem = gc.mem_alloc() + free_mem
-    print(f"\n[{time.time():.3f}] 内存状态:")
-    print(f"[{time.time():.3f}]   总内存: {total_mem} 字节")
-    print(f"[{time.time():.3f}]   已用内存: {gc.mem_alloc()} 字节")
-    print(f"[{time.time():.3f}]   空闲内存: {free_mem} 字节")
-    print(f"[{time.time():.3f}]   使用率: {gc.mem_alloc() / total_mem * 100:.1f}%")
+    log.info("\n[%.3f] 内存状态:", time.time())
+    log.info("[%.3f]   总内存: %s 字节", time.time(), total_mem)
+    log.info("[%.3f]   已用内存: %s 字节", time.time(), gc.mem_alloc())
+    log.info("[%.3f]   空闲内存: %s 字节", time.time(), free_mem)
+    log.info("[%.3f]   使用率: %.1f%%", time.time(), gc.mem_alloc() / total_mem * 100)
 
-    print(f"\n[{time.time():.3f}] 开始定时采集，每{COLLECT_SECONDS}秒一次\n")
+    log.info("\n[%.3f] 开始定时采集，每%s秒一次\n", time.time(), COLLECT_SECONDS)
 
     cycle_count = 0
 
     while True:
         cycle_count += 1
         cycle_start_time = time.time()
-        print(f"\n[{cycle_start_time:.3f}] ====== 第{cycle_count}轮循环开始 ======")
+        log.info("\n[%.3f] ====== 第%s轮循环开始 ======", cycle_start_time, cycle_count)
 
         try:
             # 1. 采集5秒音频
@@ -571,13 +540,19 @@ def main():
 
             # 2. 创建WAV
             wav_start = time.time()
-            wav_data = create_wav_441(raw_audio)
+            if COMPARE_FORMATS:
+                wav_data = None
+            else:
+                wav_data = create_wav_441(audio_format.pcm32_to_pcm16(raw_audio, PCM_GAIN_SHIFT), 16)
             wav_end = time.time()
             wav_time = wav_end - wav_start
 
             # 3. 调用API（使用详细版本）
             api_start = time.time()
-            result = call_api_with_detailed_timing(wav_data)
+            if COMPARE_FORMATS:
+                result = compare_pcm_formats(raw_audio)
+            else:
+                result = call_api_with_detailed_timing(wav_data)
             api_end = time.time()
             api_time = api_end - api_start
 
@@ -585,35 +560,35 @@ def main():
             cycle_end_time = time.time()
             cycle_total_time = cycle_end_time - cycle_start_time
 
-            print(f"\n[{cycle_end_time:.3f}] ====== 第{cycle_count}轮循环统计 ======")
-            print(f"[{cycle_end_time:.3f}]   音频采集: {audio_time:.2f}秒")
-            print(f"[{cycle_end_time:.3f}]   WAV创建: {wav_time:.2f}秒")
-            print(f"[{cycle_end_time:.3f}]   API调用: {api_time:.2f}秒")
-            print(f"[{cycle_end_time:.3f}]   循环总耗时: {cycle_total_time:.2f}秒")
+            log.info("\n[%.3f] ====== 第%s轮循环统计 ======", cycle_end_time, cycle_count)
+            log.info("[%.3f]   音频采集: %.2f秒", cycle_end_time, audio_time)
+            log.info("[%.3f]   WAV创建: %.2f秒", cycle_end_time, wav_time)
+            log.info("[%.3f]   API调用: %.2f秒", cycle_end_time, api_time)
+            log.info("[%.3f]   循环总耗时: %.2f秒", cycle_end_time, cycle_total_time)
 
             # 计算各阶段占比
-            print(f"[{cycle_end_time:.3f}]   各阶段占比:")
-            print(f"[{cycle_end_time:.3f}]     音频采集: {audio_time / cycle_total_time * 100:.1f}%")
-            print(f"[{cycle_end_time:.3f}]     WAV创建: {wav_time / cycle_total_time * 100:.1f}%")
-            print(f"[{cycle_end_time:.3f}]     API调用: {api_time / cycle_total_time * 100:.1f}%")
-            print(f"[{cycle_end_time:.3f}] ===============================\n")
+            log.info("[%.3f]   各阶段占比:", cycle_end_time)
+            log.info("[%.3f]     音频采集: %.1f%%", cycle_end_time, audio_time / cycle_total_time * 100)
+            log.info("[%.3f]     WAV创建: %.1f%%", cycle_end_time, wav_time / cycle_total_time * 100)
+            log.info("[%.3f]     API调用: %.1f%%", cycle_end_time, api_time / cycle_total_time * 100)
+            log.info("[%.3f] ===============================\n", cycle_end_time)
 
             # 5. 定期检查和内存清理
             if cycle_count % 3 == 0:  # 每3轮检查一次网络
                 gc.collect()
                 check_network_status()
 
-            print(f"[{time.time():.3f}] 等待下一轮...\n")
+            log.info("[%.3f] 等待下一轮...\n", time.time())
 
         except KeyboardInterrupt:
             total_end_time = time.time()
-            print(f"\n[{total_end_time:.3f}] ====== 程序结束 ======")
-            print(f"[{total_end_time:.3f}] 运行总时长: {total_end_time - total_start_time:.2f}秒")
-            print(f"[{total_end_time:.3f}] 完成循环数: {cycle_count}")
+            log.info("\n[%.3f] ====== 程序结束 ======", total_end_time)
+            log.info("[%.3f] 运行总时长: %.2f秒", total_end_time, total_end_time - total_start_time)
+            log.info("[%.3f] 完成循环数: %s", total_end_time, cycle_count)
             break
         except Exception as e:
             error_time = time.time()
-            print(f"[{error_time:.3f}] 错误: {e}")
+            log.error("[%.3f] 错误: %s", error_time, e)
             time.sleep(1)
 
 
@@ -25,6 +25,7 @@ import network
 import urequests
 import time
 import json  # 【新增】导入 json 模块
+import log
 
 # --- 1. 配置请求参数 ---
 WIFI_SSID = "CMCC-huahua"
@@ -37,10 +38,10 @@ HEADERS = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/js
 wlan = network.WLAN(network.STA_IF)
 wlan.active(True)
 if not wlan.isconnected():
-    print(f"连接 Wi-Fi: {WIFI_SSID}...")
+    log.info("连接 Wi-Fi: %s...", WIFI_SSID)
     wlan.connect(WIFI_SSID, WIFI_PWD)
     while not wlan.isconnected(): time.sleep(0.5)
-print("Wi-Fi 连接成功:", wlan.ifconfig())
+log.info("Wi-Fi 连接成功: %s", wlan.ifconfig())
 
 # --- 3. 构建并发送 POST 请求 (修正版) ---
 question = "写一首关于月亮的中文诗"  # 使用中文问题
@@ -56,33 +57,33 @@ payload_dict = {
 }
 
 try:
-    print("\n--- 待发送的 Python 字典 ---")
-    print(payload_dict)
-    print("--------------------------")
+    log.info("\n--- 待发送的 Python 字典 ---")
+    log.debug("%s", payload_dict)
+    log.info("--------------------------")
 
     # 2. 将字典编码为 JSON 格式的字符串，再转为 UTF-8 字节流
     # 这是解决中文问题的关键步骤
     payload_bytes = json.dumps(payload_dict).encode('utf-8')
 
-    print("\n--- 实际发送的字节流 (UTF-8) ---")
-    print(payload_bytes)
-    print("---------------------------------")
+    log.info("\n--- 实际发送的字节流 (UTF-8) ---")
+    log.debug("%s", payload_bytes)
+    log.info("---------------------------------")
 
     # 3. 发送请求，将编码后的字节流传递给 data 参数
     response = urequests.post(URL, headers=HEADERS, data=payload_bytes)
 
     if response.status_code == 200:
-        print("\n--- 大模型回复 ---")
+        log.info("\n--- 大模型回复 ---")
         # response.json() 会自动处理返回的 JSON 数据
         content = response.json()['choices'][0]['message']['content']
-        print(content)
-        print("-------------------")
+        log.info("%s", content)
+        log.info("-------------------")
     else:
-        print(f"\n请求失败，状态码: {response.status_code}")
-        print("响应内容:", response.text)
+        log.error("\n请求失败，状态码: %s", response.status_code)
+        log.error("响应内容: %s", response.text)
 
 finally:
     if 'response' in locals():
         response.close()
 
-print("\n程序结束。")
\ No newline at end of file
+log.info("\n程序结束。")
\ No newline at end of file
@@ -1,10 +1,17 @@
-import socket
 import json
 import time
 import network
-import ubinascii
 import _thread
 from machine import I2S, Pin
+import net
+import log
+import dns_cache
+from http_reader import HTTPReader
+from sse_parser import SSEParser
+import tts_event
+from pcm_ring import PCMRing
+from i2s_player import IRQPlayer, IRQ_IBUF
+from jitter_buffer import JitterBuffer, ticks_ms
 
 # ===================== 核心配置 =====================
 # --- 配置 ---
@@ -29,10 +36,16 @@ AMP_ENABLE_PIN = 21
 SAMPLE_RATE = 24000
 BITS = 16
 CHANNELS = 1
+PCM_RING_SIZE = 96000  # 播放环形缓冲区，约2秒24kHz 16位单声道
+PLAY_CHUNK = 4096  # 每次写入I2S的最大字节数
+PLAYER_MODE = "irq"  # "irq"：I2S回调续数据，不需要播放线程；"thread"：播放线程阻塞写I2S
+START_MS = 200  # 抖动缓冲起播水位：攒够这么多音频才开始播放
+MAX_BUFFER_MS = 1000  # 欠载后水位逐步调高的上限（须小于环形缓冲区容量）
 
 # ===================== 共享变量 =====================
-audio_buffer = []  # 音频数据缓冲区
-buffer_lock = _thread.allocate_lock()  # 保护buffer的锁
+# TTS音频直接解码到这里，播放期间不再申请内存
+pcm_ring = PCMRing(PCM_RING_SIZE, JitterBuffer(START_MS, SAMPLE_RATE * BITS // 8 // 1000, MAX_BUFFER_MS))
+buffer_lock = _thread.allocate_lock()  # 保护共享状态的锁
 receiving_complete = False  # 标记接收线程是否已完成所有工作
 
 
@@ -48,20 +61,18 @@ def connect_wifi():
         timeout -= 1
 
     if wlan.isconnected():
-        print(f"WiFi连接成功: {wlan.ifconfig()[0]}")
+        log.info("WiFi连接成功: %s", wlan.ifconfig()[0])
         return True
     else:
-        print("WiFi连接失败")
+        log.error("WiFi连接失败")
         return False
 
 
-# ===================== 音频播放线程 =====================
-def audio_player():
-    print("音频播放线程启动")
-    time.sleep(1)
+# ===================== 音频播放 =====================
+def init_speaker(ibuf):
     # 初始化I2S
     Pin(21, Pin.OUT).value(1)
-    audio_out = I2S(
+    return I2S(
         0,
         sck=Pin(9),
         ws=Pin(10),
@@ -70,51 +81,51 @@ def audio_player():
         bits=16,
         format=I2S.MONO,
         rate=24000,
-        ibuf=48000
+        ibuf=ibuf
     )
 
+
+def audio_player():
+    log.info("音频播放线程启动")
+    time.sleep(1)
+    audio_out = init_speaker(IRQ_IBUF)  # ibuf要小：抗抖动交给pcm_ring，抖动缓冲才能看到真实的缓冲量
+
     chunk_count = 0
 
     while True:
 
+        audio_chunk = pcm_ring.get(PLAY_CHUNK)
         with buffer_lock:
-            if audio_buffer:
-                audio_chunk = audio_buffer.pop(0)
-                print(f"[audio]播放音频块{chunk_count + 1} 大小: {len(audio_chunk)}, 缓冲区剩余: {len(audio_buffer)} 块")
+            if audio_chunk is not None:
+                log.debug("[audio]播放音频块%s 大小: %s, 缓冲区已用: %s 字节", chunk_count + 1, len(audio_chunk), pcm_ring.used())
             elif receiving_complete:
                 # 接收已完成且缓冲区为空 -> 所有数据都播放完了
-                print("播放线程检测到接收完成且缓冲区为空，准备退出")
+                log.info("播放线程检测到接收完成且缓冲区为空，准备退出")
                 break
-            else:
-                # 缓冲区为空但接收未完成，打印状态
-                audio_chunk = None
+
+        if audio_chunk is None:
+            # 接收尚未开始，休眠而不是空转
+            time.sleep(0.05)
+            continue
 
         # 在锁外播放音频，避免阻塞接收线程
-        if audio_chunk is not None:
-            audio_out.write(audio_chunk)
-            chunk_count += 1
+        audio_out.write(audio_chunk)
+        pcm_ring.consume(len(audio_chunk))
+        chunk_count += 1
 
-    print(f"播放完成，共播放 {chunk_count} 个音频块")
+    log.info("播放完成，共播放 %s 个音频块", chunk_count)
 
 
 # ===================== 数据接收线程 =====================
 def receive_audio_data(text):
-    print("数据接收线程启动")
+    log.info("数据接收线程启动")
+    request_start = ticks_ms()  # 首音时间从建立连接算起
 
 
     # 3. 建立SSL连接
-    print(f"[API] 连接TTS API: {API_HOST}:{API_PORT}")
-    addr_info = socket.getaddrinfo(API_HOST, API_PORT)[0]
-    sock = socket.socket(addr_info[0], addr_info[1], addr_info[2])
-    sock.setsockopt(1, 8, RECV_BUFFER_SIZE)
-
-    sock.settimeout(30)
-    sock.connect(addr_info[-1])
-
-    import ssl
-
-    sock = ssl.wrap_socket(sock, server_hostname=API_HOST)
-    print("[API] SSL连接建立成功")
+    log.info("[API] 连接TTS API: %s:%s", API_HOST, API_PORT)
+    sock = net.open_connection(API_HOST, API_PORT, rcvbuf=RECV_BUFFER_SIZE)
+    log.info("[API] SSL连接建立成功")
 
     # 4. 构建请求
     payload_dict = {
@@ -141,39 +152,41 @@ def receive_audio_data(text):
 
     sock.write(request_headers.encode('utf-8'))
     sock.write(payload_bytes)
-    print(f"[API] TTS请求已发送，文本: {text}")
+    log.info("[API] TTS请求已发送，文本: %s", text)
 
     # 6. 接收HTTP响应头部
-    print("[HTTP] 接收响应头部...")
-    headers = b""
-    while b'\r\n\r\n' not in headers:
-        chunk = sock.read(1)
-        if not chunk:
-            print("[HTTP] 连接中断")
-            sock.close()
-            Pin(21, Pin.OUT).value(0)
-            return False
-        headers += chunk
-
-    header_text = headers.decode('utf-8')
-    print(f"[HTTP] 头部接收完成 ({len(headers)} 字节)")
+    log.info("[HTTP] 接收响应头部...")
+    conn = HTTPReader(sock)
+    status = conn.read_head()
+    if not status:
+        log.error("[HTTP] 连接中断")
+        sock.close()
+        Pin(21, Pin.OUT).value(0)
+        return False
+
+    log.info("[HTTP] 头部接收完成 (%s 次读取)", conn.reads)
 
     # 检查HTTP状态码
-    if "200 OK" not in header_text:
-        print(f"[HTTP] 错误响应: {header_text[:100]}")
+    if status != 200:
+        log.error("[HTTP] 错误响应: %s %s", status, conn.read_body()[:100])
         sock.close()
         Pin(21, Pin.OUT).value(0)
         return False
 
     # 7. 流式处理数据（核心修改点）
     total_count = 0
-    if "transfer-encoding: chunked" in header_text.lower():
-        print("[HTTP] 检测到chunked编码，开始流式处理...")
+    if conn.chunked():
+        log.info("[HTTP] 检测到chunked编码，开始流式处理...")
         # 流式处理chunked数据，边接收边播放
-        total_count = stream_chunked_data(sock)
+        pcm_ring.begin(request_start)
+        total_count = stream_chunked_data(conn)
+        pcm_ring.end()
+    sock.close()
 
 
-    print(f"共接收了 {total_count} 个音频块")
+    log.info("共接收了 %s 个音频块", total_count)
+    log.info("[Audio] %s", pcm_ring.stats())
+    log.info("[DNS] %s", dns_cache.cache.stats())
 
     global  receiving_complete
     with buffer_lock:
@@ -182,132 +195,40 @@ def receive_audio_data(text):
     return True
 
 
-def stream_chunked_data(sock):
-    """流式处理chunked数据：边接收、边解析、边播放"""
-    # 用于缓存未解析完成的SSE行
-    sse_buffer = ""
+def stream_chunked_data(conn):
+    """流式处理chunked数据：边接收、边解析、边播放，HTTPReader负责chunk分帧"""
     count = 0
-    is_done = False
-
-    print("[HTTP] 开始流式处理chunked数据...")
-
-    while not is_done:
-        # 1. 读取chunk大小行
-        size_line = b""
-        empty_read_count = 0
-        max_empty_reads = 20  # 最大连续空读取次数（大约400ms）
-        while b'\r\n' not in size_line:
-            chunk = sock.read(1)
-            if not chunk:
-                empty_read_count += 1
-                print(f"[HTTP] 中断{empty_read_count}次 {chunk}")
-                if empty_read_count > max_empty_reads:
-                    print(f"[HTTP] 连续{max_empty_reads}次读取为空，连接可能已断开")
-                    return count
-                # 短暂等待数据到达
-                time.sleep_ms(20)  # 20毫秒，足够网络数据到达
-                continue
-
-            empty_read_count = 0
-            size_line += chunk
-
-        # 2. 解析chunk大小（十六进制）
-        chunk_size_str = size_line.split(b'\r\n')[0].strip()
-        if not chunk_size_str:
-            continue
 
-        try:
-            chunk_size = int(chunk_size_str, 16)
-        except:
-            print(f"[HTTP] chunk大小解析失败: {chunk_size_str}")
-            continue
+    log.info("[HTTP] 开始流式处理chunked数据...")
 
-        # 3. chunk大小为0表示结束
-        if chunk_size == 0:
-            print("[HTTP] 收到结束chunk (size=0)")
-            break
-
-        # 4. 边读取边解析，避免阻塞播放线程
-        received = 0
-        while received < chunk_size:
-            # 每次只读取一小块数据，避免长时间阻塞
-            to_read = min(1024, chunk_size - received)
-            data = sock.read(to_read)
-            if not data:
-                break
-
-            # 5. 立即将读取的数据追加到SSE缓冲区并解码
-            chunk_data_str = data.decode('utf-8', 'ignore')
-            sse_buffer += chunk_data_str
-            received += len(data)
-
-            # 6. 立即解析缓冲区中的完整行，边解析边放入播放buffer
-            while '\n' in sse_buffer:
-                # 提取第一行
-                line_end = sse_buffer.find('\n')
-                line = sse_buffer[:line_end]
-                sse_buffer = sse_buffer[line_end + 1:]
-
-                line = line.strip()
-                if not line:
-                    continue
-
-                # 解析SSE行
-                parsed_line = parse_sse_line(line)
-                if not parsed_line:
-                    continue
-
-                if parsed_line["type"] == "done":
-                    print("[SSE] 收到[DONE]信号")
-                    is_done = True
-                    break
-
-                if parsed_line["type"] == "data":
-                    count, is_done = handle_chunk_data(parsed_line["data"], count)
-                    if is_done:
-                        print("[SSE] 收到完成信号")
-                        break
-
-            # 如果收到完成信号，提前结束读取
-            if is_done:
-                # 读取剩余的chunk数据以保持HTTP协议正确性
-                remaining = chunk_size - received
-                if remaining > 0:
-                    sock.read(remaining)
-                    received = chunk_size
-                break
-
-        # print(f"[HTTP] 接收chunk: 大小={chunk_size}, 实际={received}")
-
-        # 7. 读取chunk结尾的\r\n
-        sock.read(2)  # 读取\r\n
-
-        # 如果已完成，退出循环
+    parser = SSEParser()
+    parts = conn.body_parts()
+    # 按字节切出完整事件，整条事件一次解码，不会切断多字节字符
+    for payload in parser.parse(parts):
+        count, is_done = handle_tts_event(parser.buf, parser.payload_start, parser.payload_end, count)
         if is_done:
+            log.debug("[SSE] 收到完成信号")
             break
+    if parser.done:
+        log.debug("[SSE] 收到[DONE]信号")
 
-    # 处理缓冲区中剩余的最后一行数据
-    if sse_buffer.strip():
-        parsed_line = parse_sse_line(sse_buffer.strip())
-        if parsed_line and parsed_line["type"] == "data":
-            count, _ = handle_chunk_data(parsed_line["data"], count)
+    log.info("[HTTP] 共 readinto %s 次", conn.reads)
 
     return count
 
 
 
-def parse_sse_line(line_str):
-    if not line_str.startswith('data:'):
-        return None
-
-    json_str = line_str[5:]
-    if json_str == '[DONE]':
-        return {"type": "done"}
-
-    try:
-        return {"type": "data", "data": json.loads(json_str)}
-    except:
-        return None
+def handle_tts_event(buf, start, end, count):
+    """处理buf[start:end]中的一条TTS事件：快速路径直接从缓冲区解码base64，形状不符时回退到完整JSON解析"""
+    event = tts_event.parse_event(buf, start, end)
+    if event is None:
+        return handle_chunk_data(json.loads(bytes(memoryview(buf)[start:end])), count)
+    data_start, data_end, finished = event
+    if finished:
+        return count, True
+    if data_end > data_start:
+        count = queue_audio(buf, data_start, data_end, count)
+    return count, False
 
 
 def handle_chunk_data(chunk, count):
@@ -321,25 +242,33 @@ def handle_chunk_data(chunk, count):
 
     audio_info = chunk["output"].get("audio", {})
     if "data" in audio_info:
-        # 解码音频数据
-        audio_bytes = ubinascii.a2b_base64(audio_info["data"])
-
-        # 添加到播放缓冲区
-        with buffer_lock:
-            audio_buffer.append(audio_bytes)
-        count += 1
-        print(f"[HTTP] base64的数据长度{len(audio_info['data'])} 解码后二进制数据长度{len(audio_bytes)} 缓冲区大小{len(audio_buffer)} ")
+        audio_b64 = audio_info["data"].encode()
+        count = queue_audio(audio_b64, 0, len(audio_b64), count)
     return count, False
 
 
+def queue_audio(src, start, end, count):
+    """把src[start:end]的base64音频直接解码进PCM环形缓冲区，缓冲区满时阻塞（暂停读socket）直到播放端消耗"""
+    total = pcm_ring.put_b64(src, start, end)
+    count += 1
+    log.debug("[HTTP] base64的数据长度%s 解码后二进制数据长度%s 缓冲区已用%s字节", end - start, total, pcm_ring.used())
+    return count
+
+
 # ===================== 主程序 =====================
 def main():
-    print("\n=== ESP32 TTS 流式播放 ===")
+    log.info("\n=== ESP32 TTS 流式播放 ===")
 
     if not connect_wifi():
         return
-    # 启动播放线程
-    _thread.start_new_thread(audio_player, ())
+    player = None
+    if PLAYER_MODE == "irq":
+        # I2S回调从pcm_ring续数据，不需要播放线程
+        player = IRQPlayer(init_speaker(IRQ_IBUF), pcm_ring, PLAY_CHUNK)
+        player.start()
+    else:
+        # 启动播放线程
+        _thread.start_new_thread(audio_player, ())
 
     TEXT = "牢A说的大多是美国底层，尤其是流浪汉。如果不认同牢A，最直接的方法，是大半夜跑到美国大大小小的城市，拍那些街道、下水道、贫民窟等地方到底啥情况，尽可能地做到有图有真相。一名在美国留学的女学生，读的又是哈佛这种高等学府，不管是从实地考察，还是理论分析，她去论证牢A说的是真是假，比国内网友容易多了，但她的辟谣方式“格外不同”。"
     receive_audio_data(TEXT)
@@ -347,13 +276,16 @@ def main():
     # 等待接收完成，并且缓冲区播放完毕
     while True:
         with buffer_lock:
-            buffer_empty = len(audio_buffer) == 0
+            buffer_empty = pcm_ring.used() == 0
             all_done = receiving_complete and buffer_empty
         if all_done:
             break
         time.sleep(1)
 
-    print("程序执行完成")
+    if player:
+        player.stop()
+        log.info("[audio] %s", player.stats())
+    log.info("程序执行完成")
 
 
 if __name__ == "__main__":
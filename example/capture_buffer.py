@@ -0,0 +1,74 @@
+import audio_format
+
+# 录音缓冲区：启动时一次性分配，采集过程中不再申请内存
+#   空闲时前pre_chunks个槽位作为预缓存环，循环覆盖
+#   检测到语音后展开预缓存环，后续chunk线性追加，直到达到最大录音长度
+#   缓冲区开头预留header_size字节，录音结束后WAV头直接写在数据前面
+
+
+class CaptureBuffer:
+    def __init__(self, chunk_size, pre_chunks, max_chunks, header_size=0):
+        self.chunk_size = chunk_size
+        self.pre_chunks = pre_chunks
+        self.slots = pre_chunks + max_chunks
+        self.header_size = header_size
+        self.buf = bytearray(header_size + chunk_size * self.slots)
+        self.mv = memoryview(self.buf)
+        # 预先切好每个槽位的memoryview，采集时不再产生新对象
+        self.views = [self.mv[header_size + i * chunk_size:header_size + (i + 1) * chunk_size]
+                      for i in range(self.slots)]
+        self.reset()
+
+    def reset(self):
+        """开始新一轮采集"""
+        self.head = 0  # 下一个待写入的槽位
+        self.filled = 0  # 预缓存环中的有效chunk数
+        self.start = 0  # 本次录音的起始槽位
+        self.recording = False
+
+    def slot(self):
+        """当前待写入的chunk，可直接mic.readinto"""
+        return self.views[self.head]
+
+    def advance(self):
+        """提交当前chunk，返回是否还有空间继续录音"""
+        if self.recording:
+            self.head += 1
+            return self.head < self.slots
+        self.head = (self.head + 1) % self.pre_chunks
+        if self.filled < self.pre_chunks:
+            self.filled += 1
+        return True
+
+    def start_recording(self):
+        """把预缓存环展开成线性顺序：只把绕回的那部分搬到环尾之后，不申请内存"""
+        cs = self.chunk_size
+        if self.filled < self.pre_chunks:
+            self.start = 0
+            self.head = self.filled
+        else:
+            oldest = self.head
+            base = self.header_size
+            end = base + self.pre_chunks * cs
+            self.mv[end:end + oldest * cs] = self.mv[base:base + oldest * cs]
+            self.start = oldest
+            self.head = self.pre_chunks + oldest
+        self.recording = True
+
+    def data(self):
+        """本次录音数据（预缓存 + 语音 + 尾部静音），零拷贝切片"""
+        base = self.header_size
+        return self.mv[base + self.start * self.chunk_size:base + self.head * self.chunk_size]
+
+    def wav(self, bits=32, sample_rate=16000, gain_shift=0):
+        """原地封装WAV：16位时先原地转换，再把头写进数据前的44字节，返回整段WAV的memoryview
+        数据前的空间要么是预留的头部，要么是展开预缓存环后已搬走的槽位"""
+        if self.header_size < audio_format.WAV_HEADER_SIZE:
+            raise ValueError("CaptureBuffer未预留WAV头空间")
+        data = self.data()
+        if bits == 16:
+            data = audio_format.pcm32_to_pcm16(data, gain_shift)
+        offset = self.header_size + self.start * self.chunk_size
+        header_at = offset - audio_format.WAV_HEADER_SIZE
+        self.mv[header_at:offset] = audio_format.wav_header(len(data), bits, sample_rate)
+        return self.mv[header_at:offset + len(data)]
@@ -1,21 +1,45 @@
-import socket
 import json
+import sys
 import time
 import network
-import ubinascii
 import _thread
 from machine import I2S, Pin
+import log
+import vad_kernel
+import audio_format
+import asr_upload
+from asr_upload import StreamingUpload
+from conn_pool import ConnectionPool
+import dns_cache
+from sse_parser import SSEParser
+import tts_event
+from pcm_ring import PCMRing
+from i2s_player import IRQPlayer, IRQ_IBUF
+from jitter_buffer import JitterBuffer, ticks_ms, ticks_diff
+from sentence_splitter import SentenceSplitter
+from capture_buffer import CaptureBuffer
+from vad import AdaptiveVAD, VAD_START, VAD_END, VAD_FULL, vad_frames
+from tracer import Tracer, WAV, ASR_SENT, ASR_DONE, LLM_FIRST, LLM_LAST, TTS_FIRST, I2S_FIRST, PLAY_END
 
 WIFI_SSID = "CMCC-huahua"
 WIFI_PASSWORD = "*HUAHUAshi1zhimao"
 API_KEY = 'sk-943f95da67d04893b70c02be400e2935' #不要使用2935
-COLLECT_SECONDS = 5
+COLLECT_SECONDS = 5  # 单次录音最长时长，决定启动时预分配的录音缓冲区大小
 SAMPLE_RATE = 16000
+CHUNK_SIZE = 3200  # 每次读取50ms的32位样本
+PRE_ROLL_CHUNKS = 10  # 预缓存chunk数（5个可能静音 + 5个语音）
+ASR_BITS = 16  # 上传ASR的采样位数，16时先原地转换再建WAV
+PCM_GAIN_SHIFT = 0  # 32位转16位时的额外增益（左移位数）
+ASR_STREAMING = True  # 检测到说话即建立ASR连接，录音过程中边录边传
+QWEN_STREAMING = True  # 大模型流式输出，每生成完整的一句就交给TTS线程，边生成边播放
+THREAD_STACK = 16 * 1024  # 后台线程（ASR上传、预连接、TTS）里做TLS握手，栈要比默认值大
+PREWARM_CONNECTIONS = 2  # 检测到说话时后台预先建立的连接数：ASR之后LLM与TTS线程同时各用一条
 RECV_BUFFER_SIZE = 8192
-vad_threshold = 500
 VAD_INITIALIZATION_SECONDS = 2
 SILENCE_FRAMES = 10
 VOICE_FRAMES = 10
+VAD_ONSET_RATIO = 1.5  # 起始阈值 = 底噪 * 1.5
+VAD_RELEASE_RATIO = 1.2  # 结束阈值 = 底噪 * 1.2，低于起始阈值形成迟滞
 
 VOICE = "Cherry"
 LANGUAGE = "Chinese"
@@ -33,61 +57,78 @@ AMP_ENABLE_PIN = 21
 TTS_SAMPLE_RATE = 24000
 TTS_BITS = 16
 TTS_CHANNELS = 1
+PCM_RING_SIZE = 96000  # 播放环形缓冲区，约2秒24kHz 16位单声道
+PLAY_CHUNK = 4096  # 每次写入I2S的最大字节数
+TTS_START_MS = 200  # 抖动缓冲起播水位：攒够这么多音频才开始播放
+TTS_MAX_BUFFER_MS = 1000  # 欠载后水位逐步调高的上限（须小于环形缓冲区容量）
+PLAYER_IDLE_SLEEP = 0.05  # 没有回复在播放时播放线程的休眠间隔（秒）
+PLAYER_MODE = "irq"  # "irq"：I2S回调续数据，不需要播放线程；"thread"：播放线程阻塞写I2S
+LOG_LEVEL = log.INFO  # 串口输出级别，改为log.DEBUG可看到逐个TTS事件等细节
+TRACE_ENABLED = True  # 每轮记录从说话结束到播完的各节点耗时
+TRACE_TURNS = 16  # 内存中保留最近多少轮的记录
+TRACE_FILE = None  # 记录以JSON行追加到flash上的这个文件（如"/trace.jsonl"），None时以[Trace]行打到串口
 
 # ===================== 共享变量 =====================
-audio_buffer = []  # 音频数据缓冲区
-buffer_lock = _thread.allocate_lock()  # 保护buffer的锁
+# TTS音频直接解码到这里，启动时分配，播放期间不再申请内存
+pcm_ring = PCMRing(PCM_RING_SIZE, JitterBuffer(TTS_START_MS, TTS_SAMPLE_RATE * TTS_BITS // 8 // 1000, TTS_MAX_BUFFER_MS))
+buffer_lock = _thread.allocate_lock()  # 保护共享状态的锁
 tts_receiving_complete = False  # 标记TTS接收线程是否已完成所有工作
 conversation_history = []  # 对话历史，最多保存最近5轮
+api_pool = ConnectionPool(API_HOST, rcvbuf=RECV_BUFFER_SIZE)  # ASR/Qwen/TTS共用的TLS长连接
+tts_parser = SSEParser()  # TTS事件解析缓冲区，启动时分配，每次请求复用
+chat_parser = SSEParser(2048)  # 流式对话的事件都很短
+splitter = SentenceSplitter()
+tts_queue = []  # 等待合成的句子，TTS线程按顺序取出，保证播放顺序
+tts_busy = False  # TTS线程正在合成一句
+turn_trace = Tracer(turns=TRACE_TURNS, enabled=TRACE_ENABLED)
+vad_log = log.Site(log.INFO, 1000)  # 每个chunk都有VAD状态，串口上每秒只打一条
 
 
 def connect_wifi():
     wlan = network.WLAN(network.STA_IF)
     wlan.active(True)
     if wlan.isconnected():
-        print(f"[WiFi] 已连接，IP: {wlan.ifconfig()[0]}")
+        log.info("[WiFi] 已连接，IP: %s", wlan.ifconfig()[0])
         return True
-    print(f"[WiFi] 正在连接: {WIFI_SSID}")
+    log.info("[WiFi] 正在连接: %s", WIFI_SSID)
     wlan.connect(WIFI_SSID, WIFI_PASSWORD)
     for i in range(30):
         if wlan.isconnected():
-            print(f"[WiFi] 连接成功，IP: {wlan.ifconfig()[0]}")
+            log.info("[WiFi] 连接成功，IP: %s", wlan.ifconfig()[0])
             return True
         time.sleep(0.5)
-    print("[WiFi] 连接失败")
+    log.error("[WiFi] 连接失败")
     return False
 
 
 def init_microphone():
     """初始化麦克风并丢弃初始化噪音"""
-    print("[Mic] 初始化麦克风...") #麦克风的LR要接地
+    log.info("[Mic] 初始化麦克风...") #麦克风的LR要接地
     mic = I2S(0, sck=Pin(12), ws=Pin(13), sd=Pin(14),
               mode=I2S.RX, bits=32, format=I2S.MONO,
               rate=SAMPLE_RATE, ibuf=48000)
 
     # 丢弃初始化噪音 - 100ms
-    chunk_size = 3200
-    discard_chunks = int(16000 * 2 / (chunk_size / 4))
-    print(f"[Mic] 丢弃初始化噪音: {discard_chunks}个chunk")
+    discard_chunks = int(16000 * 2 / (CHUNK_SIZE / 4))
+    log.info("[Mic] 丢弃初始化噪音: %s个chunk", discard_chunks)
+    chunk = bytearray(CHUNK_SIZE)
     for _ in range(discard_chunks):
-        chunk = bytearray(chunk_size)
         mic.readinto(chunk)
 
-    print("[Mic] 麦克风就绪")
+    log.info("[Mic] 麦克风就绪")
     return mic
 
 
-def calculate_vad_threshold(mic, seconds):
-    """采集环境噪音并计算VAD阈值"""
-    print(f"[VAD] 开始采集环境噪音，时长: {seconds}秒...")
-    chunk_size = 3200
-    chunks_per_second = SAMPLE_RATE * 2 / (chunk_size / 4)
+def calculate_noise_floor(mic, seconds):
+    """采集环境噪音，返回初始底噪（之后由AdaptiveVAD持续跟踪）"""
+    log.info("[VAD] 开始采集环境噪音，时长: %s秒...", seconds)
+    chunks_per_second = SAMPLE_RATE * 2 / (CHUNK_SIZE / 4)
     total_chunks = int(chunks_per_second * seconds)
 
     rms_values = []
+    chunk = bytearray(CHUNK_SIZE)
 
     for i in range(total_chunks):
-        chunk = bytearray(chunk_size)
         mic.readinto(chunk)
 
         rms = calculate_rms(chunk)
@@ -97,148 +138,83 @@ def calculate_vad_threshold(mic, seconds):
     max_rms = max(rms_values)
     min_rms = min(rms_values)
 
-    print(f"[VAD] 环境噪音统计: 平均={avg_rms:.2f}, 最大={max_rms:.2f}, 最小={min_rms:.2f}")
+    log.info("[VAD] 环境噪音统计: 平均=%.2f, 最大=%.2f, 最小=%.2f", avg_rms, max_rms, min_rms)
 
-    threshold = avg_rms * 1.5
-    print(f"[VAD] 设定阈值: {threshold:.2f} (平均值的2倍)")
-
-    return threshold
+    return avg_rms
 
 
 def calculate_rms(chunk):
-    """计算音频块的RMS值（32位转16位）"""
-    import struct
-    sample_count = len(chunk) // 4
-    sum_squares = 0
-
-    for i in range(sample_count):
-        sample_32 = struct.unpack('<i', chunk[i * 4:(i + 1) * 4])[0]
-        sample_16 = sample_32 >> 16
-        sum_squares += sample_16 * sample_16
-
-    rms = (sum_squares / sample_count) ** 0.5
-    return rms
-
-
-def detect_voice_in_chunk(chunk):
-    """检测chunk是否有语音，返回 (rms值, 是否有语音)"""
-    rms = calculate_rms(chunk)
-    has_voice = rms > vad_threshold
-    return rms, has_voice
-
-
-def collect_audio(mic):
-    """采集音频数据，mic为已初始化的麦克风实例"""
-    print("[ASR] 等待用户说话...")
-    chunk_size = 3200
-    collected = bytearray()
-    silence_count = 0
-    pre_buffer = []  # 预缓存，保存最近的10个chunk（5个可能静音 + 5个语音）
-    post_buffer = []  # 后缓存，保存录音结束前的静音chunks
-    voice_count = 0
-    recording = False
-
-    while True:
-        chunk = bytearray(chunk_size)
-        mic.readinto(chunk)
-
-        rms, has_voice = detect_voice_in_chunk(chunk)
-
-        if not recording:
-            pre_buffer.append(chunk)
-            if len(pre_buffer) > 10:
-                pre_buffer.pop(0)
-
-            if has_voice:
-                voice_count += 1
-                print(f"[VAD] 检测到语音: 能量={rms:.2f}, 阈值={vad_threshold:.2f}")
-            else:
-                voice_count = 0
-                print(f"[VAD] 检测到静音: 能量={rms:.2f}, 阈值={vad_threshold:.2f}")
-
-            if voice_count >= VOICE_FRAMES:
-                print("[ASR] 检测到说话，开始录音...")
-                recording = True
-                collected = bytearray()
-                for buf in pre_buffer:
-                    collected += buf
-        else:
-            collected += chunk
-            if not has_voice:
-                silence_count += 1
-                post_buffer.append(chunk)
-                print(f"[VAD] 检测到静音: 能量={rms:.2f}, 阈值={vad_threshold:.2f} [录音中]")
-                if silence_count >= SILENCE_FRAMES:
-                    print("[ASR] 检测到静音，录音结束")
-                    for buf in post_buffer:
-                        collected += buf
-                    break
-            else:
-                silence_count = 0
-                post_buffer = []  # 检测到语音时清空post_buffer
-                print(f"[VAD] 检测到语音: 能量={rms:.2f}, 阈值={vad_threshold:.2f} [录音中]")
+    """计算音频块的RMS值（32位转16位），由vad_kernel按平台选择实现"""
+    return vad_kernel.rms_i32(chunk)
+
+
+def collect_audio(mic, capture, vad, upload=None):
+    """采集音频数据，mic为已初始化的麦克风实例，capture为启动时分配的CaptureBuffer
+    upload为StreamingUpload时，检测到说话即开始在后台上传"""
+    log.info("[ASR] 等待用户说话...")
+
+    # 尾部静音chunk已在缓冲区中，无需单独缓存
+    for chunk, rms, event in vad_frames(mic, capture, vad, calculate_rms):
+        if not capture.recording:
+            api_pool.reap()  # 等待说话期间关闭空闲超时的连接
+        state = "语音" if vad.voiced else "静音"
+        tag = " [录音中]" if capture.recording and event != VAD_START else ""
+        vad_log("[VAD] 检测到%s: 能量=%.2f, 阈值=%.2f%s", state, rms, vad.threshold, tag)
+        if event == VAD_START:
+            log.info("[ASR] 检测到说话，开始录音...")
+            # 录音期间网络空闲，后台提前完成DNS与TLS握手，ASR/LLM/TTS直接用热连接
+            api_pool.prewarm(PREWARM_CONNECTIONS)
+            if upload:
+                upload.start(capture)
+        elif event == VAD_END:
+            log.info("[ASR] 检测到静音，录音结束")
+            break
+        elif event == VAD_FULL:
+            log.info("[ASR] 达到最长录音时长%s秒，录音结束", COLLECT_SECONDS)
+            break
 
-    print(f"[ASR] 采集完成: {len(collected)}字节")
+    if upload:
+        upload.end()
+    collected = capture.data()
+    log.info("[ASR] 采集完成: %s字节", len(collected))
     return collected
 
 
-def create_wav(audio_data):
-    datasize = len(audio_data)
-    header = (b"RIFF" + (datasize + 36).to_bytes(4, 'little') + b"WAVE" +
-              b"fmt " + b"\x10\x00\x00\x00" + b"\x01\x00" + b"\x01\x00" +
-              b"\x80\x3e\x00\x00" + b"\x00\xFA\x00\x00" +
-              b"\x04\x00" + b"\x20\x00" + b"data" + datasize.to_bytes(4, 'little'))
-    wav = bytearray()
-    wav.extend(header)
-    wav.extend(audio_data)
-    return wav
-
-
 def asr_api_call(wav_data):
-    print("[ASR] 调用API...")
-    audio_b64 = ubinascii.b2a_base64(wav_data)[:-1].decode('utf-8')
-    json_data = f'''{{"model":"qwen3-asr-flash","input":{{"messages":[{{"role":"user","content":[{{"audio":"data:audio/wav;base64,{audio_b64}"}}]}}]}},"parameters":{{"result_format":"message","language":"zh-CN"}}}}'''
+    """wav_data为录音缓冲区上的memoryview，边分片编码边发送，不生成完整的base64"""
+    log.info("[ASR] 调用API...")
 
-    addr_info = socket.getaddrinfo(API_HOST, 443)[0]
-    sock = socket.socket(addr_info[0], addr_info[1], addr_info[2])
-    sock.settimeout(30)
-    sock.connect(addr_info[-1])
+    def send(sock):
+        asr_upload.write_request(sock, API_HOST, API_PATH_ASR, API_KEY, wav_data)
+        turn_trace.mark(ASR_SENT)
 
-    import ssl
-    sock = ssl.wrap_socket(sock, server_hostname=API_HOST)
+    conn = api_pool.request(send)
+    body = conn.read_body()
+    turn_trace.mark(ASR_DONE)
+    api_pool.release(conn, conn.status != 0 and conn.keep_alive())
+    return parse_asr_result(json.loads(body) if conn.status else None)
 
-    request = f"POST {API_PATH_ASR} HTTP/1.1\r\nHost: {API_HOST}\r\nAuthorization: Bearer {API_KEY}\r\nContent-Type: application/json\r\nContent-Length: {len(json_data)}\r\nConnection: close\r\n\r\n"
-    sock.write(request.encode('utf-8'))
-    sock.write(json_data.encode('utf-8'))
 
-    response = b""
-    while True:
-        chunk = sock.read(4096)
-        if not chunk:
-            break
-        response += chunk
-    sock.close()
-
-    body = response.split(b'\r\n\r\n', 1)[1]
-    result = json.loads(body)
-
-    if 'output' not in result:
-        print(f"[ASR] 错误响应: {result}")
+def parse_asr_result(result):
+    """从ASR响应中取出识别文本，出错返回空字符串"""
+    if not result or 'output' not in result:
+        log.error("[ASR] 错误响应: %s", result)
         return ""
 
     if 'choices' not in result['output'] or len(result['output']['choices']) == 0:
-        print(f"[ASR] 错误响应: {result}")
+        log.error("[ASR] 错误响应: %s", result)
         return ""
 
     text = result['output']['choices'][0]['message']['content'][0]['text']
-    print(f"[ASR] 识别: {text}")
+    log.info("[ASR] 识别: %s", text)
     return text
 
 
-def qwen_api_call(text):
+def qwen_api_call(text, on_sentence=None):
+    """on_sentence不为空时使用流式输出，每生成完整的一句就回调一次，返回完整回复"""
     global conversation_history
 
-    print("[Qwen] 调用API...")
+    log.info("[Qwen] 调用API...")
 
     # 构建消息列表：system + 历史对话 + 当前问题
     messages = [{"role": "system", "content": "你是一个ai陪伴机器人，你的名字叫花花，请你和用户对话，每次对话返回的字数不必太多，20字左右就行"}]
@@ -246,49 +222,73 @@ def qwen_api_call(text):
     messages.append({"role": "user", "content": text})
 
     payload_dict = {"model": "qwen-plus", "messages": messages}
+    if on_sentence:
+        payload_dict["stream"] = True
     payload_bytes = json.dumps(payload_dict).encode('utf-8')
 
-    addr_info = socket.getaddrinfo(API_HOST, 443)[0]
-    sock = socket.socket(addr_info[0], addr_info[1], addr_info[2])
-    sock.settimeout(30)
-    sock.connect(addr_info[-1])
+    request = f"POST {API_PATH_QWEN} HTTP/1.1\r\nHost: {API_HOST}\r\nAuthorization: Bearer {API_KEY}\r\nContent-Type: application/json\r\nContent-Length: {len(payload_bytes)}\r\n\r\n"
 
-    import ssl
-    sock = ssl.wrap_socket(sock, server_hostname=API_HOST)
+    def send(sock):
+        sock.write(request.encode('utf-8'))
+        sock.write(payload_bytes)
 
-    request = f"POST {API_PATH_QWEN} HTTP/1.1\r\nHost: {API_HOST}\r\nAuthorization: Bearer {API_KEY}\r\nContent-Type: application/json\r\nContent-Length: {len(payload_bytes)}\r\nConnection: close\r\n\r\n"
-    sock.write(request.encode('utf-8'))
-    sock.write(payload_bytes)
+    request_start = ticks_ms()
+    conn = api_pool.request(send)
+    if on_sentence and conn.status == 200:
+        content = stream_qwen_response(conn, on_sentence, request_start)
+        api_pool.release(conn, conn.keep_alive())
+        log.info("[Qwen] 回复: %s", content)
+        return content
 
-    response = b""
-    while True:
-        chunk = sock.read(4096)
-        if not chunk:
-            break
-        response += chunk
-    sock.close()
-
-    body = response.split(b'\r\n\r\n', 1)[1]
-    result = json.loads(body)
+    turn_trace.mark(LLM_FIRST)
+    body = conn.read_body()
+    turn_trace.mark(LLM_LAST)
+    api_pool.release(conn, conn.status != 0 and conn.keep_alive())
+    result = json.loads(body) if conn.status else {}
 
     if 'choices' not in result or len(result['choices']) == 0:
-        print(f"[Qwen] 错误响应: {result}")
+        log.error("[Qwen] 错误响应: %s", result)
         return ""
 
     content = result['choices'][0]['message']['content']
-    print(f"[Qwen] 回复: {content}")
+    log.info("[Qwen] 回复: %s", content)
     return content
 
 
-# ===================== 音频播放线程 =====================
-def audio_player():
-    """音频播放线程：长期存在，持续从audio_buffer中读取并播放音频数据"""
-    print("[TTS] 音频播放线程启动")
-    time.sleep(0.5)  # 等待一小段时间确保I2S初始化
-
-    # 初始化I2S音频输出
+def stream_qwen_response(conn, on_sentence, request_start):
+    """逐个读取流式对话事件，把增量文本送入分句器，完整的句子立即回调"""
+    parser = chat_parser
+    parser.reset()
+    splitter.reset()
+    pieces = []
+    parts = conn.body_parts()
+    for payload in parser.parse(parts):
+        choices = json.loads(bytes(payload)).get("choices")
+        delta = choices[0].get("delta", {}).get("content") if choices else None
+        if not delta:
+            continue
+        if not pieces:
+            turn_trace.mark(LLM_FIRST)
+            log.info("[Qwen] 首个片段: %sms", ticks_diff(ticks_ms(), request_start))
+        pieces.append(delta)
+        for sentence in splitter.feed(delta):
+            on_sentence(sentence)
+
+    # 读完剩余数据直到结束chunk，保持连接可复用
+    for _ in parts:
+        pass
+    turn_trace.mark(LLM_LAST)
+    last = splitter.flush()
+    if last:
+        on_sentence(last)
+    return "".join(pieces)
+
+
+# ===================== 音频播放 =====================
+def init_speaker(ibuf):
+    """初始化I2S音频输出并启用功放"""
     Pin(AMP_ENABLE_PIN, Pin.OUT).value(1)  # 启用功放
-    audio_out = I2S(
+    return I2S(
         1,
         sck=Pin(I2S_SCK_PIN),
         ws=Pin(I2S_WS_PIN),
@@ -297,39 +297,72 @@ def audio_player():
         bits=TTS_BITS,
         format=I2S.MONO,
         rate=TTS_SAMPLE_RATE,
-        ibuf=48000
+        ibuf=ibuf
     )
 
+
+def audio_player():
+    """音频播放线程（thread模式）：长期存在，持续从pcm_ring中读取并播放音频数据"""
+    log.info("[TTS] 音频播放线程启动")
+    time.sleep(0.5)  # 等待一小段时间确保I2S初始化
+
+    audio_out = init_speaker(IRQ_IBUF)  # ibuf要小：抗抖动交给pcm_ring，抖动缓冲才能看到真实的缓冲量
     chunk_count = 0
 
     while True:
-        with buffer_lock:
-            if audio_buffer:
-                # 从缓冲区获取音频数据
-                audio_chunk = audio_buffer.pop(0)
-            else:
-                # 没有数据，继续循环检测
-                continue
-
-        # 在锁外播放音频，避免阻塞其他线程
+        # 直接把环形缓冲区中的一段交给I2S，写完再释放空间；接收中缓冲区为空时get内部休眠等待
+        audio_chunk = pcm_ring.get(PLAY_CHUNK)
+        if audio_chunk is None:
+            # 没有回复在播放，休眠而不是空转
+            time.sleep(PLAYER_IDLE_SLEEP)
+            continue
         audio_out.write(audio_chunk)
+        pcm_ring.consume(len(audio_chunk))
         chunk_count += 1
 
 
-# ===================== TTS数据接收与解析 =====================
-def parse_sse_line(line_str):
-    """解析SSE数据行"""
-    if not line_str.startswith('data:'):
-        return None
+# ===================== TTS线程 =====================
+def queue_sentence(sentence):
+    """把一句交给TTS线程，大模型继续生成下一句"""
+    log.info("[Qwen] 分句: %s", sentence)
+    with buffer_lock:
+        tts_queue.append(sentence)
+
+
+def tts_worker():
+    """TTS线程：按顺序合成tts_queue中的句子，音频依次写入pcm_ring"""
+    global tts_busy
+    while True:
+        with buffer_lock:
+            text = tts_queue.pop(0) if tts_queue else None
+            tts_busy = text is not None
+        if text is None:
+            time.sleep(0.02)
+            continue
+        tts_api_call(text)
+
+
+def wait_tts():
+    """等待TTS线程合成完本轮的所有句子"""
+    while True:
+        with buffer_lock:
+            if not tts_queue and not tts_busy:
+                return
+        time.sleep(0.02)
 
-    json_str = line_str[5:]
-    if json_str == '[DONE]':
-        return {"type": "done"}
 
-    try:
-        return {"type": "data", "data": json.loads(json_str)}
-    except:
-        return None
+# ===================== TTS数据接收与解析 =====================
+def handle_tts_event(buf, start, end, count):
+    """处理buf[start:end]中的一条TTS事件：快速路径直接从缓冲区解码base64，形状不符时回退到完整JSON解析"""
+    event = tts_event.parse_event(buf, start, end)
+    if event is None:
+        return handle_chunk_data(json.loads(bytes(memoryview(buf)[start:end])), count)
+    data_start, data_end, finished = event
+    if finished:
+        return count, True
+    if data_end > data_start:
+        count = queue_audio(buf, data_start, data_end, count)
+    return count, False
 
 
 def handle_chunk_data(chunk, count):
@@ -343,154 +376,56 @@ def handle_chunk_data(chunk, count):
 
     audio_info = chunk["output"].get("audio", {})
     if "data" in audio_info:
-        # 解码音频数据
-        audio_bytes = ubinascii.a2b_base64(audio_info["data"])
-
-        # 添加到播放缓冲区
-        with buffer_lock:
-            audio_buffer.append(audio_bytes)
-        count += 1
-        print(f"[HTTP] base64的数据长度{len(audio_info['data'])} 解码后二进制数据长度{len(audio_bytes)} 缓冲区大小{len(audio_buffer)} ")
+        audio_b64 = audio_info["data"].encode()
+        count = queue_audio(audio_b64, 0, len(audio_b64), count)
     return count, False
 
 
-def stream_tts_response(sock):
-    """流式处理chunked数据：边接收、边解析、边播放"""
-    # 用于缓存未解析完成的SSE行
-    sse_buffer = ""
-    count = 0
-    is_done = False
-
-    print("[HTTP] 开始流式处理chunked数据...")
-
-    while not is_done:
-        # 1. 读取chunk大小行
-        size_line = b""
-        empty_read_count = 0
-        max_empty_reads = 20  # 最大连续空读取次数（大约400ms）
-        while b'\r\n' not in size_line:
-            chunk = sock.read(1)
-            if not chunk:
-                empty_read_count += 1
-                print(f"[HTTP] 中断{empty_read_count}次 {chunk}")
-                if empty_read_count > max_empty_reads:
-                    print(f"[HTTP] 连续{max_empty_reads}次读取为空，连接可能已断开")
-                    return count
-                # 短暂等待数据到达
-                time.sleep_ms(20)  # 20毫秒，足够网络数据到达
-                continue
-
-            empty_read_count = 0
-            size_line += chunk
-
-        # 2. 解析chunk大小（十六进制）
-        chunk_size_str = size_line.split(b'\r\n')[0].strip()
-        if not chunk_size_str:
-            continue
+def queue_audio(src, start, end, count):
+    """把src[start:end]的base64音频直接解码进PCM环形缓冲区，缓冲区满时阻塞（暂停读socket）直到播放端消耗"""
+    turn_trace.mark(TTS_FIRST)
+    total = pcm_ring.put_b64(src, start, end)
+    count += 1
+    log.debug("[HTTP] base64的数据长度%s 解码后二进制数据长度%s 缓冲区已用%s字节", end - start, total, pcm_ring.used())
+    return count
 
-        try:
-            chunk_size = int(chunk_size_str, 16)
-        except:
-            print(f"[HTTP] chunk大小解析失败: {chunk_size_str}")
-            continue
 
-        # 3. chunk大小为0表示结束
-        if chunk_size == 0:
-            print("[HTTP] 收到结束chunk (size=0)")
-            break
+def stream_tts_response(conn):
+    """流式处理chunked数据：边接收、边解析、边播放，HTTPReader负责chunk分帧"""
+    count = 0
+
+    log.debug("[HTTP] 开始流式处理chunked数据...")
 
-        # 4. 边读取边解析，避免阻塞播放线程
-        received = 0
-        while received < chunk_size:
-            # 每次只读取一小块数据，避免长时间阻塞
-            to_read = min(1024, chunk_size - received)
-            data = sock.read(to_read)
-            if not data:
-                break
-
-            # 5. 立即将读取的数据追加到SSE缓冲区并解码
-            chunk_data_str = data.decode('utf-8', 'ignore')
-            sse_buffer += chunk_data_str
-            received += len(data)
-
-            # 6. 立即解析缓冲区中的完整行，边解析边放入播放buffer
-            while '\n' in sse_buffer:
-                # 提取第一行
-                line_end = sse_buffer.find('\n')
-                line = sse_buffer[:line_end]
-                sse_buffer = sse_buffer[line_end + 1:]
-
-                line = line.strip()
-                if not line:
-                    continue
-
-                # 解析SSE行
-                parsed_line = parse_sse_line(line)
-                if not parsed_line:
-                    continue
-
-                if parsed_line["type"] == "done":
-                    print("[SSE] 收到[DONE]信号")
-                    is_done = True
-                    break
-
-                if parsed_line["type"] == "data":
-                    count, is_done = handle_chunk_data(parsed_line["data"], count)
-                    if is_done:
-                        print("[SSE] 收到完成信号")
-                        break
-
-            # 如果收到完成信号，提前结束读取
-            if is_done:
-                # 读取剩余的chunk数据以保持HTTP协议正确性
-                remaining = chunk_size - received
-                if remaining > 0:
-                    sock.read(remaining)
-                    received = chunk_size
-                break
-
-        # print(f"[HTTP] 接收chunk: 大小={chunk_size}, 实际={received}")
-
-        # 7. 读取chunk结尾的\r\n
-        sock.read(2)  # 读取\r\n
-
-        # 如果已完成，退出循环
+    parser = tts_parser
+    parser.reset()
+    parts = conn.body_parts()
+    # 按字节切出完整事件，整条事件一次解码，不会切断多字节字符
+    for payload in parser.parse(parts):
+        count, is_done = handle_tts_event(parser.buf, parser.payload_start, parser.payload_end, count)
         if is_done:
+            log.debug("[SSE] 收到完成信号")
             break
+    if parser.done:
+        log.debug("[SSE] 收到[DONE]信号")
 
-    # 处理缓冲区中剩余的最后一行数据
-    if sse_buffer.strip():
-        parsed_line = parse_sse_line(sse_buffer.strip())
-        if parsed_line and parsed_line["type"] == "data":
-            count, _ = handle_chunk_data(parsed_line["data"], count)
+    # 丢弃剩余数据直到结束chunk，保持连接可复用
+    for _ in parts:
+        pass
+    log.debug("[HTTP] 响应接收完成，readinto %s 次", conn.reads)
 
     return count
 
 
 def tts_api_call(text):
     """TTS API调用（播放线程已存在，只负责接收数据）"""
-    global tts_receiving_complete, audio_buffer
+    global tts_receiving_complete
 
-    print(f"[TTS] 开始播放: {text}")
+    log.info("[TTS] 开始播放: %s", text)
 
-    # 重置状态
-    with buffer_lock:
-        audio_buffer = []
+    # 重置状态（上一轮尚未播完的音频继续播放）
     tts_receiving_complete = False
 
 
-    # 建立SSL连接
-    addr_info = socket.getaddrinfo(API_HOST, 443)[0]
-    sock = socket.socket(addr_info[0], addr_info[1], addr_info[2])
-    sock.setsockopt(1, 8, RECV_BUFFER_SIZE)
-    sock.settimeout(30)
-    sock.connect(addr_info[-1])
-
-    import ssl
-
-    sock = ssl.wrap_socket(sock, server_hostname=API_HOST)
-    print("[API] SSL连接建立成功")
-
     # 构建TTS请求
     payload_dict = {
         "model": "qwen3-tts-flash",
@@ -499,64 +434,74 @@ def tts_api_call(text):
     }
     payload_bytes = json.dumps(payload_dict).encode('utf-8')
 
-    # 发送请求
     request_headers = (
         f"POST {API_PATH_TTS} HTTP/1.1\r\n"
         f"Host: {API_HOST}\r\n"
         f"Authorization: Bearer {API_KEY}\r\n"
         f"Content-Type: application/json\r\n"
         f"X-DashScope-SSE: enable\r\n"
-        f"Content-Length: {len(payload_bytes)}\r\n"
-        f"Connection: close\r\n\r\n"
+        f"Content-Length: {len(payload_bytes)}\r\n\r\n"
     )
 
-    sock.write(request_headers.encode('utf-8'))
-    sock.write(payload_bytes)
-    print(f"[TTS] 请求已发送，文本长度: {len(text)}")
-
-    # 接收HTTP响应头部
-    print("[TTS] 接收响应头部...")
-    headers = b""
-    while b'\r\n\r\n' not in headers:
-        chunk = sock.read(1)
-        if not chunk:
-            print("[TTS] 连接中断")
-            sock.close()
-            Pin(21, Pin.OUT).value(0)
-            return False
-        headers += chunk
-
-    header_text = headers.decode('utf-8')
-    print(f"[HTTP] 头部接收完成 ({len(headers)} 字节)")
+    def send(sock):
+        sock.write(request_headers.encode('utf-8'))
+        sock.write(payload_bytes)
+        log.debug("[TTS] 请求已发送，文本长度: %s", len(text))
+
+    # 发送请求并接收HTTP响应头部（复用长连接，失效时自动重连）
+    conn = api_pool.request(send)
+    if not conn.status:
+        log.error("[TTS] 连接中断")
+        api_pool.release(conn, False)
+        Pin(21, Pin.OUT).value(0)
+        return False
 
     # 检查HTTP状态码
-    if "200 OK" not in header_text:
-        print(f"[TTS] 错误响应: {header_text[:100]}")
-        sock.close()
+    if conn.status != 200:
+        log.error("[TTS] 错误响应: %s %s", conn.status, conn.read_body()[:100])
+        api_pool.release(conn, conn.keep_alive())
         Pin(21, Pin.OUT).value(0)
         return False
 
     # 流式处理数据（核心修改点）
     total_count = 0
-    if "transfer-encoding: chunked" in header_text.lower():
-        print("[HTTP] 检测到chunked编码，开始流式处理...")
+    if conn.chunked():
+        log.debug("[HTTP] 检测到chunked编码，开始流式处理...")
         # 流式处理chunked数据，边接收边播放
-        total_count = stream_tts_response(sock)
+        total_count = stream_tts_response(conn)
+    else:
+        conn.skip_body()
+    api_pool.release(conn, conn.keep_alive())
 
-    print(f"共接收了 {total_count} 个音频块")
+    log.debug("共接收了 %s 个音频块", total_count)
+    log.debug("[Pool] %s", api_pool.stats())
+    log.debug("[DNS] %s", dns_cache.cache.stats())
 
-    global tts_receiving_complete
     with buffer_lock:
         tts_receiving_complete = True
-    print("[TTS] 播放完成")
+    log.info("[TTS] 播放完成")
 
     return True
 
 
+def export_trace():
+    """结束本轮记录并导出：写flash文件，或打到串口"""
+    if not turn_trace.enabled:
+        return
+    turn_trace.end()
+    if TRACE_FILE:
+        turn_trace.export_file(TRACE_FILE)
+        log.info("[Trace] %s", turn_trace.summary())
+    else:
+        turn_trace.export(sys.stdout, "[Trace] ")
+
+
 def main():
-    global vad_threshold, conversation_history
+    global conversation_history
 
-    print("===== 语音助手启动 =====")
+    log.configure(LOG_LEVEL)
+    log.info("===== 语音助手启动 =====")
+    _thread.stack_size(THREAD_STACK)
     if not connect_wifi():
         return
 
@@ -564,29 +509,75 @@ def main():
     mic = init_microphone()
 
     # 动态计算VAD阈值
-    print("\n--- 计算环境噪音阈值 ---")
-    print("[VAD] 请保持安静，正在采集环境噪音...")
-    vad_threshold = calculate_vad_threshold(mic, VAD_INITIALIZATION_SECONDS)
-    print(f"[VAD] 阈值已设定为: {vad_threshold:.2f}")
-    print("[VAD] 现在可以开始说话了\n")
-
-    # 启动音频播放线程（长期存在）
-    _thread.start_new_thread(audio_player, ())
-    time.sleep(0.5)  # 等待播放线程初始化
+    log.info("\n--- 计算环境噪音阈值 ---")
+    log.info("[VAD] 请保持安静，正在采集环境噪音...")
+    noise_floor = calculate_noise_floor(mic, VAD_INITIALIZATION_SECONDS)
+    vad = AdaptiveVAD(noise_floor, VOICE_FRAMES, SILENCE_FRAMES, VAD_ONSET_RATIO, VAD_RELEASE_RATIO)
+    log.info("[VAD] 初始底噪: %.2f, 起始阈值: %.2f, 结束阈值: %.2f", vad.floor, vad.floor * VAD_ONSET_RATIO, vad.floor * VAD_RELEASE_RATIO)
+    log.info("[VAD] 现在可以开始说话了\n")
+
+    upload = None
+    if ASR_STREAMING:
+        upload = StreamingUpload(api_pool, API_HOST, API_PATH_ASR, API_KEY,
+                                 ASR_BITS, PCM_GAIN_SHIFT, SAMPLE_RATE, CHUNK_SIZE)
+
+    # 录音缓冲区在启动时一次性分配，之后采集不再申请内存
+    capture = CaptureBuffer(CHUNK_SIZE, PRE_ROLL_CHUNKS, COLLECT_SECONDS * SAMPLE_RATE * 4 // CHUNK_SIZE,
+                            audio_format.WAV_HEADER_SIZE)
+    log.info("[Mic] 录音缓冲区: %s字节", len(capture.buf))
+
+    if PLAYER_MODE == "irq":
+        # I2S回调从pcm_ring续数据，回调在主线程执行，不再需要播放线程
+        IRQPlayer(init_speaker(IRQ_IBUF), pcm_ring, PLAY_CHUNK).start()
+        log.info("[TTS] I2S回调播放已启动")
+    else:
+        # 启动音频播放线程（长期存在）
+        _thread.start_new_thread(audio_player, ())
+        time.sleep(0.5)  # 等待播放线程初始化
+
+    if QWEN_STREAMING:
+        _thread.start_new_thread(tts_worker, ())
 
     while True:
-        print("\n--- 新一轮对话 ---")
+        log.info("\n--- 新一轮对话 ---")
 
         # 采集用户语音
-        raw_audio = collect_audio(mic)
-        wav_data = create_wav(raw_audio)
+        collect_audio(mic, capture, vad, upload)
+        turn_start = ticks_ms()  # 首音时间从用户说完算起
+        turn_trace.begin(turn_start)
 
         # 语音识别
-        user_text = asr_api_call(wav_data)
+        if upload:
+            result = upload.result()
+            if upload.finished and not upload.error:
+                turn_trace.mark(ASR_SENT, upload.sent_at)
+                turn_trace.mark(ASR_DONE, upload.done_at)
+            user_text = parse_asr_result(result)
+        else:
+            # WAV在录音缓冲区内原地封装，不再复制整段音频
+            wav_data = capture.wav(ASR_BITS, SAMPLE_RATE, PCM_GAIN_SHIFT)
+            turn_trace.mark(WAV)
+            user_text = asr_api_call(wav_data)
 
         if user_text:
-            # 获取AI回复
-            ai_text = qwen_api_call(user_text)
+            # 一轮回复作为一段连续播放：句子之间TTS没跟上也计为欠载
+            pcm_ring.begin(turn_start)
+            if QWEN_STREAMING:
+                # 获取AI回复，边生成边把整句交给TTS线程
+                ai_text = qwen_api_call(user_text, queue_sentence)
+                wait_tts()
+            else:
+                # 获取AI回复，语音合成与播放
+                ai_text = qwen_api_call(user_text)
+                if ai_text:
+                    tts_api_call(ai_text)
+            pcm_ring.end()
+            while pcm_ring.jitter.first_audio < 0 and pcm_ring.used() > 1:
+                time.sleep(0.01)  # 回复短于起播水位时，接收结束后才开始播放
+            log.info("[Turn] %s", pcm_ring.stats())
+            turn_trace.set(I2S_FIRST, pcm_ring.jitter.first_audio)
+            # 不等播完：按缓冲区剩余字节数推算交完的时刻，开关追踪不改变流程
+            turn_trace.set(PLAY_END, ticks_diff(ticks_ms(), turn_trace.start) + pcm_ring.used() // pcm_ring.jitter.bytes_per_ms)
             if ai_text:
                 # 记录对话历史（用户+AI）
                 conversation_history.append({"role": "user", "content": user_text})
@@ -594,15 +585,15 @@ def main():
                 # 限制历史长度为最近10轮（20条消息）
                 if len(conversation_history) > 20:
                     conversation_history = conversation_history[-20:]
-
-                # 语音合成与播放（多线程非阻塞）
-                tts_api_call(ai_text)
+        else:
+            log.warning("[VAD] 本轮未识别到文本: %s", vad.stats())
+        export_trace()
 
         time.sleep(1)
 
     # 程序退出时关闭麦克风
     mic.deinit()
-    print("[Mic] 麦克风已关闭")
+    log.info("[Mic] 麦克风已关闭")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,708 @@
+import asyncio
+import json
+import socket
+import sys
+import time
+
+import audio_format
+import dns_cache
+import log
+import tts_event
+import vad_kernel
+from asr_upload import StreamingUpload
+from capture_buffer import CaptureBuffer
+from conn_pool import IDLE_TIMEOUT, WARM_WAIT
+from jitter_buffer import JitterBuffer, ticks_ms, ticks_diff
+from pcm_ring import PCMRing, B64_PIECE, POLL_INTERVAL, b64_size
+from sentence_splitter import SentenceSplitter
+from sse_parser import SSEParser
+from vad import AdaptiveVAD, VAD_START, VAD_END
+
+# 单事件循环的语音对话流水线（ESP32上的uasyncio与PC上的asyncio通用）
+#   采集、ASR上传、大模型、TTS接收、I2S播放各是一个协程任务，不再需要线程、锁和全局完成标志：
+#     采集 -> ASR：录音缓冲区本身就是队列，每录完一个chunk置一次事件，上传任务追着写到socket
+#     大模型 -> TTS：句子队列，每生成完整的一句就入队，TTS任务按顺序合成
+#     TTS -> 播放：PCM环形缓冲区，播放任务按抖动缓冲的节奏写I2S
+#   说话过程中ASR请求已在上传；第一句在播放时，后面的句子已在生成和合成
+#   所有网络读写都经asyncio的流对象，等待网络或I2S时其他任务照常运行
+#   ESP32上麦克风/扬声器用asyncio.StreamReader/StreamWriter包装I2S；PC上运行
+#     python chatbot_async.py
+#   使用按真实节奏产出语音的FakeMic、按采样率消耗数据的FakeSpeaker和mock_dashscope替身
+
+IS_MICROPYTHON = sys.implementation.name == "micropython"
+
+WIFI_SSID = "CMCC-huahua"
+WIFI_PASSWORD = "*HUAHUAshi1zhimao"
+API_KEY = 'sk-943f95da67d04893b70c02be400e2935' #不要使用2935
+COLLECT_SECONDS = 5  # 单次录音最长时长，决定启动时预分配的录音缓冲区大小
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 3200  # 每次读取50ms的32位样本
+PRE_ROLL_CHUNKS = 10
+ASR_BITS = 16
+PCM_GAIN_SHIFT = 0
+PREWARM_CONNECTIONS = 2  # ASR之后LLM与TTS任务同时各用一条
+VAD_INITIALIZATION_SECONDS = 2
+SILENCE_FRAMES = 10
+VOICE_FRAMES = 10
+VAD_ONSET_RATIO = 1.5
+VAD_RELEASE_RATIO = 1.2
+
+VOICE = "Cherry"
+LANGUAGE = "Chinese"
+
+API_HOST = "dashscope.aliyuncs.com"
+API_PATH_TTS = "/api/v1/services/aigc/multimodal-generation/generation"
+API_PATH_ASR = "/api/v1/services/aigc/multimodal-generation/generation"
+API_PATH_QWEN = "/compatible-mode/v1/chat/completions"
+
+I2S_SCK_PIN = 9
+I2S_WS_PIN = 10
+I2S_SD_PIN = 8
+AMP_ENABLE_PIN = 21
+TTS_SAMPLE_RATE = 24000
+TTS_BITS = 16
+SPEAKER_IBUF = 8192  # I2S内部缓冲区，抗抖动交给PCM环形缓冲区
+PCM_RING_SIZE = 96000
+PLAY_CHUNK = 4096
+TTS_START_MS = 200
+TTS_MAX_BUFFER_MS = 1000
+PLAYER_IDLE_SLEEP = 0.01  # 没有可播放数据时播放任务的休眠间隔（秒）
+SENTENCE_QUEUE = 8  # 句子队列长度，大模型领先TTS太多时暂停读取
+LOG_LEVEL = log.INFO  # 串口输出级别，改为log.DEBUG可看到连接池统计等细节
+
+BYTES_PER_MS = TTS_SAMPLE_RATE * TTS_BITS // 8 // 1000
+
+
+# ===================== 任务间队列 =====================
+class Queue:
+    """有界FIFO：满时put等待、空时get等待（uasyncio没有asyncio.Queue）
+    消费者出错退出时close(异常)，之后的put直接抛出该异常，生产者不会在满队列上永远等下去"""
+
+    def __init__(self, size):
+        self.size = size
+        self.items = []
+        self.changed = asyncio.Event()
+        self.error = None
+
+    def close(self, error):
+        self.error = error
+        self.changed.set()
+
+    async def put(self, item):
+        while len(self.items) >= self.size or self.error:
+            if self.error:
+                raise self.error
+            await self._wait()
+        self.items.append(item)
+        self.changed.set()
+
+    async def get(self):
+        while not self.items:
+            await self._wait()
+        item = self.items.pop(0)
+        self.changed.set()
+        return item
+
+    async def _wait(self):
+        # 协作式调度，检查条件与开始等待之间不会有其他任务插入
+        self.changed.clear()
+        await self.changed.wait()
+
+
+# ===================== 协程HTTP =====================
+class AsyncConn:
+    """一条HTTP/1.1长连接：请求由调用方直接写writer，响应头与正文在这里按协程读取"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.status = 0
+        self.headers = {}
+
+    async def read_head(self):
+        """读取状态行与响应头，返回状态码，连接已断开返回0"""
+        self.status = 0
+        self.headers = {}
+        line = await self.reader.readline()
+        if not line:
+            return 0
+        status = int(line.split(b" ", 2)[1])
+        while True:
+            line = await self.reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode('utf-8').partition(":")
+            self.headers[name.strip().lower()] = value.strip()
+        self.status = status
+        return status
+
+    def chunked(self):
+        return self.headers.get("transfer-encoding", "").lower() == "chunked"
+
+    def keep_alive(self):
+        if self.headers.get("connection", "").lower() == "close":
+            return False
+        return "content-length" in self.headers or self.chunked()
+
+    async def read_body(self, on_data=None):
+        """按长度信息读完正文；on_data为协程函数时逐段交给它（在其中等待即形成背压），否则返回完整正文"""
+        reader = self.reader
+        body = bytearray()
+        if self.chunked():
+            while True:
+                line = await reader.readline()
+                size = int(line.split(b";", 1)[0], 16) if line.strip() else 0
+                if not size:
+                    await reader.readline()  # 结束chunk后的空行（不支持trailer）
+                    break
+                data = await reader.readexactly(size)
+                await reader.readline()
+                if on_data:
+                    await on_data(data)
+                else:
+                    body.extend(data)
+        elif "content-length" in self.headers:
+            body = await reader.readexactly(int(self.headers["content-length"]))
+            if on_data:
+                await on_data(body)
+        else:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                if on_data:
+                    await on_data(data)
+                else:
+                    body.extend(data)
+        return bytes(body)
+
+    def close(self):
+        self.writer.close()
+
+
+async def resolve(host, port):
+    """事件循环里的DNS：只读dns_cache（过期时后台刷新），缓存里没有时
+    PC上交给loop.getaddrinfo在线程池里解析；uasyncio没有异步解析，设备上在启动事件循环前先解析一次"""
+    info = dns_cache.cache.cached(host, port)
+    if info:
+        return info
+    if IS_MICROPYTHON:
+        return dns_cache.resolve(host, port)
+    info = (await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM))[0]
+    dns_cache.cache.store(host, port, info)
+    return info
+
+
+class AsyncPool:
+    """conn_pool.ConnectionPool的协程版本：预连接是后台任务而不是线程，等连接时不阻塞其他任务"""
+
+    def __init__(self, host, port=443, tls=True, size=2, idle_timeout=IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.tls = tls
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.idle = []  # (AsyncConn, 放回时间)
+        self.warming = 0
+        # 统计
+        self.handshakes = 0
+        self.reused = 0
+        self.stale = 0
+        self.warmed = 0
+        self.expired = 0
+
+    async def connect(self):
+        """DNS经dns_cache缓存且不阻塞事件循环，TCP连接与TLS握手交给asyncio"""
+        self.handshakes += 1
+        ip = (await resolve(self.host, self.port))[-1][0]
+        if self.tls:
+            reader, writer = await asyncio.open_connection(ip, self.port, ssl=True, server_hostname=self.host)
+        else:
+            reader, writer = await asyncio.open_connection(ip, self.port)
+        return AsyncConn(reader, writer)
+
+    async def acquire(self):
+        """返回(AsyncConn, 是否复用)：后台正在握手时等它，优先复用未超时的空闲连接"""
+        now = time.time()
+        while self.warming and not self.idle and time.time() - now < WARM_WAIT:
+            await asyncio.sleep(0.01)
+        while self.idle:
+            conn, since = self.idle.pop()
+            if now - since < self.idle_timeout:
+                self.reused += 1
+                return conn, True
+            self.stale += 1
+            conn.close()
+        return await self.connect(), False
+
+    def release(self, conn, reusable=True):
+        if reusable and len(self.idle) < self.size:
+            self.idle.append((conn, time.time()))
+            return
+        conn.close()
+
+    def prewarm(self, count):
+        """启动后台任务建立连接，使空闲（含正在建立的）连接数达到count"""
+        self.reap()
+        missing = min(count, self.size) - len(self.idle) - self.warming
+        for _ in range(missing):
+            self.warming += 1
+            asyncio.create_task(self._warm())
+
+    async def _warm(self):
+        try:
+            conn = await self.connect()
+        except OSError as e:
+            log.warning("[Pool] 预连接失败: %s", e)
+            return
+        finally:
+            self.warming -= 1  # 失败也要减掉，否则acquire每次都白等WARM_WAIT
+        self.warmed += 1
+        self.release(conn)
+
+    def reap(self):
+        now = time.time()
+        for item in [item for item in self.idle if now - item[1] >= self.idle_timeout]:
+            self.idle.remove(item)
+            item[0].close()
+            self.expired += 1
+
+    async def request(self, send):
+        """await send(writer)写出完整请求并读取响应头；复用的连接在响应前断开时换新连接重发一次"""
+        conn, reused = await self.acquire()
+        try:
+            await send(conn.writer)
+            if not await conn.read_head() and reused:
+                log.warning("[Pool] 复用连接已被服务端关闭，重新连接")
+                self.stale += 1
+                conn.close()
+                conn = await self.connect()
+                await send(conn.writer)
+                await conn.read_head()
+        except BaseException:
+            conn.close()  # 出错或任务被取消时连接上留着半个请求，不能放回池里
+            raise
+        return conn
+
+    def stats(self):
+        return (f"握手={self.handshakes}, 预连接={self.warmed}, 复用={self.reused}, 失效={self.stale}, "
+                f"超时关闭={self.expired}, 空闲={len(self.idle)}")
+
+
+def post(path, host, payload, sse=False):
+    """JSON POST请求的完整字节"""
+    body = json.dumps(payload).encode('utf-8')
+    head = (
+        f"POST {path} HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        f"Authorization: Bearer {API_KEY}\r\n"
+        f"Content-Type: application/json\r\n"
+        + ("X-DashScope-SSE: enable\r\n" if sse else "")
+        + f"Content-Length: {len(body)}\r\n\r\n"
+    )
+    return head.encode('utf-8') + body
+
+
+# ===================== 流水线 =====================
+class VoicePipeline:
+    def __init__(self, mic, speaker, pool, host=API_HOST):
+        self.mic = mic  # 带协程readinto的音频源
+        self.speaker = speaker  # 带write/协程drain的音频输出
+        self.pool = pool
+        self.host = host
+        # 启动时一次性分配，之后每轮复用
+        self.capture = CaptureBuffer(CHUNK_SIZE, PRE_ROLL_CHUNKS, COLLECT_SECONDS * SAMPLE_RATE * 4 // CHUNK_SIZE,
+                                     audio_format.WAV_HEADER_SIZE)
+        self.upload = StreamingUpload(None, host, API_PATH_ASR, API_KEY, ASR_BITS, PCM_GAIN_SHIFT,
+                                      SAMPLE_RATE, CHUNK_SIZE)  # 只用它的流式编码
+        self.ring = PCMRing(PCM_RING_SIZE, JitterBuffer(TTS_START_MS, BYTES_PER_MS, TTS_MAX_BUFFER_MS))
+        self.chat_parser = SSEParser(2048)
+        self.tts_parser = SSEParser()
+        self.splitter = SentenceSplitter()
+        self.vad = None
+        self.captured = asyncio.Event()  # 录音缓冲区新增了chunk，或录音结束
+        self.ended = False
+        self.history = []
+        self.turns = []  # 每轮的(说话结束到识别结果, 首音)毫秒数
+
+    # ===================== 采集与识别 =====================
+    async def read_chunk(self, buf):
+        """读满一个chunk，I2S的流对象一次可能只给一部分"""
+        view = memoryview(buf)
+        got = 0
+        while got < len(buf):
+            got += await self.mic.readinto(view[got:])
+
+    async def calibrate(self, seconds):
+        """采集环境噪音，返回初始底噪"""
+        log.info("[VAD] 开始采集环境噪音，时长: %s秒...", seconds)
+        chunk = bytearray(CHUNK_SIZE)
+        values = []
+        for _ in range(int(seconds * SAMPLE_RATE * 4 / CHUNK_SIZE)):
+            await self.read_chunk(chunk)
+            values.append(vad_kernel.rms_i32(chunk))
+        avg = sum(values) / len(values)
+        log.info("[VAD] 环境噪音统计: 平均=%.2f, 最大=%.2f, 最小=%.2f", avg, max(values), min(values))
+        return avg
+
+    async def listen(self):
+        """采集一句话（端点逻辑同vad.vad_frames，读音频要await所以展开写）
+        检测到说话即预连接并启动ASR上传任务，说完后等识别结果，返回(说话结束时刻, 识别文本)"""
+        log.info("[ASR] 等待用户说话...")
+        capture, vad, pool = self.capture, self.vad, self.pool
+        capture.reset()
+        vad.reset()
+        asr = None
+        while True:
+            chunk = capture.slot()
+            await self.read_chunk(chunk)
+            event = vad.update(vad_kernel.rms_i32(chunk))
+            has_room = capture.advance()
+            if event == VAD_START:
+                log.info("[ASR] 检测到说话，开始录音并上传...")
+                capture.start_recording()
+                self.ended = False
+                # 录音期间网络空闲，提前完成握手，ASR/LLM/TTS直接用热连接
+                pool.prewarm(PREWARM_CONNECTIONS)
+                asr = asyncio.create_task(self.recognize())
+            elif not capture.recording:
+                pool.reap()
+            if capture.recording:
+                self.captured.set()
+                if event == VAD_END or not has_room:
+                    break
+        vad.reset()
+        self.ended = True
+        self.captured.set()
+        speech_end = ticks_ms()
+        log.info("[ASR] 录音结束: %s字节", len(capture.data()))
+        text = await asr
+        self.turns.append([ticks_diff(ticks_ms(), speech_end), -1])
+        return speech_end, text
+
+    async def recognize(self):
+        """ASR任务：请求体追着录音缓冲区写，连接失效重发时从头开始"""
+        upload, capture = self.upload, self.capture
+
+        async def send(writer):
+            upload.write_head(writer)
+            index = capture.start
+            while True:
+                ended = self.ended
+                if index < capture.head:
+                    upload.write_pcm(writer, capture.views[index])
+                    index += 1
+                    await writer.drain()
+                elif ended:
+                    break
+                else:
+                    self.captured.clear()
+                    await self.captured.wait()
+            upload.write_tail(writer)
+            await writer.drain()
+
+        conn = await self.pool.request(send)
+        try:
+            body = await conn.read_body()
+        except BaseException:
+            conn.close()
+            raise
+        self.pool.release(conn, conn.status != 0 and conn.keep_alive())
+        result = json.loads(body) if conn.status else None
+        if not result or not result.get('output', {}).get('choices'):
+            log.error("[ASR] 错误响应: %s", result)
+            return ""
+        text = result['output']['choices'][0]['message']['content'][0]['text']
+        log.info("[ASR] 识别: %s", text)
+        return text
+
+    # ===================== 对话与合成 =====================
+    async def respond(self, text, speech_end):
+        """大模型任务与TTS任务经句子队列并行，整轮回复作为一段连续播放"""
+        ring = self.ring
+        ring.begin(speech_end)
+        await self.reply(text)
+        ring.end()
+        while ring.jitter.first_audio < 0 and ring.used() > 1:
+            await asyncio.sleep(0.01)  # 回复短于起播水位时，接收结束后才开始播放
+        self.turns[-1][1] = ring.jitter.first_audio
+        log.info("[Turn] %s", ring.stats())
+        log.debug("[Pool] %s", self.pool.stats())
+
+    async def reply(self, text):
+        """生成并合成回复，音频经put_audio送出，记录对话历史"""
+        sentences = Queue(SENTENCE_QUEUE)
+        tts = asyncio.create_task(self.speak(sentences))
+        try:
+            reply = await self.chat(text, sentences)
+            await sentences.put(None)
+            await tts
+        finally:
+            if not tts.done():
+                tts.cancel()  # 大模型出错时TTS任务也停下，不留在后台占着连接
+            try:
+                await tts
+            except BaseException:
+                pass  # TTS的异常已经由上面的await或关闭的句子队列抛出
+        if reply:
+            self.history.append({"role": "user", "content": text})
+            self.history.append({"role": "assistant", "content": reply})
+            self.history = self.history[-20:]
+        return reply
+
+    async def chat(self, text, sentences):
+        """流式对话：增量文本送入分句器，完整的句子放进队列，返回完整回复"""
+        log.info("[Qwen] 调用API...")
+        messages = [{"role": "system", "content": "你是一个ai陪伴机器人，你的名字叫花花，请你和用户对话，每次对话返回的字数不必太多，20字左右就行"}]
+        messages.extend(self.history)
+        messages.append({"role": "user", "content": text})
+        request = post(API_PATH_QWEN, self.host, {"model": "qwen-plus", "messages": messages, "stream": True})
+
+        async def send(writer):
+            writer.write(request)
+            await writer.drain()
+
+        request_start = ticks_ms()
+        conn = await self.pool.request(send)
+        parser, splitter = self.chat_parser, self.splitter
+        parser.reset()
+        splitter.reset()
+        pieces = []
+
+        async def on_events(events):
+            for payload in events:
+                choices = json.loads(bytes(payload)).get("choices")
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if not delta:
+                    continue
+                if not pieces:
+                    log.info("[Qwen] 首个片段: %sms", ticks_diff(ticks_ms(), request_start))
+                pieces.append(delta)
+                for sentence in splitter.feed(delta):
+                    log.info("[Qwen] 分句: %s", sentence)
+                    await sentences.put(sentence)
+
+        async def on_data(data):
+            await on_events(parser.feed(data))
+
+        try:
+            if conn.status == 200:
+                await conn.read_body(on_data)
+                await on_events(parser.finish())
+            else:
+                log.error("[Qwen] 错误响应: %s %s", conn.status, (await conn.read_body())[:100])
+        except BaseException:
+            conn.close()  # 读到一半出错或被取消，连接不能再复用
+            raise
+        self.pool.release(conn, conn.status != 0 and conn.keep_alive())
+        last = splitter.flush()
+        if last:
+            await sentences.put(last)
+        reply = "".join(pieces)
+        log.info("[Qwen] 回复: %s", reply)
+        return reply
+
+    async def speak(self, sentences):
+        """TTS任务：按顺序合成句子队列中的句子，直到收到None；出错时关闭队列，让大模型任务也停下"""
+        try:
+            while True:
+                sentence = await sentences.get()
+                if sentence is None:
+                    return
+                await self.synthesize(sentence)
+        except Exception as e:
+            sentences.close(e)
+            raise
+
+    async def synthesize(self, text):
+        log.info("[TTS] 合成: %s", text)
+        request = post(API_PATH_TTS, self.host, {
+            "model": "qwen3-tts-flash",
+            "input": {"text": text},
+            "parameters": {"voice": VOICE, "language_type": LANGUAGE}
+        }, sse=True)
+
+        async def send(writer):
+            writer.write(request)
+            await writer.drain()
+
+        conn = await self.pool.request(send)
+        parser = self.tts_parser
+        parser.reset()
+
+        async def on_events(events):
+            for payload in events:
+                event = tts_event.parse_event(parser.buf, parser.payload_start, parser.payload_end)
+                if event is None:
+                    # 形状不符时回退到完整JSON解析
+                    audio = json.loads(bytes(payload)).get("output", {}).get("audio") or {}
+                    b64 = (audio.get("data") or "").encode()
+                    await self.put_audio(b64, 0, len(b64))
+                elif event[1] > event[0]:
+                    await self.put_audio(parser.buf, event[0], event[1])
+
+        async def on_data(data):
+            await on_events(parser.feed(data))
+
+        try:
+            if conn.status != 200:
+                log.error("[TTS] 错误响应: %s %s", conn.status, (await conn.read_body())[:100] if conn.status else '')
+                self.pool.release(conn, conn.status != 0 and conn.keep_alive())
+                return
+            await conn.read_body(on_data)
+            await on_events(parser.finish())
+        except BaseException:
+            conn.close()  # 设备断开（put_audio抛出）、上游中断或被取消，连接不能再复用
+            raise
+        self.pool.release(conn, conn.keep_alive())
+
+    async def put_audio(self, src, start, end):
+        """PCMRing.put_b64的协程版本：空间不足时让出事件循环，播放任务消耗后继续"""
+        ring = self.ring
+        while start < end:
+            stop = min(end, start + B64_PIECE)
+            n = b64_size(src, start, stop)
+            if ring.free() < n:
+                ring.full_waits += 1
+                while ring.free() < n:
+                    await asyncio.sleep(POLL_INTERVAL)
+            ring.write_b64(src, start, stop)
+            ring.peak = max(ring.peak, ring.used())
+            start = stop
+
+    # ===================== 播放 =====================
+    async def play(self):
+        """播放任务：按抖动缓冲的判断从pcm_ring取数据写I2S，drain期间其他任务照常运行"""
+        ring, speaker = self.ring, self.speaker
+        while True:
+            chunk = ring.poll(PLAY_CHUNK)
+            if chunk is None:
+                await asyncio.sleep(PLAYER_IDLE_SLEEP)
+                continue
+            speaker.write(chunk)
+            await speaker.drain()
+            ring.consume(len(chunk))
+
+    async def run(self, turns=0):
+        """对话主循环，turns为0时一直运行"""
+        player = asyncio.create_task(self.play())
+        noise_floor = await self.calibrate(VAD_INITIALIZATION_SECONDS)
+        self.vad = AdaptiveVAD(noise_floor, VOICE_FRAMES, SILENCE_FRAMES, VAD_ONSET_RATIO, VAD_RELEASE_RATIO)
+        log.info("[VAD] 现在可以开始说话了\n")
+        count = 0
+        while not turns or count < turns:
+            log.info("\n--- 新一轮对话 ---")
+            try:
+                speech_end, text = await self.listen()
+                if text:
+                    await self.respond(text, speech_end)
+            except OSError as e:
+                # 连接失败、被拒绝或中途断开只影响这一轮，与chatbot.py一样回去继续听
+                log.error("[Turn] 本轮网络出错: %r", e)
+                self.ring.end()
+                self.vad.reset()
+                self.ended = True
+                self.captured.set()
+            while self.ring.used() > 1:
+                await asyncio.sleep(0.05)  # 播完再听，避免录进自己的声音
+            count += 1
+        player.cancel()
+
+
+# ===================== ESP32 =====================
+def connect_wifi():
+    import network
+    wlan = network.WLAN(network.STA_IF)
+    wlan.active(True)
+    if not wlan.isconnected():
+        log.info("[WiFi] 正在连接: %s", WIFI_SSID)
+        wlan.connect(WIFI_SSID, WIFI_PASSWORD)
+        for _ in range(30):
+            if wlan.isconnected():
+                break
+            time.sleep(0.5)
+    if not wlan.isconnected():
+        log.error("[WiFi] 连接失败")
+        return False
+    log.info("[WiFi] 已连接，IP: %s", wlan.ifconfig()[0])
+    return True
+
+
+def device_io():
+    """I2S麦克风与扬声器包装成asyncio流对象"""
+    from machine import I2S, Pin
+    mic = I2S(0, sck=Pin(12), ws=Pin(13), sd=Pin(14), mode=I2S.RX, bits=32, format=I2S.MONO,
+              rate=SAMPLE_RATE, ibuf=48000)
+    Pin(AMP_ENABLE_PIN, Pin.OUT).value(1)  # 启用功放
+    speaker = I2S(1, sck=Pin(I2S_SCK_PIN), ws=Pin(I2S_WS_PIN), sd=Pin(I2S_SD_PIN), mode=I2S.TX,
+                  bits=TTS_BITS, format=I2S.MONO, rate=TTS_SAMPLE_RATE, ibuf=SPEAKER_IBUF)
+    return asyncio.StreamReader(mic), asyncio.StreamWriter(speaker, {})
+
+
+# ===================== PC替身 =====================
+class FakeMic:
+    """按真实节奏产出32位I2S数据，周期性地：静音 - 正弦语音 - 静音"""
+
+    def __init__(self, lead_s=2.5, speech_s=2.0, tail_s=1.0):
+        import math
+        import struct
+        self.index = 0
+        self.cycle = int((lead_s + speech_s + tail_s) * 20)
+        self.speech = range(int(lead_s * 20), int((lead_s + speech_s) * 20))
+        samples = CHUNK_SIZE // 4
+        tone = [int(8000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)) << 16 for i in range(samples)]
+        self.voice = struct.pack(f'<{samples}i', *tone)
+        self.silence = bytes(CHUNK_SIZE)
+
+    async def readinto(self, buf):
+        await asyncio.sleep(len(buf) / 4 / SAMPLE_RATE)
+        chunk = self.voice if self.index % self.cycle in self.speech else self.silence
+        buf[:] = chunk[:len(buf)]
+        self.index += 1
+        return len(buf)
+
+
+class FakeSpeaker:
+    """按采样率消耗数据：drain在内部缓冲区（ibuf）有空间时返回"""
+
+    def __init__(self, ibuf=SPEAKER_IBUF):
+        self.bytes_per_sec = TTS_SAMPLE_RATE * TTS_BITS // 8
+        self.ibuf = ibuf
+        self.play_until = 0.0  # 已写入数据播完的时刻
+        self.written = 0
+
+    def write(self, buf):
+        now = time.monotonic()
+        self.play_until = max(now, self.play_until) + len(buf) / self.bytes_per_sec
+        self.written += len(buf)
+
+    async def drain(self):
+        await asyncio.sleep(max(0.0, self.play_until - time.monotonic() - self.ibuf / self.bytes_per_sec))
+
+
+async def device_main():
+    log.info("===== 语音助手启动（asyncio） =====")
+    if not connect_wifi():
+        return
+    mic, speaker = device_io()
+    dns_cache.resolve(API_HOST, 443)  # 事件循环里只读缓存，首次解析在任务开始之前完成
+    await VoicePipeline(mic, speaker, AsyncPool(API_HOST)).run()
+
+
+async def host_main(turns):
+    from mock_dashscope import start_server
+    server, port = start_server()
+    pipeline = VoicePipeline(FakeMic(), FakeSpeaker(), AsyncPool("127.0.0.1", port, tls=False), "127.0.0.1")
+    await pipeline.run(turns)
+    log.info("\n===== 汇总 =====")
+    for i, (asr_ms, first_audio) in enumerate(pipeline.turns):
+        log.info("第%s轮: 说话结束到识别结果 %sms, 说话结束到首音 %sms", i + 1, asr_ms, first_audio)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    log.configure(LOG_LEVEL)
+    if IS_MICROPYTHON:
+        asyncio.run(device_main())
+    else:
+        asyncio.run(host_main(int(sys.argv[1]) if len(sys.argv) > 1 else 3))
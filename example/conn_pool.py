@@ -0,0 +1,149 @@
+import _thread
+import select
+import time
+
+import net
+import log
+from http_reader import HTTPReader
+
+# 长连接池：ASR、Qwen、TTS都发往同一个API_HOST，保持1~2条TLS连接跨调用复用
+#   每轮对话从三次握手降为零次（空闲超时或被服务端关闭后才重新握手）
+#   池中每条连接带一个HTTPReader，响应必须按Content-Length或chunked读完，连接才能放回池中
+#   prewarm在后台线程里提前完成DNS解析与TLS握手（检测到说话时调用，录音期间网络本来空闲），
+#   用不上的连接由reap在空闲超时后关闭，不长期占用TLS内存
+
+IDLE_TIMEOUT = 50  # 空闲超过该秒数的连接直接丢弃，避免撞上服务端的keep-alive超时
+WARM_WAIT = 10  # 没有空闲连接但后台正在握手时，最多等待该秒数再自己新建
+
+
+class ConnectionPool:
+    def __init__(self, host, port=443, tls=True, size=2, idle_timeout=IDLE_TIMEOUT, rcvbuf=0, buffer_size=2048):
+        self.host = host
+        self.port = port
+        self.tls = tls
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.rcvbuf = rcvbuf
+        self.buffer_size = buffer_size
+        self.idle = []  # (HTTPReader, 放回时间)
+        self.lock = _thread.allocate_lock()  # 预连接线程与调用方同时存取idle
+        self.warming = 0  # 后台正在建立的连接数
+        # 统计
+        self.handshakes = 0  # 新建连接（DNS + TCP + TLS握手）次数
+        self.reused = 0  # 复用空闲连接次数
+        self.stale = 0  # 复用前或复用时发现已失效的连接数
+        self.warmed = 0  # 后台预先建立的连接数
+        self.expired = 0  # 空闲超时被关闭的连接数
+
+    def connect(self):
+        self.handshakes += 1
+        return HTTPReader(net.open_connection(self.host, self.port, self.tls, rcvbuf=self.rcvbuf), self.buffer_size)
+
+    def acquire(self):
+        """取一条连接，返回(HTTPReader, 是否复用)：优先复用空闲连接，失效的直接关闭，没有就新建"""
+        now = time.time()
+        while self.warming and not self.idle and time.time() - now < WARM_WAIT:
+            time.sleep(0.01)  # 后台握手已经进行了一部分，等它比重新握手快
+        while self.idle:
+            with self.lock:
+                if not self.idle:
+                    break
+                conn, since = self.idle.pop()
+            if now - since < self.idle_timeout and not closed_by_peer(conn.sock):
+                self.reused += 1
+                return conn, True
+            self.stale += 1
+            conn.sock.close()
+        return self.connect(), False
+
+    def release(self, conn, reusable=True):
+        """响应已完整读完的连接放回池中，否则关闭"""
+        with self.lock:
+            if reusable and len(self.idle) < self.size:
+                self.idle.append((conn, time.time()))
+                return
+        conn.sock.close()
+
+    def prewarm(self, count):
+        """在后台建立连接，使空闲（含正在建立的）连接数达到count，不阻塞调用方"""
+        self.reap()
+        with self.lock:
+            missing = min(count, self.size) - len(self.idle) - self.warming
+            if missing <= 0:
+                return
+            self.warming += missing
+        _thread.start_new_thread(self._warm, (missing,))
+
+    def _warm(self, count):
+        for _ in range(count):
+            conn = None
+            try:
+                conn = self.connect()
+            except OSError as e:
+                log.warning("[Pool] 预连接失败: %s", e)
+            finally:
+                with self.lock:
+                    self.warming -= 1  # 失败也要减掉，否则acquire每次都白等WARM_WAIT
+            if conn:
+                self.warmed += 1
+                self.release(conn)
+
+    def reap(self):
+        """关闭空闲超时的连接"""
+        now = time.time()
+        with self.lock:
+            expired = [item for item in self.idle if now - item[1] >= self.idle_timeout]
+            for item in expired:
+                self.idle.remove(item)
+        for conn, _ in expired:
+            conn.sock.close()
+            self.expired += 1
+
+    def request(self, send):
+        """send(sock)写出完整请求并读取响应头；复用的连接在发送出错或响应前断开时换新连接重发一次
+        返回已读完响应头的HTTPReader，status为0表示没有收到响应；出错时连接已关闭"""
+        conn, reused = self.acquire()
+        try:
+            if reused:
+                try:
+                    if send_and_read_head(conn, send):
+                        return conn
+                    log.warning("[Pool] 复用连接已被服务端关闭，重新连接")
+                except OSError as e:
+                    log.warning("[Pool] 复用连接发送失败，重新连接: %s", e)
+                self.stale += 1
+                conn.sock.close()
+                conn = self.connect()
+            send_and_read_head(conn, send)
+        except Exception:
+            conn.sock.close()  # send自己抛出的异常（如取消）也不能漏掉连接
+            raise
+        return conn
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn, _ in idle:
+            conn.sock.close()
+
+    def stats(self):
+        return (f"握手={self.handshakes}, 预连接={self.warmed}, 复用={self.reused}, 失效={self.stale}, "
+                f"超时关闭={self.expired}, 空闲={len(self.idle)}")
+
+
+def send_and_read_head(conn, send):
+    send(conn.sock)
+    return conn.read_head()
+
+
+def closed_by_peer(sock):
+    """空闲连接可读时确认是否已断开：TLS握手后服务端可能补发会话票据，socket可读但没有应用数据
+    不等待地读一次：读到EOF、出错或意外的数据算失效，没有数据说明连接正常"""
+    poller = select.poll()
+    poller.register(sock, select.POLLIN)
+    events = poller.poll(0)
+    if not events:
+        return False
+    if events[0][1] & (select.POLLHUP | select.POLLERR):
+        return True
+    return net.read_nowait(sock) is not None
@@ -3,6 +3,7 @@ from machine import Pin, SPI, reset as machine_reset
 import gc9a01
 import time
 import gc
+import log
 
 # -------------------------- 双屏引脚硬编码（完全避开SPI属性访问） --------------------------
 # ========== Display1 配置（和你的单屏代码100%一致） ==========
@@ -70,12 +71,12 @@ def init_display(spi, dc_pin, cs_pin, reset_pin, backlight_pin, sck_pin, mosi_pi
     初始化屏幕（完全复用你的单屏逻辑，仅传入硬编码引脚号）
     """
     # 复位步骤添加打印
-    print("执行硬件复位...")
+    log.info("执行硬件复位...")
     reset_pin.value(0)
     time.sleep_ms(100)
     reset_pin.value(1)
     time.sleep_ms(200)
-    print("复位完成")
+    log.info("复位完成")
     # 2. 重新初始化SPI（直接用硬编码引脚，不访问SPI对象属性）
     spi.deinit()
     time.sleep_ms(50)
@@ -109,7 +110,7 @@ def init_display(spi, dc_pin, cs_pin, reset_pin, backlight_pin, sck_pin, mosi_pi
 def draw_demo(tft, screen_num):
     """绘制演示内容，区分双屏"""
     tft.fill(gc9a01.WHITE)
-    print(f"Display{screen_num} 填充白色，验证点亮！")
+    log.info("Display%s 填充白色，验证点亮！", screen_num)
     time.sleep(1)
 
     if screen_num == 1:
@@ -126,7 +127,7 @@ def draw_demo(tft, screen_num):
     tft.fill(gc9a01.BLACK)
     tft.line(0, 120, 239, 120, gc9a01.WHITE)
     tft.line(120, 0, 120, 239, gc9a01.WHITE)
-    print(f"Display{screen_num} 绘制十字线，显示正常！")
+    log.info("Display%s 绘制十字线，显示正常！", screen_num)
 
 # -------------------------- 主程序（复用你的单屏异常处理） --------------------------
 if __name__ == "__main__":
@@ -136,25 +137,25 @@ if __name__ == "__main__":
         gc.collect()
 
         # 初始化Display1（传入硬编码引脚号）
-        print("开始初始化Display1（强制硬件复位）...")
+        log.info("开始初始化Display1（强制硬件复位）...")
         tft1 = init_display(spi1, dc1_pin, cs1_pin, reset1_pin, backlight1_pin, sck1, mosi1)
-        print("Display1 初始化完成！")
+        log.info("Display1 初始化完成！")
 
         # 初始化Display2（传入硬编码引脚号）
-        print("开始初始化Display2（强制硬件复位）...")
+        log.info("开始初始化Display2（强制硬件复位）...")
         tft2 = init_display(spi2, dc2_pin, cs2_pin, reset2_pin, backlight2_pin, sck2, mosi2)
-        print("Display2 初始化完成！")
+        log.info("Display2 初始化完成！")
 
         # 演示绘制
         draw_demo(tft1, 1)
         draw_demo(tft2, 2)
-        print("双屏点亮演示完成！")
+        log.info("双屏点亮演示完成！")
 
         while True:
             time.sleep(1)
 
     except Exception as e:
-        print(f"运行出错：{e}")
+        log.error("运行出错：%s", e)
         # 释放所有资源（和你的单屏逻辑一致）
         backlight1_pin.value(0)
         backlight2_pin.value(0)
@@ -0,0 +1,105 @@
+import _thread
+import socket
+import time
+
+import log
+
+# 设备端所有连接共用的DNS缓存：net.open_connection统一经这里解析
+#   getaddrinfo拿不到记录的TTL，按配置的ttl认为有效；有效期过了REFRESH_AT比例后在后台线程重新解析，
+#   调用方继续用旧地址，不必等DNS
+#   过期后同步重新解析；解析失败时回退到最后一次成功的地址（服务器IP很少变化，比直接失败好）
+
+DNS_TTL = 300  # 缓存有效期（秒）
+REFRESH_AT = 0.8  # 有效期过了这个比例就后台刷新
+
+
+class DNSCache:
+    def __init__(self, ttl=DNS_TTL, refresh_at=REFRESH_AT):
+        self.ttl = ttl
+        self.refresh_at = refresh_at
+        self.entries = {}  # (host, port) -> (getaddrinfo的第一项, 解析时间)
+        self.refreshing = set()
+        self.lock = _thread.allocate_lock()
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0  # 后台刷新成功的次数
+        self.fallbacks = 0  # 解析失败后使用旧地址的次数
+
+    def resolve(self, host, port):
+        """返回getaddrinfo(host, port, 0, SOCK_STREAM)的第一项"""
+        key = (host, port)
+        entry = self.entries.get(key)
+        if entry:
+            age = time.time() - entry[1]
+            if age < self.ttl:
+                self.hits += 1
+                if age >= self.ttl * self.refresh_at:
+                    self._refresh_async(key)
+                return entry[0]
+        self.misses += 1
+        info = self._lookup(key)
+        if info:
+            return info
+        if not entry:
+            raise OSError(f"DNS解析失败: {host}")
+        self.fallbacks += 1
+        log.warning("[DNS] 解析%s失败，使用上次的地址", host)
+        return entry[0]
+
+    def cached(self, host, port):
+        """不做同步解析：返回缓存中的地址，过期的也照样返回并在后台重新解析；没有记录返回None
+        供事件循环里调用，解析不会卡住其他协程"""
+        key = (host, port)
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+        self.hits += 1
+        if time.time() - entry[1] >= self.ttl * self.refresh_at:
+            self._refresh_async(key)
+        return entry[0]
+
+    def store(self, host, port, info):
+        """写入在别处解析好的地址（如asyncio的loop.getaddrinfo）"""
+        self.entries[(host, port)] = (info, time.time())
+
+    def _lookup(self, key):
+        """解析并更新缓存，失败返回None"""
+        try:
+            info = socket.getaddrinfo(key[0], key[1], 0, socket.SOCK_STREAM)[0]
+        except OSError:
+            return None
+        self.entries[key] = (info, time.time())
+        return info
+
+    def _refresh_async(self, key):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+        try:
+            _thread.start_new_thread(self._refresh, (key,))
+        except Exception as e:
+            self._done(key)  # 线程没起来，继续用旧地址，下次再试
+            log.warning("[DNS] 后台刷新未能启动: %s", e)
+
+    def _refresh(self, key):
+        try:
+            if self._lookup(key):
+                self.refreshes += 1
+        finally:
+            self._done(key)  # 无论成败都要移除，否则这个域名再也不会后台刷新
+
+    def _done(self, key):
+        with self.lock:
+            self.refreshing.discard(key)
+
+    def stats(self):
+        return f"命中={self.hits}, 未命中={self.misses}, 后台刷新={self.refreshes}, 回退={self.fallbacks}"
+
+
+cache = DNSCache()
+
+
+def resolve(host, port):
+    return cache.resolve(host, port)
@@ -0,0 +1,162 @@
+import binascii
+import json
+import time
+import network
+import machine
+from machine import I2S, Pin
+import net
+import log
+import vad_kernel
+import gateway_proto
+from gateway_proto import HELLO, AUDIO, END, TEXT, PCM, DONE
+from capture_buffer import CaptureBuffer
+from pcm_ring import PCMRing
+from i2s_player import IRQPlayer, IRQ_IBUF
+from jitter_buffer import JitterBuffer, ticks_ms
+from vad import AdaptiveVAD, VAD_START, VAD_END, VAD_FULL, vad_frames
+
+# 语音网关的设备端：不做TLS、base64和JSON编解码，只在本地做VAD
+#   说话期间把录音chunk原样（32位I2S数据）经明文TCP推给voice_gateway.py，
+#   说完后收网关发回的24kHz 16位PCM，直接从socket读进播放环形缓冲区，由I2S回调播放
+#   相比chatbot.py省掉了三条TLS连接的内存和所有base64/JSON处理
+
+WIFI_SSID = "CMCC-huahua"
+WIFI_PASSWORD = "*HUAHUAshi1zhimao"
+GATEWAY_HOST = "192.168.1.100"  # 运行voice_gateway.py的电脑
+GATEWAY_PORT = 9000
+COLLECT_SECONDS = 5
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 3200  # 每次读取50ms的32位样本，与网关约定的AUDIO帧大小
+PRE_ROLL_CHUNKS = 10
+VAD_INITIALIZATION_SECONDS = 2
+SILENCE_FRAMES = 10
+VOICE_FRAMES = 10
+VAD_ONSET_RATIO = 1.5
+VAD_RELEASE_RATIO = 1.2
+
+I2S_SCK_PIN = 9
+I2S_WS_PIN = 10
+I2S_SD_PIN = 8
+AMP_ENABLE_PIN = 21
+TTS_SAMPLE_RATE = 24000
+TTS_BITS = 16
+PCM_RING_SIZE = 96000
+PLAY_CHUNK = 4096
+TTS_START_MS = 200
+TTS_MAX_BUFFER_MS = 1000
+
+pcm_ring = PCMRing(PCM_RING_SIZE, JitterBuffer(TTS_START_MS, TTS_SAMPLE_RATE * TTS_BITS // 8 // 1000, TTS_MAX_BUFFER_MS))
+
+
+def connect_wifi():
+    wlan = network.WLAN(network.STA_IF)
+    wlan.active(True)
+    if not wlan.isconnected():
+        log.info("[WiFi] 正在连接: %s", WIFI_SSID)
+        wlan.connect(WIFI_SSID, WIFI_PASSWORD)
+        for _ in range(30):
+            if wlan.isconnected():
+                break
+            time.sleep(0.5)
+    if not wlan.isconnected():
+        log.error("[WiFi] 连接失败")
+        return False
+    log.info("[WiFi] 已连接，IP: %s", wlan.ifconfig()[0])
+    return True
+
+
+def init_microphone():
+    mic = I2S(0, sck=Pin(12), ws=Pin(13), sd=Pin(14), mode=I2S.RX, bits=32, format=I2S.MONO,
+              rate=SAMPLE_RATE, ibuf=48000)
+    chunk = bytearray(CHUNK_SIZE)
+    for _ in range(20):  # 丢弃初始化噪音
+        mic.readinto(chunk)
+    return mic
+
+
+def calculate_noise_floor(mic, seconds):
+    chunk = bytearray(CHUNK_SIZE)
+    values = []
+    for _ in range(int(seconds * SAMPLE_RATE * 4 / CHUNK_SIZE)):
+        mic.readinto(chunk)
+        values.append(vad_kernel.rms_i32(chunk))
+    return sum(values) / len(values)
+
+
+def init_speaker():
+    Pin(AMP_ENABLE_PIN, Pin.OUT).value(1)  # 启用功放
+    return I2S(1, sck=Pin(I2S_SCK_PIN), ws=Pin(I2S_WS_PIN), sd=Pin(I2S_SD_PIN), mode=I2S.TX,
+               bits=TTS_BITS, format=I2S.MONO, rate=TTS_SAMPLE_RATE, ibuf=IRQ_IBUF)
+
+
+def stream_speech(sock, mic, capture, vad):
+    """等待说话，检测到后先补发预缓存，之后每录一个chunk发一帧，说完发END"""
+    log.info("[ASR] 等待用户说话...")
+    for chunk, rms, event in vad_frames(mic, capture, vad, vad_kernel.rms_i32):
+        if event == VAD_START:
+            log.info("[ASR] 检测到说话")
+            for index in range(capture.start, capture.head):
+                gateway_proto.write_frame(sock, AUDIO, capture.views[index])
+        elif capture.recording:
+            gateway_proto.write_frame(sock, AUDIO, chunk)
+        if event == VAD_END or event == VAD_FULL:
+            break
+    gateway_proto.write_frame(sock, END)
+    log.info("[ASR] 说话结束: %s字节", len(capture.data()))
+
+
+def receive_reply(sock):
+    """读到DONE为止：文本帧打印，PCM帧直接读进播放缓冲区（缓冲区满时暂停读socket）
+    网关断开时抛出EOFError，不认识的帧按长度跳过"""
+    while True:
+        kind, length = gateway_proto.read_header(sock)
+        if kind == PCM:
+            if pcm_ring.recv_into(sock, length) < length:
+                raise EOFError("网关已关闭连接")
+        elif kind == TEXT:
+            payload = gateway_proto.read_exact(sock, length)
+            if len(payload) < length:
+                raise EOFError("网关已关闭连接")
+            log.info("[Gateway] %s", json.loads(payload))
+        elif kind == DONE:
+            return
+        else:
+            log.warning("[Gateway] 跳过未知帧: 类型=%s, 长度=%s", kind, length)
+            gateway_proto.skip(sock, length)
+
+
+def main():
+    log.info("===== 语音网关客户端启动 =====")
+    if not connect_wifi():
+        return
+    mic = init_microphone()
+    vad = AdaptiveVAD(calculate_noise_floor(mic, VAD_INITIALIZATION_SECONDS), VOICE_FRAMES, SILENCE_FRAMES,
+                      VAD_ONSET_RATIO, VAD_RELEASE_RATIO)
+    capture = CaptureBuffer(CHUNK_SIZE, PRE_ROLL_CHUNKS, COLLECT_SECONDS * SAMPLE_RATE * 4 // CHUNK_SIZE)
+    player = IRQPlayer(init_speaker(), pcm_ring, PLAY_CHUNK)
+    player.start()
+
+    sock = net.open_connection(GATEWAY_HOST, GATEWAY_PORT, tls=False)
+    gateway_proto.write_frame(sock, HELLO, binascii.hexlify(machine.unique_id()))
+    log.info("[Gateway] 已连接 %s:%s", GATEWAY_HOST, GATEWAY_PORT)
+
+    while True:
+        log.info("\n--- 新一轮对话 ---")
+        stream_speech(sock, mic, capture, vad)
+        pcm_ring.begin(ticks_ms())  # 首音时间从说完算起
+        try:
+            receive_reply(sock)
+        except EOFError as e:
+            log.error("[Gateway] 连接中断: %s", e)
+            pcm_ring.end()
+            player.stop()
+            sock.close()
+            return
+        pcm_ring.end()
+        while pcm_ring.used() > 1:
+            time.sleep(0.05)  # 播完再听，避免录进自己的声音
+        log.info("[Turn] %s, %s", pcm_ring.stats(), player.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# 设备与语音网关之间的帧格式（局域网明文TCP）：1字节类型 + 4字节大端长度 + 负载
+#   设备 -> 网关：HELLO(设备ID) AUDIO(一个录音chunk：16kHz 32位I2S原始数据，CHUNK_SIZE字节) END(说话结束)
+#   网关 -> 设备：TEXT(JSON，识别文本/回复文本) PCM(24kHz 16位单声道) DONE(本轮回复结束)
+#   设备说话结束后一直读到DONE为止，识别为空时网关也发DONE
+#   不认识的类型按长度跳过，以后加新帧时旧设备照样能用
+
+HELLO = 0x48  # 'H'
+AUDIO = 0x41  # 'A'
+END = 0x45  # 'E'
+TEXT = 0x54  # 'T'
+PCM = 0x50  # 'P'
+DONE = 0x44  # 'D'
+
+HEADER_SIZE = 5
+
+
+def header(kind, length):
+    return bytes((kind,)) + length.to_bytes(4, 'big')
+
+
+def parse_header(head):
+    """返回(类型, 负载长度)"""
+    return head[0], int.from_bytes(head[1:5], 'big')
+
+
+def write_frame(stream, kind, payload=b""):
+    stream.write(header(kind, len(payload)))
+    if payload:
+        stream.write(payload)
+
+
+def read_header(stream):
+    """读一个帧头，返回(类型, 负载长度)；对端关闭时抛出EOFError"""
+    head = read_exact(stream, HEADER_SIZE)
+    if len(head) < HEADER_SIZE:
+        raise EOFError("对端已关闭连接")
+    return parse_header(head)
+
+
+def skip(stream, n, scratch=None):
+    """丢弃n字节负载（不认识的帧），对端关闭时抛出EOFError"""
+    scratch = scratch or bytearray(256)
+    view = memoryview(scratch)
+    while n > 0:
+        count = stream.readinto(view[:min(n, len(scratch))])
+        if not count:
+            raise EOFError("对端已关闭连接")
+        n -= count
+
+
+def read_exact(stream, n):
+    """阻塞读满n字节（CPython的socket文件对象可能短读），对端关闭时返回已读到的部分"""
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        count = stream.readinto(view[got:])
+        if not count:
+            return bytes(view[:got])
+        got += count
+    return bytes(buf)
@@ -0,0 +1,156 @@
+import sys
+
+# 带缓冲的HTTP/1.1响应读取：一块可复用的bytearray + readinto，解析状态行、响应头、Content-Length与chunked正文
+#   MicroPython的阻塞socket没有"短读"，readinto会等满请求的字节数才返回，
+#   所以exact模式下每次只读"已知一定会到达"的字节数（响应头结束标记剩余部分、chunk剩余数据、chunk头的最小长度），
+#   既不会卡在等待服务端的下一条数据上，又比逐字节读取少得多的系统调用
+#   CPython有短读，直接读满缓冲区空闲部分
+
+IS_MICROPYTHON = sys.implementation.name == "micropython"
+HEAD_END = b"\r\n\r\n"
+CHUNK_TAIL = 2  # chunk数据后面紧跟的"\r\n"；下一个chunk可能要等服务端产出下一条数据，不能预读
+
+
+class HTTPReader:
+    def __init__(self, sock, size=2048, exact=IS_MICROPYTHON):
+        self.sock = sock
+        self.size = size
+        self.exact = exact
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.start = 0  # 未消费数据的起点
+        self.end = 0  # 已读入数据的终点
+        self.status = 0
+        self.headers = {}
+        self.reads = 0  # readinto调用次数
+
+    def _fill(self, need):
+        """向缓冲区补充数据，返回读到的字节数，0表示连接已关闭"""
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.end == self.size:
+            pending = self.end - self.start
+            self.mv[:pending] = bytes(self.mv[self.start:self.end])
+            self.start, self.end = 0, pending
+        space = self.size - self.end
+        n = min(space, need) if self.exact else space
+        got = self.sock.readinto(self.mv[self.end:self.end + n]) or 0
+        self.reads += 1
+        self.end += got
+        return got
+
+    # ===================== 响应头 =====================
+    def read_head(self):
+        """读取状态行与响应头，返回状态码，连接已断开返回0"""
+        self.start = self.end = 0
+        self.status = 0
+        self.headers = {}
+        matched = 0  # 已匹配的"\r\n\r\n"字节数
+        scan = 0
+        while matched < 4:
+            if self.end == self.size:
+                raise ValueError("响应头超过缓冲区大小")
+            if not self._fill(4 - matched):
+                return 0
+            while scan < self.end and matched < 4:
+                byte = self.buf[scan]
+                if byte == HEAD_END[matched]:
+                    matched += 1
+                else:
+                    matched = 1 if byte == 13 else 0
+                scan += 1
+        lines = bytes(self.mv[:scan - 4]).decode('utf-8').split("\r\n")
+        self.start = scan
+        self.status = int(lines[0].split(" ", 2)[1])
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            self.headers[name.strip().lower()] = value.strip()
+        return self.status
+
+    def chunked(self):
+        return self.headers.get("transfer-encoding", "").lower() == "chunked"
+
+    def keep_alive(self):
+        """响应有明确长度且服务端没要求关闭时，连接可以复用"""
+        if self.headers.get("connection", "").lower() == "close":
+            return False
+        return "content-length" in self.headers or self.chunked()
+
+    # ===================== 正文 =====================
+    def body_parts(self):
+        """逐段产出正文数据的memoryview（指向内部缓冲区，下一次迭代前有效），按长度信息读到正文结束为止"""
+        if self.chunked():
+            while True:
+                line = self._read_line(3)
+                size = int(line.split(b";", 1)[0], 16) if line else 0
+                if not size:
+                    self._read_line(2)  # 结束chunk后的空行（不支持trailer）
+                    return
+                for part in self._exact_parts(size, CHUNK_TAIL):
+                    yield part
+                self._read_line(2)  # chunk数据后的\r\n
+        elif "content-length" in self.headers:
+            for part in self._exact_parts(int(self.headers["content-length"]), 0):
+                yield part
+        else:
+            while self.start < self.end or self._fill(self.size):
+                part = self.mv[self.start:self.end]
+                self.start = self.end
+                yield part
+
+    def read_body(self):
+        """读取完整正文：已知长度时一次分配到位，否则追加到bytearray"""
+        if "content-length" not in self.headers:
+            body = bytearray()
+            for part in self.body_parts():
+                body.extend(part)
+            return bytes(body)
+        body = bytearray(int(self.headers["content-length"]))
+        view = memoryview(body)
+        offset = 0
+        for part in self.body_parts():
+            view[offset:offset + len(part)] = part
+            offset += len(part)
+        return bytes(view[:offset])
+
+    def skip_body(self):
+        for _ in self.body_parts():
+            pass
+
+    def _exact_parts(self, size, tail):
+        """已知长度的一段数据，tail为其后一定会到达的字节数"""
+        remaining = size
+        while remaining:
+            if self.start == self.end and not self._fill(remaining + tail):
+                return
+            take = min(remaining, self.end - self.start)
+            part = self.mv[self.start:self.start + take]
+            self.start += take
+            remaining -= take
+            yield part
+
+    def _line_end(self):
+        """缓冲区中下一个换行符的位置，没有返回-1"""
+        for i in range(self.start, self.end):
+            if self.buf[i] == 10:
+                return i
+        return -1
+
+    def _read_line(self, first):
+        """读取一行短行（chunk头、空行），返回去掉换行的bytes，连接断开返回None
+        first为缓冲区为空时这一行至少还有的字节数"""
+        while True:
+            end = self._line_end()
+            if end >= 0:
+                line = bytes(self.mv[self.start:end])
+                self.start = end + 1
+                return line.rstrip(b"\r")
+            # 已读到行尾"\r"时只差"\n"，否则至少还有"\r\n"
+            if self.start == self.end:
+                need = first
+            elif self.buf[self.end - 1] == 13:
+                need = 1
+            else:
+                need = 2
+            if not self._fill(need):
+                return None
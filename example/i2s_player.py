@@ -0,0 +1,49 @@
+# 非阻塞I2S播放：给I2S设置irq回调后write变为非阻塞，每段数据发完触发一次回调，
+# 在回调里释放上一段、从PCM环形缓冲区取下一段交给I2S，不再需要单独阻塞在write上的播放线程
+#   ESP32上回调经micropython.schedule在主线程的字节码间隙执行（包括time.sleep期间），
+#   所以接收线程阻塞在socket或等待缓冲区空间时，回调照样按时续数据
+#   交给I2S的是环形缓冲区内的memoryview，回调发生（数据已发完）之前不能释放这段空间
+#   没有可播放的数据时写一段静音，保持回调链不断；起播与欠载仍由PCM环形缓冲区的抖动缓冲决定
+#   I2S的ibuf要配小：回调在数据拷进ibuf后就触发，空闲时写入的静音会把ibuf填满，
+#   ibuf有多长，下一段回复的首音就被静音推迟多久；抗抖动交给PCM环形缓冲区，而不是ibuf
+
+IRQ_IBUF = 8192  # IRQ模式下I2S内部缓冲区字节数（24kHz 16位约170ms）
+IDLE_SILENCE = 1024  # 空闲时每次写入的静音字节数（约20ms）
+
+
+class IRQPlayer:
+    def __init__(self, i2s, ring, chunk_size=4096, silence=IDLE_SILENCE):
+        self.i2s = i2s
+        self.ring = ring
+        self.chunk_size = chunk_size
+        self.silence = bytearray(silence)
+        self.in_flight = 0  # 已交给I2S、尚未发完的环形缓冲区字节数
+        # 统计
+        self.refills = 0  # 回调次数
+        self.silent = 0  # 其中写静音的次数
+        self.played = 0  # 播放的PCM字节数
+
+    def start(self):
+        self.i2s.irq(self._refill)
+        self._refill(self.i2s)
+
+    def stop(self):
+        self.i2s.irq(None)
+
+    def _refill(self, _):
+        """I2S回调：上一段已发完，释放它并交出下一段"""
+        if self.in_flight:
+            self.ring.consume(self.in_flight)
+            self.played += self.in_flight
+            self.in_flight = 0
+        self.refills += 1
+        chunk = self.ring.poll(self.chunk_size)
+        if chunk is None:
+            self.silent += 1
+            self.i2s.write(self.silence)
+            return
+        self.in_flight = len(chunk)
+        self.i2s.write(chunk)
+
+    def stats(self):
+        return f"回调={self.refills}, 静音={self.silent}, 播放={self.played}字节"
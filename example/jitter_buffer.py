@@ -0,0 +1,82 @@
+import sys
+import time
+
+# TTS播放的抖动缓冲策略：只做起播/重缓冲决策与计时，不持有数据
+#   缓冲的音频达到起播水位才开始播放，网络短暂停顿被缓冲吸收而不是变成断音
+#   播放中被播空（欠载）后重新缓冲，并把水位按倍数调高（不超过上限），这一段回复内更不容易再次卡顿
+#   每段回复统计首音时间、欠载次数、卡顿总时长
+
+IS_MICROPYTHON = sys.implementation.name == "micropython"
+
+if IS_MICROPYTHON:
+    from time import ticks_ms, ticks_diff
+else:
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+
+class JitterBuffer:
+    def __init__(self, start_ms, bytes_per_ms, max_ms=1000, grow=1.5):
+        self.start_ms = start_ms  # 起播水位（毫秒）
+        self.bytes_per_ms = bytes_per_ms
+        self.max_ms = max_ms  # 水位上限，调用方保证上限对应的字节数小于缓冲区容量
+        self.grow = grow
+        self.watermark_ms = start_ms
+        self.buffering = True  # 正在攒数据，尚未（重新）起播
+        self.since = ticks_ms()
+        self.stall_since = None
+        # 统计（每段回复开始时清零）
+        self.first_audio = -1  # 首音时间（毫秒），-1表示尚未出声
+        self.underruns = 0
+        self.stall_ms = 0
+
+    def begin(self, since=None):
+        """一段回复开始，since为请求发出的时刻（ticks_ms），首音时间从这里算起"""
+        self.since = ticks_ms() if since is None else since
+        self.watermark_ms = self.start_ms
+        self.buffering = True
+        self.stall_since = None
+        self.first_audio = -1
+        self.underruns = 0
+        self.stall_ms = 0
+
+    def ready(self, buffered, producing):
+        """消费者当前能否取数据播放：buffered为已缓冲字节数，producing为生产者是否仍在写入
+        播放中缓冲被播空且生产者仍在写入时记为欠载并进入重缓冲"""
+        if self.buffering:
+            # 生产者已结束时剩余数据不必等水位
+            if buffered < self.watermark_ms * self.bytes_per_ms and (producing or not buffered):
+                return False
+            self.buffering = False
+            now = ticks_ms()
+            if self.first_audio < 0:
+                self.first_audio = ticks_diff(now, self.since)
+            if self.stall_since is not None:
+                self.stall_ms += ticks_diff(now, self.stall_since)
+                self.stall_since = None
+            return True
+        if buffered:
+            return True
+        if producing:
+            self.underrun()
+        return False
+
+    def underrun(self, since=None):
+        """播放中缓冲被播空：since为实际播空的时刻，默认为现在"""
+        self.underruns += 1
+        self.buffering = True
+        self.stall_since = ticks_ms() if since is None else since
+        self.watermark_ms = min(self.max_ms, max(self.watermark_ms, 20) * self.grow)
+
+    def end(self):
+        """生产者写完，尚未结束的卡顿计到现在"""
+        if self.stall_since is not None:
+            self.stall_ms += ticks_diff(ticks_ms(), self.stall_since)
+            self.stall_since = None
+
+    def stats(self):
+        return (f"首音={self.first_audio}ms, 欠载={self.underruns}, 卡顿={self.stall_ms}ms, "
+                f"水位={int(self.watermark_ms)}ms")
@@ -0,0 +1,133 @@
+import sys
+import time
+
+# 设备端日志：分级、按位置限速、RAM环形缓冲区
+#   log.info("[ASR] 识别: %s", text)：参数留到通过级别过滤后才格式化，被过滤掉的调用只剩一次比较
+#   串口输出与环形缓冲区各有一个级别，默认都是INFO：DEBUG调用只剩一次比较，热路径上不占时间
+#     串口打印慢到会拖慢录音和摄像头帧率，热路径的逐chunk/逐帧信息用DEBUG
+#     排查问题时configure(buffered=log.DEBUG)：DEBUG只进缓冲区，不打到串口
+#   缓冲区只保存(时刻, 级别, 格式串, 参数)，不做格式化，导出时才格式化；参数须是不再修改的值
+#   需要时导出：Ctrl-C停下后在REPL里 import log; log.dump()，或log.dump_file("/log.txt")写进flash
+#   Site是一处频繁打印的位置：间隔内最多放行一条，其余只计数，下一条附上省略的条数
+
+IS_MICROPYTHON = sys.implementation.name == "micropython"
+
+if IS_MICROPYTHON:
+    from time import ticks_ms, ticks_diff
+else:
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "D", INFO: "I", WARNING: "W", ERROR: "E"}
+
+RING_SIZE = 128
+
+console_level = INFO  # 达到这个级别的打到串口
+ring_level = INFO  # 达到这个级别的记进环形缓冲区
+floor = INFO  # 两者中较低的一个，低于它的调用直接返回
+ring = [None] * RING_SIZE
+count = 0  # 累计写入缓冲区的条数，count % len(ring)为下一条的位置
+
+
+def configure(console=None, buffered=None, size=None):
+    """设置串口与缓冲区的级别，size为缓冲区条数（重新分配，清空已有内容）"""
+    global console_level, ring_level, floor, ring, count
+    if console is not None:
+        console_level = console
+    if buffered is not None:
+        ring_level = buffered
+    if size:
+        ring = [None] * size
+        count = 0
+    floor = min(console_level, ring_level)
+
+
+def enabled(level):
+    """参数本身开销大时，调用方先判断再组织参数"""
+    return level >= floor
+
+
+def emit(level, fmt, args, now=None):
+    global count
+    if level >= ring_level:
+        index = count
+        count = index + 1
+        ring[index % len(ring)] = (ticks_ms() if now is None else now, level, fmt, args)
+    if level >= console_level:
+        print(fmt % args if args else fmt)
+
+
+def debug(fmt, *args):
+    if DEBUG >= floor:
+        emit(DEBUG, fmt, args)
+
+
+def info(fmt, *args):
+    if INFO >= floor:
+        emit(INFO, fmt, args)
+
+
+def warning(fmt, *args):
+    if WARNING >= floor:
+        emit(WARNING, fmt, args)
+
+
+def error(fmt, *args):
+    if ERROR >= floor:
+        emit(ERROR, fmt, args)
+
+
+class Site:
+    def __init__(self, level=INFO, interval_ms=1000):
+        self.level = level
+        self.interval_ms = interval_ms
+        self.last = None  # 上一条放行的ticks_ms
+        self.dropped = 0  # 上一条之后省略的条数
+
+    def __call__(self, fmt, *args):
+        if self.level < floor:
+            return
+        now = ticks_ms()
+        if self.last is not None and ticks_diff(now, self.last) < self.interval_ms:
+            self.dropped += 1
+            return
+        self.last = now
+        if self.dropped:
+            fmt += " (省略%d条)"
+            args += (self.dropped,)
+            self.dropped = 0
+        emit(self.level, fmt, args, now)
+
+
+def records():
+    """按时间顺序返回缓冲区中的(时刻, 级别, 消息)"""
+    size = len(ring)
+    for index in range(max(0, count - size), count):
+        entry = ring[index % size]
+        if entry is not None:
+            at, level, fmt, args = entry
+            yield at, level, fmt % args if args else fmt
+
+
+def dump(stream=None, clear=True):
+    """把缓冲区逐行写到stream（默认串口），clear为True时导出后清空"""
+    global count
+    stream = stream or sys.stdout
+    for at, level, message in records():
+        stream.write(f"{at:>10d} {LEVEL_NAMES.get(level, level)} {message}\n")
+    if clear:
+        for i in range(len(ring)):
+            ring[i] = None
+        count = 0
+
+
+def dump_file(path, clear=True):
+    with open(path, "a") as f:
+        dump(f, clear)
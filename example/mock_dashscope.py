@@ -0,0 +1,231 @@
+import argparse
+import base64
+import json
+import math
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 本地DashScope替身（PC端运行），不连云端即可测试设备侧的请求与计时
+#   ASR: 支持Content-Length和chunked请求体，可模拟上行带宽和识别耗时
+#   对话: compatible-mode接口，stream=true时按SSE逐段返回固定回复，否则返回完整JSON
+#   TTS: 与ASR同一路径（按model区分），SSE逐事件返回正弦音频，事件形状与云端一致
+# chatbot.py、call_tts.py改API_HOST，qwen_demo的asr.py、tts_request.py设DASHSCOPE_API_URL即可指向这里
+# 各项耗时可以是固定毫秒数，也可以是(均值, 标准差)的正态分布（截断到0以上），命令行写作"300:80"
+# http_chunk_bytes不为0时，每条SSE事件再拆成不超过该长度的多个HTTP chunk，模拟云端的分片
+
+API_PATH_ASR = "/api/v1/services/aigc/multimodal-generation/generation"
+API_PATH_TTS = API_PATH_ASR
+API_PATH_QWEN = "/compatible-mode/v1/chat/completions"
+TTS_SAMPLE_RATE = 24000
+
+
+class MockConfig:
+    seed = 0  # 耗时分布的随机种子
+    upload_kbps = 0  # 模拟上行带宽，0表示不限速
+    asr_delay_ms = 300  # 收完请求体后的识别耗时
+    reply = "你好呀，我是花花！今天过得怎么样？有什么想和我聊的吗？"
+    chat_first_ms = 300  # 对话首个片段的耗时
+    chat_piece_ms = 30  # 之后每个片段的间隔
+    chat_piece_chars = 2  # 每个片段的字数
+    tts_first_ms = 250  # TTS首个音频事件的耗时
+    tts_event_ms = 60  # 之后每个音频事件的间隔
+    tts_chunk_ms = 100  # 每个音频事件携带的音频时长
+    tts_chars_per_second = 4  # 合成语速，决定一句话的音频时长
+    http_chunk_bytes = 0  # SSE事件拆分成HTTP chunk的最大长度，0表示一条事件一个chunk
+
+
+class MockDashScopeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = MockConfig
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _wait(self, value):
+        """按配置的耗时（固定值或(均值, 标准差)）休眠"""
+        if isinstance(value, (tuple, list)):
+            value = max(0.0, self.server.rng.gauss(value[0], value[1]))
+        time.sleep(value / 1000)
+
+    def _read(self, size):
+        data = self.rfile.read(size)
+        if self.config.upload_kbps:
+            time.sleep(len(data) / (self.config.upload_kbps * 1024))
+        return data
+
+    def _read_body(self):
+        """读完请求体；客户端中途断开（如取消了流式上传）时返回None"""
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                line = self.rfile.readline().strip()
+                if not line:
+                    return None
+                size = int(line.split(b";", 1)[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return bytes(body)
+                data = self._read(size)
+                if len(data) < size:
+                    return None
+                body.extend(data)
+                self.rfile.readline()
+        length = int(self.headers.get("Content-Length", 0))
+        body = self._read(length)
+        return body if len(body) == length else None
+
+    def _send_json(self, obj):
+        payload = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _start_sse(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_event(self, obj):
+        """一条SSE事件作为一个chunk发出"""
+        data = b"data:" + json.dumps(obj, ensure_ascii=False).encode('utf-8') + b"\n\n"
+        step = self.config.http_chunk_bytes or len(data)
+        for i in range(0, len(data), step):
+            piece = data[i:i + step]
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+        self.wfile.flush()
+
+    def _end_sse(self, done=b""):
+        if done:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(done), done))
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = self._read_body()
+        if body is None:
+            self.close_connection = True
+            return
+        received_at = time.time()
+        request = json.loads(body)
+        if self.path == API_PATH_QWEN:
+            self._handle_chat(request)
+        elif self.path == API_PATH_TTS and request.get("model", "").startswith("qwen3-tts"):
+            self._handle_tts(request)
+        elif self.path == API_PATH_ASR:
+            self._handle_asr(request)
+        else:
+            self.send_error(404)
+        self.server.requests.append((self.path, len(body), received_at))
+
+    def _handle_asr(self, request):
+        audio_url = request["input"]["messages"][0]["content"][0]["audio"]
+        wav = base64.b64decode(audio_url.split("base64,", 1)[1])
+        if wav[:4] == b"RIFF" and wav[8:12] == b"WAVE":
+            channels = int.from_bytes(wav[22:24], 'little') or 1
+            rate = int.from_bytes(wav[24:28], 'little')
+            bits = int.from_bytes(wav[34:36], 'little')
+            pcm_len = len(wav) - 44
+        else:  # 没有WAV头的裸PCM按16kHz 16位单声道算
+            channels, rate, bits, pcm_len = 1, 16000, 16, len(wav)
+        frame_bytes = channels * bits // 8
+        seconds = pcm_len / (rate * frame_bytes) if rate and frame_bytes else 0.0
+        self._wait(self.config.asr_delay_ms)
+        text = f"收到{seconds:.2f}秒{bits}位音频"
+        self._send_json({"output": {"choices": [{"message": {"content": [{"text": text}]}}]}})
+
+    def _handle_chat(self, request):
+        config = self.config
+        reply = config.reply
+        self._wait(config.chat_first_ms)
+        if not request.get("stream"):
+            self._send_json({"choices": [{"message": {"role": "assistant", "content": reply}}]})
+            return
+        self._start_sse()
+        step = config.chat_piece_chars
+        for i in range(0, len(reply), step):
+            if i:
+                self._wait(config.chat_piece_ms)
+            self._send_event({"choices": [{"delta": {"content": reply[i:i + step]}, "index": 0}]})
+        self._send_event({"choices": [{"delta": {}, "finish_reason": "stop", "index": 0}]})
+        self._end_sse(b"data: [DONE]\n\n")
+
+    def _handle_tts(self, request):
+        config = self.config
+        text = request["input"]["text"]
+        samples = int(len(text) / config.tts_chars_per_second * TTS_SAMPLE_RATE)
+        step = config.tts_chunk_ms * TTS_SAMPLE_RATE // 1000
+        self._wait(config.tts_first_ms)
+        self._start_sse()
+        for i in range(0, samples, step):
+            if i:
+                self._wait(config.tts_event_ms)
+            audio = base64.b64encode(tone(min(step, samples - i), i)).decode()
+            self._send_event({"output": {"audio": {"data": audio, "id": "mock"}, "finish_reason": "null"}})
+        self._send_event({"output": {"audio": {"data": "", "id": "mock"}, "finish_reason": "stop"}})
+        self._end_sse()
+
+
+def tone(count, offset=0):
+    """count个16位样本的220Hz正弦"""
+    return struct.pack(f'<{count}h', *[int(6000 * math.sin(2 * math.pi * 220 * (offset + i) / TTS_SAMPLE_RATE))
+                                       for i in range(count)])
+
+
+def start_server(port=0, **config):
+    """后台线程启动替身服务，返回(server, port)"""
+    handler = type("ConfiguredHandler", (MockDashScopeHandler,),
+                   {"config": type("Config", (MockConfig,), config)})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.requests = []
+    server.rng = random.Random(handler.config.seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def parse_delay(text):
+    """"300"为固定300ms，"300:80"为均值300ms、标准差80ms"""
+    if ":" in text:
+        mean, std = text.split(":", 1)
+        return float(mean), float(std)
+    return float(text)
+
+
+DELAY_OPTIONS = ("asr_delay_ms", "chat_first_ms", "chat_piece_ms", "tts_first_ms", "tts_event_ms")
+
+
+def add_arguments(parser):
+    """替身配置的命令行参数（基准脚本共用），config_from_args取回"""
+    for name in DELAY_OPTIONS:
+        parser.add_argument("--" + name.replace("_", "-"), type=parse_delay, default=getattr(MockConfig, name))
+    parser.add_argument("--upload-kbps", type=float, default=0)
+    parser.add_argument("--chat-piece-chars", type=int, default=MockConfig.chat_piece_chars)
+    parser.add_argument("--tts-chunk-ms", type=int, default=MockConfig.tts_chunk_ms)
+    parser.add_argument("--http-chunk-bytes", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_args(args):
+    names = DELAY_OPTIONS + ("upload_kbps", "chat_piece_chars", "tts_chunk_ms", "http_chunk_bytes", "seed")
+    return {name: getattr(args, name) for name in names}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地DashScope替身服务")
+    parser.add_argument("--port", type=int, default=8080)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server, port = start_server(args.port, **config_from_args(args))
+    print(f"DashScope替身已启动: http://127.0.0.1:{port}")
+    while True:
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    main()
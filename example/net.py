@@ -0,0 +1,49 @@
+import errno
+import socket
+import sys
+
+import dns_cache
+
+# 设备与PC通用的连接建立：返回带read/write/readinto/close的流对象
+
+IS_MICROPYTHON = sys.implementation.name == "micropython"
+TIMEOUT = 30  # socket读写超时（秒）
+
+
+def open_connection(host, port=443, tls=True, timeout=TIMEOUT, rcvbuf=0):
+    """DNS解析（经dns_cache缓存） + TCP连接 + 可选TLS握手"""
+    addr_info = dns_cache.resolve(host, port)
+    sock = socket.socket(addr_info[0], addr_info[1], addr_info[2])
+    if rcvbuf:
+        sock.setsockopt(1, 8, rcvbuf)  # SOL_SOCKET, SO_RCVBUF
+    sock.settimeout(timeout)
+    sock.connect(addr_info[-1])
+
+    if tls:
+        import ssl
+        if IS_MICROPYTHON:
+            sock = ssl.wrap_socket(sock, server_hostname=host)
+        else:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+
+    if IS_MICROPYTHON:
+        return sock
+    # CPython的socket没有read/write，包一层无缓冲的文件对象；关闭文件对象时才真正关闭连接
+    stream = sock.makefile('rwb', buffering=0)
+    sock.close()
+    return stream
+
+
+def read_nowait(stream, n=1):
+    """不等待地读最多n字节：没有可读的应用数据返回None，对端已关闭或出错返回b""
+    只用来确认空闲连接的状态，读出的数据不会放回去；读完恢复TIMEOUT"""
+    sock = stream if IS_MICROPYTHON else stream._sock  # CPython的SocketIO包着原socket
+    sock.settimeout(0)
+    try:
+        return stream.read(n)
+    except OSError as e:
+        if e.errno == errno.EAGAIN or type(e).__name__ == "SSLWantReadError":  # CPython的TLS没有数据时抛这个
+            return None
+        return b""
+    finally:
+        sock.settimeout(TIMEOUT)
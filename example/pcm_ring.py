@@ -0,0 +1,154 @@
+import sys
+import time
+
+from jitter_buffer import JitterBuffer
+
+# TTS播放用的PCM环形缓冲区：启动时一次性分配，base64直接解码进空闲区，I2S写入线程从已写区取数据
+#   经语音网关时收到的是原始PCM，recv_into直接从socket读进空闲区
+#   单生产者（接收线程）单消费者（播放线程）：生产者只改写位置，消费者只改读位置，不需要加锁
+#   读写位置在[0, 2*size)内循环，二者之差即为已写入的字节数，满和空可以区分
+#   有界阻塞队列：满时生产者休眠等待（不再读socket，TCP窗口随之收紧，服务端自然放慢），
+#   空时消费者休眠等待，不再空转占满CPU
+#   消费者何时起播、何时重缓冲由jitter_buffer决定，默认水位为0即有数据就播
+
+IS_MICROPYTHON = sys.implementation.name == "micropython"
+
+if IS_MICROPYTHON:
+    from viper_kernels import b64_decode
+else:
+    import binascii
+
+    def b64_decode(src, start, end, dst):
+        out = binascii.a2b_base64(src[start:end])
+        dst[:len(out)] = out
+        return len(out)
+
+B64_PIECE = 8192  # 超长音频事件按4的倍数分段写入，避免单段超过缓冲区
+POLL_INTERVAL = 0.005  # 满/空时的休眠间隔（秒）
+
+
+def b64_size(src, start, end):
+    """base64（长度为4的倍数）解码后的字节数"""
+    n = (end - start) // 4 * 3
+    if end - start >= 2 and src[end - 1] == 61:  # 61: '='
+        n -= 2 if src[end - 2] == 61 else 1
+    return n
+
+
+class PCMRing:
+    def __init__(self, size, jitter=None):
+        self.size = size
+        self.jitter = jitter or JitterBuffer(0, 1)
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.group = bytearray(3)  # 跨越缓冲区末尾的那一组base64先解码到这里
+        self.write_pos = 0
+        self.read_pos = 0
+        self.producing = False  # 生产者正在写入一段回复
+        # 统计（每段回复开始时清零），欠载与卡顿由jitter统计
+        self.peak = 0  # 最高水位（字节）
+        self.full_waits = 0  # 生产者因缓冲区满而等待的次数
+
+    def used(self):
+        return (self.write_pos - self.read_pos) % (2 * self.size)
+
+    def free(self):
+        return self.size - self.used()
+
+    def begin(self, since=None):
+        """生产者开始写入一段回复，since为请求发出的时刻（ticks_ms）"""
+        self.peak = self.used()
+        self.full_waits = 0
+        self.jitter.begin(since)
+        self.producing = True
+
+    def end(self):
+        """生产者写完一段回复，之后的缓冲区变空不算欠载"""
+        self.producing = False
+        self.jitter.end()
+
+    def put_b64(self, src, start, end):
+        """把src[start:end]的base64音频解码写入，空间不足时休眠等待消费者，返回写入的字节数"""
+        total = 0
+        while start < end:
+            stop = min(end, start + B64_PIECE)
+            n = b64_size(src, start, stop)
+            if self.free() < n:
+                self.full_waits += 1
+                while self.free() < n:
+                    time.sleep(POLL_INTERVAL)
+            total += self.write_b64(src, start, stop)
+            self.peak = max(self.peak, self.used())
+            start = stop
+        return total
+
+    def recv_into(self, stream, n):
+        """从stream读n字节PCM直接写进空闲区（不经中间缓冲），空间不足时休眠等待消费者
+        返回实际写入的字节数，对端提前关闭时小于n"""
+        total = 0
+        while total < n:
+            if not self.free():
+                self.full_waits += 1
+                while not self.free():
+                    time.sleep(POLL_INTERVAL)
+            pos = self.write_pos % self.size
+            got = stream.readinto(self.mv[pos:pos + min(n - total, self.free(), self.size - pos)])
+            if not got:
+                break
+            self.write_pos = (self.write_pos + got) % (2 * self.size)
+            self.peak = max(self.peak, self.used())
+            total += got
+        return total
+
+    def poll(self, limit):
+        """不等待的get：当前可以播放的一段，没有返回None（供I2S回调使用）"""
+        if self.jitter.ready(self.used(), self.producing):
+            return self.readable(limit)
+        return None
+
+    def get(self, limit):
+        """取一段待播放数据（写完后调用consume释放）；回复接收中缓冲未达水位或被播空时休眠等待，
+        没有回复在接收且数据已播完返回None"""
+        while True:
+            chunk = self.poll(limit)
+            if chunk is not None or not (self.producing or self.used() > 1):
+                return chunk
+            time.sleep(POLL_INTERVAL)
+
+    def stats(self):
+        return f"{self.jitter.stats()}, 最高水位={self.peak}/{self.size}, 满等待={self.full_waits}"
+
+    def write_b64(self, src, start, end):
+        """把src[start:end]的base64直接解码进空闲区，返回写入的字节数
+        调用方先用b64_size与free()确认空间足够"""
+        n = b64_size(src, start, end)
+        pos = self.write_pos % self.size
+        first = self.size - pos
+        if n <= first:
+            b64_decode(src, start, end, self.mv[pos:pos + n])
+        else:
+            # 回绕：先解码到末尾前的整组，跨界的一组拆开写，剩余部分从开头继续
+            split = start + first // 3 * 4
+            done = b64_decode(src, start, split, self.mv[pos:])
+            tail = first - done
+            rest = 0
+            if tail:
+                got = b64_decode(src, split, split + 4, self.group)
+                self.mv[pos + done:] = self.group[:tail]
+                self.mv[:got - tail] = self.group[tail:got]
+                split += 4
+                rest = got - tail
+            b64_decode(src, split, end, self.mv[rest:n - first])
+        self.write_pos = (self.write_pos + n) % (2 * self.size)
+        return n
+
+    def readable(self, limit):
+        """已写入数据中连续的一段（最多limit字节，按16位样本对齐），没有数据返回None"""
+        n = min(self.used(), self.size - self.read_pos % self.size, limit) & ~1
+        if not n:
+            return None
+        pos = self.read_pos % self.size
+        return self.mv[pos:pos + n]
+
+    def consume(self, n):
+        self.read_pos = (self.read_pos + n) % (2 * self.size)
@@ -1,15 +1,21 @@
+import os
+import sys
 import pyaudio
 import requests
 import json
 import base64
 import time
-import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vad_kernel
+from capture_buffer import CaptureBuffer
+from vad import AdaptiveVAD, VAD_START, VAD_END, VAD_FULL, vad_frames
 
 # --- 配置 ---
 API_KEY = 'sk-943f95da67d04893b70c02be400e2935'
 MODEL_NAME = "qwen3-asr-flash"
 RESULT_FORMAT = "message"
-API_URL = "https://dashscope.aliyuncs.com/api/v1/services/aigc/multimodal-generation/generation"
+API_URL = os.environ.get("DASHSCOPE_API_URL", "https://dashscope.aliyuncs.com/api/v1/services/aigc/multimodal-generation/generation")
 
 # 音频参数
 CHUNK_SIZE = 3200
@@ -23,6 +29,7 @@ SILENCE_THRESHOLD = 0.5
 MIN_SPEECH_DURATION = 0.3
 ENERGY_THRESHOLD_HIGH = 100000
 ENERGY_THRESHOLD_LOW = 1000
+MAX_SPEECH_DURATION = 30  # 单段最长录音，决定录音缓冲区大小
 
 # 请求头
 HEADERS = {
@@ -33,9 +40,7 @@ HEADERS = {
 
 def calculate_energy(audio_data):
     """计算音频能量"""
-    samples = np.frombuffer(audio_data, dtype=np.int16)
-    energy = np.sum(samples.astype(np.float32) ** 2) / len(samples)
-    return energy
+    return vad_kernel.energy_i16(audio_data)
 
 
 def print_energy_bar(energy, max_energy=5000, width=50):
@@ -92,6 +97,19 @@ def call_asr_api(audio_url):
 
 
 
+class PyAudioSource:
+    """把PyAudio输入流适配成readinto接口，供vad_frames读取"""
+
+    def __init__(self, stream, frames):
+        self.stream = stream
+        self.frames = frames
+
+    def readinto(self, buf):
+        data = self.stream.read(self.frames, exception_on_overflow=False)
+        buf[:len(data)] = data
+        return len(data)
+
+
 def real_time_asr():
     """核心流式识别逻辑"""
     p = pyaudio.PyAudio()
@@ -108,73 +126,57 @@ def real_time_asr():
     print("=" * 50)
     print("能量显示（实时更新）:")
 
-    vad_state = "SILENT"
-    speech_buffer = bytearray()
-    silence_frames = 0
-    speech_frames = 0
     call_count = 0
     last_text = ""
 
     frame_duration = CHUNK_SIZE / (SAMPLE_RATE * BYTES_PER_SAMPLE)
+    speech_frames = max(1, round(MIN_SPEECH_DURATION / frame_duration))
+    silence_frames = max(1, round(SILENCE_THRESHOLD / frame_duration))
 
-    try:
-        while True:
-            audio_data = stream.read(CHUNK_SIZE, exception_on_overflow=False)
-            energy = calculate_energy(audio_data)
+    # 固定阈值：底噪恒为1且不跟踪，起始/结束阈值即为HIGH/LOW
+    vad = AdaptiveVAD(1, speech_frames, silence_frames, ENERGY_THRESHOLD_HIGH, ENERGY_THRESHOLD_LOW,
+                      rise=0, fall=0, min_floor=1)
+    capture = CaptureBuffer(CHUNK_SIZE * BYTES_PER_SAMPLE, speech_frames,
+                            int(MAX_SPEECH_DURATION / frame_duration))
+    source = PyAudioSource(stream, CHUNK_SIZE)
 
+    try:
+        for _, energy, event in vad_frames(source, capture, vad, calculate_energy):
             # 打印能量条
             print_energy_bar(energy)
 
-            if vad_state == "SILENT":
-                if energy > ENERGY_THRESHOLD_HIGH:
-                    speech_frames += 1
-                    if speech_frames * frame_duration >= MIN_SPEECH_DURATION:
-                        vad_state = "SPEAKING"
-                        print(f"\n\n🔊 检测到语音开始 (能量: {energy:.0f})")
-                        speech_buffer.extend(audio_data)
-                else:
-                    speech_frames = 0
-
-            elif vad_state == "SPEAKING":
-                speech_buffer.extend(audio_data)
-
-                if energy < ENERGY_THRESHOLD_LOW:
-                    silence_frames += 1
-                    if silence_frames * frame_duration >= SILENCE_THRESHOLD:
-                        vad_state = "SILENT"
-                        silence_frames = 0
-                        speech_frames = 0
-
-                        if len(speech_buffer) > 0:
-                            call_count += 1
-                            audio_duration = len(speech_buffer) / (SAMPLE_RATE * BYTES_PER_SAMPLE)
-
-                            print(f"\n\n📊 第{call_count}次调用")
-                            print(f"语音段: {audio_duration:.2f}秒 ({len(speech_buffer)}字节)")
-
-                            # 转换为WAV格式
-                            wav_data = speech_buffer
-                            audio_b64 = base64.b64encode(wav_data).decode('utf-8')
-                            audio_url = f"data:audio/wav;base64,{audio_b64}"
-
-                            # 调用API
-                            start_time = time.time()
-                            text, success = call_asr_api(audio_url)
-                            api_duration = time.time() - start_time
-
-                            print(f"API耗时: {api_duration:.2f}秒")
-
-                            if success and text:
-                                print(f"✅ 识别结果: {text}")
-                                last_text = text
-                            else:
-                                print(f"❌ 识别失败: {text}")
-
-                            print("-" * 50)
-                            speech_buffer = bytearray()
-                            print("\n继续监听...")
-                else:
-                    silence_frames = 0
+            if event == VAD_START:
+                print(f"\n\n🔊 检测到语音开始 (能量: {energy:.0f})")
+
+            elif event == VAD_END or event == VAD_FULL:
+                speech_buffer = capture.data()
+                if len(speech_buffer) > 0:
+                    call_count += 1
+                    audio_duration = len(speech_buffer) / (SAMPLE_RATE * BYTES_PER_SAMPLE)
+
+                    print(f"\n\n📊 第{call_count}次调用")
+                    print(f"语音段: {audio_duration:.2f}秒 ({len(speech_buffer)}字节)")
+
+                    # 转换为WAV格式
+                    wav_data = speech_buffer
+                    audio_b64 = base64.b64encode(wav_data).decode('utf-8')
+                    audio_url = f"data:audio/wav;base64,{audio_b64}"
+
+                    # 调用API
+                    start_time = time.time()
+                    text, success = call_asr_api(audio_url)
+                    api_duration = time.time() - start_time
+
+                    print(f"API耗时: {api_duration:.2f}秒")
+
+                    if success and text:
+                        print(f"✅ 识别结果: {text}")
+                        last_text = text
+                    else:
+                        print(f"❌ 识别失败: {text}")
+
+                    print("-" * 50)
+                    print("\n继续监听...")
 
     except KeyboardInterrupt:
         print("\n\n" + "=" * 50)
@@ -5,12 +5,19 @@ import time
 import base64
 import numpy as np
 import os
+import sys
 from typing import Optional, Dict, Any
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tts_event
+from jitter_buffer import JitterBuffer, ticks_ms, ticks_diff
+
 
 class TTSService:
-    def __init__(self, api_key: str, voice: str = "Cherry", language: str = "Chinese"):
-        self.api_base_url = "https://dashscope.aliyuncs.com/api/v1/services/aigc/multimodal-generation/generation"
+    def __init__(self, api_key: str, voice: str = "Cherry", language: str = "Chinese",
+                 start_ms: int = 200, max_buffer_ms: int = 1000):
+        self.api_base_url = os.environ.get(
+            "DASHSCOPE_API_URL", "https://dashscope.aliyuncs.com/api/v1/services/aigc/multimodal-generation/generation")
         self.api_key = api_key
         self.voice = voice
         self.language = language
@@ -25,6 +32,12 @@ class TTSService:
             output=True
         )
 
+        # 抖动缓冲：攒够起播水位再写入声卡，按播放时钟推算声卡何时被播空
+        self.jitter = JitterBuffer(start_ms, 24000 * 2 // 1000, max_buffer_ms)
+        self.pending = bytearray()
+        self.play_until = 0  # 已写入声卡的音频预计播完的时刻（ticks_ms）
+        self.request_start = None
+
     def _create_headers(self) -> Dict[str, str]:
         """创建请求头"""
         return {
@@ -44,17 +57,31 @@ class TTSService:
             }
         }
 
-    def _process_audio_chunk(self, audio_data: str, count: int) -> None:
-        """处理并播放音频数据块"""
+    def _process_audio_chunk(self, audio_data, count: int) -> None:
+        """处理并播放音频数据块，audio_data为base64的str或bytes"""
         wav_bytes = base64.b64decode(audio_data)
         audio_np = np.frombuffer(wav_bytes, dtype=np.int16)
-        audio_bytes = audio_np.tobytes()
-        self.stream.write(audio_bytes)
+        self._queue_pcm(audio_np.tobytes())
 
-        self.stream_data[count]["audio_data"] = audio_data
+        self.stream_data[count]["audio_size"] = len(audio_data)  # base64内容已在line中，不再重复保存
 
         print(f"✓ 播放音频块，大小: {len(audio_np)} samples")
 
+    def _queue_pcm(self, pcm: bytes) -> None:
+        """PCM先进抖动缓冲；新数据到达前声卡已播空记为欠载，从播空的时刻开始计卡顿"""
+        if not self.jitter.buffering and ticks_diff(ticks_ms(), self.play_until) > 0:
+            self.jitter.underrun(self.play_until)
+        self.pending += pcm
+        self._flush(True)
+
+    def _flush(self, producing: bool) -> None:
+        """缓冲达到水位（或接收已结束）时把缓冲的音频写入声卡"""
+        if not self.jitter.ready(len(self.pending), producing):
+            return
+        self.play_until = max(ticks_ms(), self.play_until) + len(self.pending) // self.jitter.bytes_per_ms
+        self.stream.write(bytes(self.pending))
+        self.pending = bytearray()
+
     def _parse_sse_line(self, line_str: str) -> Optional[Dict[str, Any]]:
         """解析SSE数据行"""
         if not line_str.startswith('data:'):
@@ -91,6 +118,7 @@ class TTSService:
     def synthesize_speech(self, text: str) -> bool:
         """主函数：合成并播放语音"""
         print(f"正在请求 URL: {self.api_base_url}")
+        self.request_start = ticks_ms()  # 首音时间从请求发出算起
 
         try:
             response = requests.post(
@@ -131,12 +159,28 @@ class TTSService:
         """处理流式响应"""
         self.stream_data = {}
         count = 0
-        
+        self.jitter.begin(self.request_start)
+        self.pending = bytearray()
+        self.play_until = 0
+
         for line in response.iter_lines():
             if not line:
                 continue
 
             line_str = line.decode('utf-8')
+            event = tts_event.parse_event(line, 5, len(line)) if line.startswith(b'data:') else None
+            if event is not None:
+                # 快速路径：直接从原始字节中取base64范围，不做json.loads
+                count += 1
+                self.stream_data[count] = {"line": line_str, "parsed": {"type": "event"}}
+                data_start, data_end, finished = event
+                if finished:
+                    print("✓ 流式传输完成")
+                    break
+                if data_end > data_start:
+                    self._process_audio_chunk(memoryview(line)[data_start:data_end], count)
+                continue
+
             parsed = self._parse_sse_line(line_str)
             if parsed is None:
                 continue
@@ -153,7 +197,11 @@ class TTSService:
             if not self._handle_chunk_data(parsed["data"], count):
                 break
 
+        # 剩余未达水位的音频直接播放
+        self._flush(False)
+        self.jitter.end()
         print(f"共获取 {count} 条数据")
+        print(f"[Jitter] {self.jitter.stats()}")
         return True
 
     def _save_stream_data(self) -> None:
@@ -0,0 +1,76 @@
+# 增量分句：大模型流式输出的文本片段逐段送入，遇到句末标点就切出一句交给TTS
+#   中文句末标点（。！？；…）和换行直接断句；西文的.!?;后面跟空白才断句，避免切断"5.0%"、"e.g"之类
+#   太短的句子并入下一句，减少TTS请求次数；太长的句子在逗号处提前切开，尽快出第一句
+#   同一句末尾连续的标点、右引号/右括号跟随在句子后面
+
+CJK_ENDS = "。！？；…\n"
+ASCII_ENDS = ".!?;"
+CLOSERS = "”’\"'）)」』】"
+SOFT_BREAKS = "，、,：:"
+
+
+class SentenceSplitter:
+    def __init__(self, min_chars=6, max_chars=60):
+        self.min_chars = min_chars  # 短于该长度的句子与下一句合并
+        self.max_chars = max_chars  # 超过该长度在逗号处切开
+        self.reset()
+
+    def reset(self):
+        self.text = ""
+        self.scan = 0  # 下一个待检查的位置
+        self.soft = -1  # 最后一个逗号之后的位置
+
+    def feed(self, piece):
+        """追加一段文本，返回其中已完整的句子列表"""
+        self.text += piece
+        sentences = []
+        while True:
+            end = self._find_end()
+            if end < 0:
+                break
+            sentence = self.text[:end].strip()
+            self.text = self.text[end:]
+            self.scan = 0
+            self.soft = -1
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def flush(self):
+        """回复结束：剩余文本作为最后一句，没有返回空字符串"""
+        sentence = self.text.strip()
+        self.reset()
+        return sentence
+
+    def _find_end(self):
+        """下一句的结束位置（不含），没有完整句子返回-1"""
+        text = self.text
+        n = len(text)
+        i = self.scan
+        while i < n:
+            ch = text[i]
+            if ch in CJK_ENDS or ch in ASCII_ENDS:
+                if ch in ASCII_ENDS:
+                    # 西文标点要看到下一个字符才能确定
+                    if i + 1 >= n:
+                        break
+                    if text[i + 1] not in " \t\n" and text[i + 1] not in CLOSERS:
+                        i += 1
+                        continue
+                end = i + 1
+                while end < n and (text[end] in CJK_ENDS or text[end] in ASCII_ENDS or text[end] in CLOSERS):
+                    end += 1
+                if end == n and text[end - 1] not in CLOSERS and text[end - 1] != "\n":
+                    # 后面可能还有连续的标点或引号，等下一段再定
+                    break
+                if len(text[:end].strip()) >= self.min_chars:
+                    return end
+                i = end
+                continue
+            if ch in SOFT_BREAKS:
+                self.soft = i + 1
+            i += 1
+        self.scan = i
+        if self.soft > 0 and n >= self.max_chars:
+            return self.soft
+        return -1
@@ -0,0 +1,133 @@
+import _thread
+import gc
+import os
+import socket
+import sys
+import threading  # 先于time打补丁导入，内部计时保持用真实时钟
+import time
+
+# PC端的MicroPython硬件替身：设备脚本不做任何修改即可在CPython下运行、剖析和做基准
+#   python -m shim chatbot.py
+#   python -m shim --virtual --mic rec.wav --profile chatbot.py
+#   python -m shim --camera GRAYSCALE_FRAME_QVGA ../cleanbot/capture_img_serve.py
+# 本目录加入sys.path后，machine/network/camera/ubinascii/ujson/urequests/gc9a01/micropython按设备上的名字导入；
+# _thread用CPython自带的（start_new_thread/allocate_lock接口一致），只把stack_size换掉：
+#   设备上为TLS调大的16KB在CPython下小于下限，这里只记录请求值，线程栈保持CPython默认
+# install同时给time补上ticks_ms/ticks_diff/sleep_ms等，给gc补上mem_free/mem_alloc
+# 时钟：
+#   实时（默认）：I2S、摄像头按真实节奏阻塞，与设备时序一致
+#   虚拟（--virtual）：所有sleep立即返回，只把时钟往前拨；CPU耗时照常计入，等待被跳过，
+#     录音/播放/取帧按数据量推进时钟，适合剖析热路径。threading.Timer等内部计时不受影响
+
+HEAP_SIZE = 8 * 1024 * 1024  # gc.mem_free/mem_alloc报告的堆大小（ESP32-S3的PSRAM）
+
+_sleep = time.sleep
+_monotonic = time.monotonic
+_time = time.time
+
+
+class Clock:
+    def __init__(self):
+        self.virtual = False
+        self.skipped = 0.0  # 虚拟模式下跳过的等待总时长（秒）
+        self.deadline = 0.0  # 时钟走到这里后，下一次sleep结束脚本（设备脚本大多是死循环）
+
+    def monotonic(self):
+        return _monotonic() + self.skipped
+
+    def time(self):
+        return _time() + self.skipped
+
+    def sleep(self, seconds):
+        if self.deadline and self.monotonic() >= self.deadline:
+            print("[Shim] 运行时长已到")
+            raise SystemExit(0)
+        if seconds <= 0:
+            return
+        if self.virtual:
+            self.skipped += seconds
+        else:
+            _sleep(seconds)
+
+
+class Board:
+    """替身的全局配置：各硬件模块从这里取数据源与输出"""
+    mic = None  # 麦克风录音文件（WAV或裸PCM），None为静音
+    speaker = None  # I2S输出录制到这个文件（裸PCM），None不录制
+    camera = None  # 图像文件或目录（裸灰度帧，.png需要cv2），None为合成渐变
+    host_map = {}  # getaddrinfo的主机名替换：host -> (host, port或None)
+
+
+clock = Clock()
+board = Board
+
+
+def ticks_ms():
+    return int(clock.monotonic() * 1000) & 0x3FFFFFFF
+
+
+def ticks_us():
+    return int(clock.monotonic() * 1000000) & 0x3FFFFFFF
+
+
+def ticks_diff(a, b):
+    """与MicroPython一致：按30位回绕取有符号差"""
+    return ((a - b + 0x20000000) & 0x3FFFFFFF) - 0x20000000
+
+
+def ticks_add(a, delta):
+    return (a + delta) & 0x3FFFFFFF
+
+
+def install(virtual=False, mic=None, speaker=None, camera=None, host_map=None, seconds=0):
+    """把替身模块（以及soft_i2s等所在的example目录）放进导入路径，补齐time/gc/socket上的设备接口
+    seconds不为0时，时钟走过这么多秒后结束脚本"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    for path in (os.path.dirname(here), here):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    clock.virtual = virtual
+    clock.deadline = clock.monotonic() + seconds if seconds else 0.0
+    board.mic = mic
+    board.speaker = speaker
+    board.camera = camera
+    board.host_map = host_map or {}
+
+    time.sleep = clock.sleep
+    time.monotonic = clock.monotonic
+    time.time = clock.time
+    time.sleep_ms = lambda ms: clock.sleep(ms / 1000)
+    time.sleep_us = lambda us: clock.sleep(us / 1000000)
+    time.ticks_ms = ticks_ms
+    time.ticks_us = ticks_us
+    time.ticks_cpu = ticks_us
+    time.ticks_diff = ticks_diff
+    time.ticks_add = ticks_add
+
+    requested = [0]
+
+    def stack_size(size=None):
+        previous = requested[0]
+        if size is not None:
+            requested[0] = size
+        return previous
+
+    _thread.stack_size = stack_size
+
+    gc.mem_alloc = mem_alloc
+    gc.mem_free = lambda: HEAP_SIZE - mem_alloc()
+
+    if board.host_map:
+        getaddrinfo = socket.getaddrinfo
+
+        def mapped_getaddrinfo(host, port, *args):
+            target, target_port = board.host_map.get(host, (host, None))
+            return getaddrinfo(target, target_port or port, *args)
+
+        socket.getaddrinfo = mapped_getaddrinfo
+
+
+def mem_alloc():
+    """tracemalloc开启时报告Python堆上的实际分配，否则为0"""
+    import tracemalloc
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
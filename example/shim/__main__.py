@@ -0,0 +1,59 @@
+import argparse
+import cProfile
+import os
+import pstats
+import runpy
+import sys
+
+import shim
+
+# python -m shim [选项] 设备脚本.py [脚本参数]
+#   --virtual           虚拟时钟，等待立即返回
+#   --mic rec.wav       麦克风数据源（16/32位WAV或32位裸PCM，读完循环）
+#   --speaker out.pcm   录下所有I2S输出
+#   --camera 目录/文件   摄像头数据源
+#   --map-host 192.168.1.100=127.0.0.1  连接时替换主机（可选:端口），可多次指定
+#   --seconds 30        时钟走过30秒后结束
+#   --profile [--profile-out run.prof]  cProfile剖析，结束时按累计耗时打印前30项
+
+
+def parse_host(text):
+    host, _, target = text.partition("=")
+    target, _, port = target.partition(":")
+    return host, (target, int(port) if port else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m shim", description="在CPython下运行MicroPython设备脚本")
+    parser.add_argument("--virtual", action="store_true")
+    parser.add_argument("--mic")
+    parser.add_argument("--speaker")
+    parser.add_argument("--camera")
+    parser.add_argument("--map-host", type=parse_host, action="append", default=[])
+    parser.add_argument("--seconds", type=float, default=0)
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--profile-out")
+    parser.add_argument("script")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    shim.install(args.virtual, args.mic, args.speaker, args.camera, dict(args.map_host), args.seconds)
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    if not args.profile:
+        runpy.run_path(args.script, run_name="__main__")
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        runpy.run_path(args.script, run_name="__main__")
+    finally:
+        # 脚本被时长限制或Ctrl-C结束时也输出剖析结果
+        profiler.disable()
+        if args.profile_out:
+            profiler.dump_stats(args.profile_out)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+
+from shim import board, clock
+
+# camera模块替身（接口同ESP32的micropython-camera-driver）：capture按帧率节奏返回图像文件中的下一帧
+#   数据源为目录（按文件名排序逐个循环）或单个文件（裸灰度帧按帧大小切分）；.png/.jpg在灰度格式下需要cv2解码
+#   没有配置数据源时产出逐帧平移的灰度渐变
+
+JPEG = 0
+YUV422 = 1
+GRAYSCALE = 2
+RGB565 = 3
+
+FRAME_96X96 = 0
+FRAME_QQVGA = 1
+FRAME_QCIF = 2
+FRAME_HQVGA = 3
+FRAME_240X240 = 4
+FRAME_QVGA = 5
+FRAME_VGA = 8
+
+XCLK_10MHz = 10000000
+XCLK_20MHz = 20000000
+
+SIZES = {FRAME_96X96: (96, 96), FRAME_QQVGA: (160, 120), FRAME_QCIF: (176, 144), FRAME_HQVGA: (240, 176),
+         FRAME_240X240: (240, 240), FRAME_QVGA: (320, 240), FRAME_VGA: (640, 480)}
+FPS = 25  # 取帧节奏
+
+
+class _State:
+    format = JPEG
+    size = SIZES[FRAME_QVGA]
+    frames = None
+    index = 0
+    due = 0.0
+
+
+_state = _State
+
+
+def init(id=0, format=JPEG, framesize=FRAME_QVGA, **pins):
+    _state.format = format
+    _state.size = SIZES[framesize]
+    _state.frames = _load(board.camera) if board.camera else None
+    _state.index = 0
+    _state.due = clock.monotonic()
+    return True
+
+
+def deinit():
+    _state.frames = None
+
+
+def capture():
+    _state.due = max(_state.due, clock.monotonic()) + 1 / FPS
+    clock.sleep(_state.due - clock.monotonic())
+    _state.index += 1
+    if _state.frames:
+        return _state.frames[(_state.index - 1) % len(_state.frames)]
+    width, height = _state.size
+    row = bytes((x + _state.index * 4) & 0xFF for x in range(width))
+    return row * height
+
+
+def framesize(size):
+    _state.size = SIZES[size]
+
+
+def quality(value):
+    pass
+
+
+def flip(value):
+    pass
+
+
+def mirror(value):
+    pass
+
+
+def _load(path):
+    if os.path.isdir(path):
+        return [_read(os.path.join(path, name)) for name in sorted(os.listdir(path))]
+    data = _read(path)
+    if path.endswith((".png", ".jpg", ".jpeg")):
+        return [data]
+    frame = _state.size[0] * _state.size[1]
+    return [data[i:i + frame] for i in range(0, len(data) - frame + 1, frame)] or [data]
+
+
+def _read(path):
+    if path.endswith((".png", ".jpg", ".jpeg")) and _state.format != JPEG:
+        import cv2
+        return cv2.imread(path, cv2.IMREAD_GRAYSCALE).tobytes()
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,90 @@
+# GC9A01圆屏驱动替身：绘图写进RGB565帧缓冲（buf），每次绘图按推送的字节数经SPI替身计传输时间
+
+BLACK = 0x0000
+BLUE = 0x001F
+RED = 0xF800
+GREEN = 0x07E0
+CYAN = 0x07FF
+MAGENTA = 0xF81F
+YELLOW = 0xFFE0
+WHITE = 0xFFFF
+
+
+def color565(red, green, blue):
+    return (red & 0xF8) << 8 | (green & 0xFC) << 3 | blue >> 3
+
+
+class GC9A01:
+    def __init__(self, spi, dc=None, cs=None, reset=None, backlight=None, rotation=0, width=240, height=240, **kwargs):
+        self.spi = spi
+        self._width = width
+        self._height = height
+        self._rotation = rotation
+        self.buf = bytearray(width * height * 2)
+
+    def init(self):
+        pass
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def rotation(self, value):
+        self._rotation = value
+
+    def fill(self, color):
+        self.fill_rect(0, 0, self._width, self._height, color)
+
+    def fill_rect(self, x, y, w, h, color):
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, self._width), min(y + h, self._height)
+        if x1 <= x0 or y1 <= y0:
+            return
+        line = color.to_bytes(2, 'big') * (x1 - x0)
+        for row in range(y0, y1):
+            start = (row * self._width + x0) * 2
+            self.buf[start:start + len(line)] = line
+        self.spi.write(bytes(len(line) * (y1 - y0)))
+
+    def pixel(self, x, y, color):
+        if 0 <= x < self._width and 0 <= y < self._height:
+            start = (y * self._width + x) * 2
+            self.buf[start:start + 2] = color.to_bytes(2, 'big')
+            self.spi.write(b"\x00\x00")
+
+    def hline(self, x, y, length, color):
+        self.fill_rect(x, y, length, 1, color)
+
+    def vline(self, x, y, length, color):
+        self.fill_rect(x, y, 1, length, color)
+
+    def rect(self, x, y, w, h, color):
+        self.hline(x, y, w, color)
+        self.hline(x, y + h - 1, w, color)
+        self.vline(x, y, h, color)
+        self.vline(x + w - 1, y, h, color)
+
+    def line(self, x0, y0, x1, y1, color):
+        """Bresenham逐点画线"""
+        dx, dy = abs(x1 - x0), -abs(y1 - y0)
+        sx, sy = (1 if x0 < x1 else -1), (1 if y0 < y1 else -1)
+        err = dx + dy
+        while True:
+            self.pixel(x0, y0, color)
+            if x0 == x1 and y0 == y1:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x0 += sx
+            if e2 <= dx:
+                err += dx
+                y0 += sy
+
+    def blit_buffer(self, buffer, x, y, w, h):
+        for row in range(h):
+            start = ((y + row) * self._width + x) * 2
+            self.buf[start:start + w * 2] = buffer[row * w * 2:(row + 1) * w * 2]
+        self.spi.write(buffer)
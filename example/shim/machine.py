@@ -0,0 +1,170 @@
+from array import array
+
+from shim import board, clock
+
+# machine模块替身：I2S（录音来自文件、播放按采样率消耗）、Pin、SPI（按波特率计传输时间）和几个常用函数
+
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+
+soft_reset = reset
+
+
+def unique_id():
+    return b"\x24\x6f\x28\x00\x00\x01"
+
+
+def freq(hz=None):
+    return 240000000
+
+
+def idle():
+    clock.sleep(0.001)
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self._value = int(bool(value)) if value is not None else 0
+        self.handler = None
+
+    def init(self, mode=-1, pull=-1, value=None):
+        self.mode = mode
+        if value is not None:
+            self._value = int(bool(value))
+
+    def value(self, x=None):
+        if x is None:
+            return self._value
+        self._value = int(bool(x))
+
+    __call__ = value
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        self.handler = handler
+
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id, baudrate=1000000, **kwargs):
+        self.id = id
+        self.baudrate = baudrate
+        self.written = 0  # 累计发送字节数
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate:
+            self.baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def write(self, buf):
+        self.written += len(buf)
+        clock.sleep(len(buf) * 8 / self.baudrate)
+
+    def read(self, nbytes, write=0x00):
+        clock.sleep(nbytes * 8 / self.baudrate)
+        return bytes([write]) * nbytes
+
+    def readinto(self, buf, write=0x00):
+        buf[:] = self.read(len(buf), write)
+
+    def write_readinto(self, write_buf, read_buf):
+        self.write(write_buf)
+        read_buf[:] = bytes(len(read_buf))
+
+
+class I2S:
+    RX = 0
+    TX = 1
+    MONO = 0
+    STEREO = 1
+
+    def __init__(self, id, sck=None, ws=None, sd=None, mck=None, mode=RX, bits=16, format=MONO, rate=16000,
+                 ibuf=20000):
+        self.mode = mode
+        self.bits = bits
+        self.bytes_per_sec = rate * bits // 8 * (2 if format == I2S.STEREO else 1)
+        self.ibuf = ibuf
+        if mode == I2S.TX:
+            # 播放时序沿用soft_i2s：阻塞写等内部缓冲区腾出空间，设置irq后非阻塞
+            from soft_i2s import SoftI2S
+            self.out = SoftI2S(rate=rate, bits=bits, ibuf=ibuf)
+            self.record = open(board.speaker, "ab") if board.speaker else None
+            return
+        self.data = load_pcm(board.mic, bits) if board.mic else bytes(bits // 8 * 64)
+        self.pos = 0
+        self.due = clock.monotonic()  # 已读出的数据在真实设备上采满的时刻
+
+    # ===================== 录音 =====================
+    def readinto(self, buf):
+        """等到这么多样本采满才返回；读得慢时内部缓冲区（ibuf）里已有的数据立即返回"""
+        n = len(buf)
+        self.due = max(self.due, clock.monotonic() - self.ibuf / self.bytes_per_sec) + n / self.bytes_per_sec
+        clock.sleep(self.due - clock.monotonic())
+        data = self.data
+        filled = 0
+        while filled < n:
+            take = min(n - filled, len(data) - self.pos)
+            buf[filled:filled + take] = data[self.pos:self.pos + take]
+            filled += take
+            self.pos = (self.pos + take) % len(data)  # 录音读完从头循环
+        return n
+
+    # ===================== 播放 =====================
+    def write(self, buf):
+        if self.record:
+            self.record.write(buf)
+        return self.out.write(buf)
+
+    def irq(self, handler):
+        self.out.irq((lambda _: handler(self)) if handler else None)
+
+    def deinit(self):
+        if self.mode == I2S.TX:
+            self.out.deinit()
+            if self.record:
+                self.record.close()
+
+    def stats(self):
+        return self.out.stats()
+
+
+def load_pcm(path, bits):
+    """读WAV（16/32位单声道）或裸PCM（按32位），转换成bits位的样本"""
+    with open(path, "rb") as f:
+        data = f.read()
+    file_bits = 32
+    if data[:4] == b"RIFF":
+        pos = 12
+        while data[pos:pos + 4] != b"data":
+            size = int.from_bytes(data[pos + 4:pos + 8], 'little')
+            if data[pos:pos + 4] == b"fmt ":
+                file_bits = int.from_bytes(data[pos + 22:pos + 24], 'little')
+            pos += 8 + size + (size & 1)
+        size = int.from_bytes(data[pos + 4:pos + 8], 'little')
+        data = data[pos + 8:pos + 8 + size]
+    if file_bits == bits:
+        return data
+    if file_bits == 16:
+        return array('i', [x << 16 for x in array('h', data)]).tobytes()
+    return array('h', [x >> 16 for x in array('i', data)]).tobytes()
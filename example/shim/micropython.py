@@ -0,0 +1,27 @@
+# micropython模块替身：装饰器原样返回函数，schedule直接调用
+# viper/native代码用到的ptr8等类型只在设备上存在，CPython下各模块本来就走纯Python实现
+
+
+def const(value):
+    return value
+
+
+def native(func):
+    return func
+
+
+viper = native
+
+
+def schedule(func, arg):
+    func(arg)
+    return True
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def mem_info(verbose=False):
+    import gc
+    print(f"mem: total={gc.mem_alloc() + gc.mem_free()}, current={gc.mem_alloc()}")
@@ -0,0 +1,48 @@
+# network模块替身：WLAN立即"连上"，ifconfig报告本机回环地址，热点模式报告设备默认的192.168.4.1
+
+STA_IF = 0
+AP_IF = 1
+AUTH_OPEN = 0
+AUTH_WPA_WPA2_PSK = 4
+STAT_IDLE = 1000
+STAT_CONNECTING = 1001
+STAT_GOT_IP = 1010
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+        self._active = False
+        self.connected = False
+        self.settings = {"mac": b"\x24\x6f\x28\x00\x00\x01", "essid": ""}
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        self._active = bool(is_active)
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        self.settings["essid"] = ssid
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+
+    def isconnected(self):
+        return self.connected
+
+    def status(self, param=None):
+        return STAT_GOT_IP if self.connected else STAT_IDLE
+
+    def ifconfig(self, config=None):
+        if self.interface == AP_IF:
+            return ("192.168.4.1", "255.255.255.0", "192.168.4.1", "0.0.0.0")
+        return ("127.0.0.1", "255.0.0.0", "127.0.0.1", "127.0.0.1")
+
+    def config(self, *args, **kwargs):
+        if args:
+            return self.settings.get(args[0])
+        self.settings.update(kwargs)
+
+    def scan(self):
+        return []
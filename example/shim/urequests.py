@@ -0,0 +1,55 @@
+import json as _json
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlsplit
+
+# urequests替身：接口与设备上一致（post(url, headers=..., data=...)返回带json()/text/close()的响应），底层用http.client
+
+
+class Response:
+    def __init__(self, status_code, reason, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return _json.loads(self.content)
+
+    def close(self):
+        pass
+
+
+def request(method, url, data=None, json=None, headers=None, timeout=None):
+    headers = dict(headers or {})
+    if json is not None:
+        data = _json.dumps(json)
+        headers.setdefault("Content-Type", "application/json")
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    parts = urlsplit(url)
+    connection = HTTPSConnection if parts.scheme == "https" else HTTPConnection
+    conn = connection(parts.hostname, parts.port, timeout=timeout)
+    conn.request(method, parts.path + ("?" + parts.query if parts.query else ""), data, headers)
+    resp = conn.getresponse()
+    response = Response(resp.status, resp.reason, resp.read())
+    conn.close()
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
@@ -0,0 +1,84 @@
+import threading
+import time
+
+# PC端的I2S输出替身：接口与machine.I2S的发送部分一致（write/irq/deinit），按采样率的时钟消耗数据
+#   阻塞模式：write等到数据全部拷进内部缓冲区（ibuf）才返回
+#   设置irq回调后为非阻塞模式：write立即返回，数据全部拷进内部缓冲区的时刻由定时线程调用回调
+#   统计内部缓冲区被播空的时长（即扬声器里的断音）、写入次数、回调相对应有时刻的延迟
+# 用于在Linux上对比播放线程与IRQ续数据两种方式的时序和CPU占用
+
+
+class SoftI2S:
+    TX = 0
+    MONO = 0
+
+    def __init__(self, id=0, sck=None, ws=None, sd=None, mode=TX, bits=16, format=MONO, rate=24000, ibuf=48000):
+        self.bytes_per_sec = rate * bits // 8
+        self.ibuf = ibuf
+        self.queued = 0  # 内部缓冲区中尚未播出的字节数
+        self.last = time.monotonic()
+        self.started = False
+        self.handler = None
+        self.lock = threading.Lock()
+        self.timer = None
+        # 统计
+        self.writes = 0
+        self.starved = 0.0  # 开始播放后内部缓冲区为空的总时长（秒）
+        self.callback_late = 0.0  # 回调晚于应有时刻的最大值（秒）
+
+    def _drain(self):
+        """按经过的时间消耗内部缓冲区"""
+        now = time.monotonic()
+        played = (now - self.last) * self.bytes_per_sec
+        self.last = now
+        if played > self.queued:
+            if self.started:
+                self.starved += (played - self.queued) / self.bytes_per_sec
+            self.queued = 0
+        else:
+            self.queued -= played
+
+    def write(self, buf):
+        n = len(buf)
+        self.writes += 1
+        if self.handler:
+            with self.lock:
+                self._drain()
+                delay = max(0.0, self.queued + n - self.ibuf) / self.bytes_per_sec
+            due = time.monotonic() + delay
+            self.timer = threading.Timer(delay, self._complete, (n, due))
+            self.timer.daemon = True  # 回调链不阻止进程退出
+            self.timer.start()
+            return n
+        remaining = n
+        while remaining:
+            with self.lock:
+                self._drain()
+                take = min(remaining, int(self.ibuf - self.queued))
+                self.queued += take
+                self.started = True
+            remaining -= take
+            if remaining:
+                time.sleep(min(remaining, self.ibuf) / self.bytes_per_sec / 2)
+        return n
+
+    def _complete(self, n, due):
+        with self.lock:
+            self._drain()
+            self.queued += n
+            self.started = True
+        self.callback_late = max(self.callback_late, time.monotonic() - due)
+        handler = self.handler
+        if handler:
+            handler(self)
+
+    def irq(self, handler):
+        self.handler = handler
+
+    def deinit(self):
+        self.handler = None
+        if self.timer:
+            self.timer.cancel()
+
+    def stats(self):
+        return f"写入={self.writes}, 断音={self.starved * 1000:.0f}ms, 回调最大延迟={self.callback_late * 1000:.1f}ms"
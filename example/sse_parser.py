@@ -0,0 +1,124 @@
+import sys
+
+# 增量SSE解析：在一块可复用的bytearray上按字节切行，不解码成str，不反复切片拼接
+#   每个事件结束（空行）时产出data字段内容的memoryview，多行data在缓冲区内原地用"\n"拼接
+#   事件跨多次读取时从上次扫描的位置继续找换行，整体线性；多字节UTF-8字符不会被读取边界切断
+#   正文结束时调用finish：最后一个事件缺少结尾的空行（甚至最后一行没有换行）时也会产出
+
+IS_MICROPYTHON = sys.implementation.name == "micropython"
+DONE = b"[DONE]"
+
+if IS_MICROPYTHON:
+    from viper_kernels import find_byte
+else:
+    def find_byte(buf, start, end, value):
+        return buf.find(value, start, end)
+
+
+class SSEParser:
+    def __init__(self, size=16384):
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.reset()
+        # 统计
+        self.events = 0
+        self.grows = 0  # 单个事件超过缓冲区、扩容的次数
+        self.moved = 0  # 丢弃已处理事件时搬移的字节数
+
+    def reset(self):
+        """开始新的响应"""
+        self.start = 0  # 当前未完成事件的起点，之前的数据可丢弃
+        self.line = 0  # 下一行的起点
+        self.scan = 0  # 继续查找换行的位置
+        self.end = 0
+        self.data_start = -1  # 当前事件data内容的范围
+        self.data_end = -1
+        self.payload_start = 0  # 最近产出的payload在buf中的范围，供tts_event直接在缓冲区上查找
+        self.payload_end = 0
+        self.done = False
+
+    def feed(self, data):
+        """追加一段响应正文，逐个产出已完整的事件data（指向内部缓冲区，下一次feed前有效）
+        收到[DONE]后置done并停止产出"""
+        if self.done:
+            return
+        self._reserve(len(data))
+        self.mv[self.end:self.end + len(data)] = data
+        self.end += len(data)
+        buf = self.buf
+        while True:
+            lf = find_byte(buf, self.scan, self.end, 10)
+            if lf < 0:
+                self.scan = self.end
+                return
+            start = self.line
+            stop = lf - 1 if lf > start and buf[lf - 1] == 13 else lf
+            self.line = self.scan = lf + 1
+            if stop == start:
+                # 空行：事件结束
+                if self.data_start >= 0:
+                    payload = self.mv[self.data_start:self.data_end]
+                    self.payload_start, self.payload_end = self.data_start, self.data_end
+                    self.data_start = -1
+                    self.start = self.line
+                    if len(payload) == len(DONE) and bytes(payload) == DONE:
+                        self.done = True
+                        return
+                    self.events += 1
+                    yield payload
+                else:
+                    self.start = self.line
+            elif stop - start >= 5 and bytes(self.mv[start:start + 5]) == b"data:":
+                begin = start + 5
+                if begin < stop and buf[begin] == 32:
+                    begin += 1  # "data: xxx"冒号后的一个空格不属于内容
+                self._add_data(begin, stop)
+
+    def finish(self):
+        """响应正文结束：补上缺少的换行与空行，产出尚未结束的最后一个事件"""
+        return self.feed(b"\n\n")
+
+    def parse(self, parts):
+        """逐段feed响应正文并在结束时finish，收到[DONE]后不再读取parts"""
+        for data in parts:
+            yield from self.feed(data)
+            if self.done:
+                return
+        yield from self.finish()
+
+    def _add_data(self, start, stop):
+        if self.data_start < 0:
+            self.data_start, self.data_end = start, stop
+            return
+        # 多行data：原地接到上一行后面，中间补"\n"
+        self.buf[self.data_end] = 10
+        n = stop - start
+        self.mv[self.data_end + 1:self.data_end + 1 + n] = bytes(self.mv[start:stop])
+        self.data_end += 1 + n
+
+    def _reserve(self, n):
+        """保证缓冲区末尾有n字节空间：先丢弃已处理的事件，不够再扩容"""
+        if self.end + n <= len(self.buf):
+            return
+        shift = self.start
+        pending = self.end - shift
+        if pending + n > len(self.buf):
+            size = len(self.buf)
+            while pending + n > size:
+                size *= 2
+            buf = bytearray(size)
+            buf[:pending] = self.mv[shift:self.end]
+            self.buf = buf
+            self.mv = memoryview(buf)
+            self.grows += 1
+            self.moved += pending
+        elif pending:
+            self.mv[:pending] = bytes(self.mv[shift:self.end])
+            self.moved += pending
+        self.start = 0
+        self.line -= shift
+        self.scan -= shift
+        self.end = pending
+        if self.data_start >= 0:
+            self.data_start -= shift
+            self.data_end -= shift
@@ -1,5 +1,6 @@
 from machine import I2S, Pin
 import ubinascii
+import log
 
 Pin(21, Pin.OUT).value(1)
 i2s = I2S(
@@ -15,8 +16,8 @@ i2s = I2S(
 )
 
 def play_from_txt(txt_path):
-    print(f"读取TXT文件: {txt_path}")
-    print("开始播放音频...")
+    log.info("读取TXT文件: %s", txt_path)
+    log.info("开始播放音频...")
 
     with open(txt_path, 'r') as f:
         for line in f:
@@ -26,7 +27,7 @@ def play_from_txt(txt_path):
 
                 i2s.write(audio_bytes)
 
-    print("播放完成！")
+    log.info("播放完成！")
     i2s.write(b'\x00\x00' * 100)
 
 play_from_txt("row_data.txt")
@@ -0,0 +1,140 @@
+import json
+import sys
+
+from jitter_buffer import ticks_ms, ticks_diff
+
+# 轻量的分段计时：每轮对话一条记录，各节点记录相对本轮起点（说话结束）的毫秒数
+#   记录在启动时一次性分配，组成环形缓冲区，只保留最近turns轮；打点只是往预分配的列表里写一个小整数
+#   同一节点每轮只记第一次（TTS每个事件都打点，只有首个音频事件生效），没打到的节点为None
+#   关闭时begin不启用记录，mark第一句就返回，热路径上只剩一次方法调用
+#   每轮结束后export把新记录以JSON行写出：写进flash上的文件，或打到串口由电脑端收集
+#     python tracer.py trace.jsonl  # 电脑端汇总各节点的p50/p95（串口日志里的[Trace]行也能直接读）
+
+# 一轮对话的节点，chatbot.py按这个顺序打点
+WAV = 0  # WAV封装完成（整段上传时）
+ASR_SENT = 1  # ASR请求发完
+ASR_DONE = 2  # 拿到识别结果
+LLM_FIRST = 3  # 大模型首个片段（非流式时为响应头）
+LLM_LAST = 4  # 大模型回复接收完
+TTS_FIRST = 5  # 第一个TTS音频事件
+I2S_FIRST = 6  # 第一段回复音频交给I2S（抖动缓冲起播）
+PLAY_END = 7  # 回复全部交给I2S（由接收结束时缓冲区的剩余量推算）
+TURN_SPANS = ("wav", "asr_sent", "asr_done", "llm_first", "llm_last", "tts_first", "i2s_first", "play_end")
+
+
+class Tracer:
+    def __init__(self, spans=TURN_SPANS, turns=16, enabled=True):
+        self.spans = spans
+        self.enabled = enabled
+        self.records = [[None] * len(spans) for _ in range(turns)]
+        self.starts = [0] * turns  # 每条记录起点的ticks_ms
+        self.turns = 0  # 累计开始的轮数，turns % len(records)为下一条记录的位置
+        self.exported = 0  # 已导出的轮数
+        self.current = None  # 正在记录的一轮，None时mark直接返回
+        self.start = 0
+
+    def begin(self, since=None):
+        """一轮开始，since为起点的ticks_ms，默认为现在"""
+        if not self.enabled:
+            return
+        index = self.turns % len(self.records)
+        record = self.records[index]
+        for i in range(len(record)):
+            record[i] = None
+        self.start = ticks_ms() if since is None else since
+        self.starts[index] = self.start
+        self.current = record
+        self.turns += 1
+
+    def mark(self, span, at=None):
+        """记录节点span，at为发生时刻的ticks_ms，默认为现在；已记录过的节点不再覆盖"""
+        record = self.current
+        if record is None or record[span] is not None:
+            return
+        record[span] = ticks_diff(ticks_ms() if at is None else at, self.start)
+
+    def set(self, span, ms):
+        """直接填入相对起点的毫秒数（如抖动缓冲统计的首音时间），负数表示没有发生"""
+        if self.current is not None and ms >= 0:
+            self.current[span] = ms
+
+    def end(self):
+        self.current = None
+
+    def recent(self):
+        """按时间顺序返回环形缓冲区中的(轮次, 起点, 记录)"""
+        size = len(self.records)
+        for turn in range(max(0, self.turns - size), self.turns):
+            yield turn + 1, self.starts[turn % size], self.records[turn % size]
+
+    def last(self):
+        """最近一轮的记录，还没有记录时为None"""
+        return self.records[(self.turns - 1) % len(self.records)] if self.turns else None
+
+    def to_dict(self, turn, start, record):
+        item = {"turn": turn, "t": start}
+        for name, value in zip(self.spans, record):
+            if value is not None:
+                item[name] = value
+        return item
+
+    def export(self, stream, prefix=""):
+        """把尚未导出的已结束轮次逐行写成JSON，stream只需要write方法"""
+        last = self.turns - (self.current is not None)
+        count = 0
+        for turn, start, record in self.recent():
+            if self.exported < turn <= last:
+                stream.write(prefix + json.dumps(self.to_dict(turn, start, record)) + "\n")
+                count += 1
+        self.exported = last
+        return count
+
+    def export_file(self, path):
+        """追加到flash上的文件，每次打开关闭，掉电最多丢最后一轮"""
+        with open(path, "a") as f:
+            return self.export(f)
+
+    def summary(self, record=None):
+        """一条记录的单行摘要，默认为最近一轮"""
+        record = record or self.last()
+        if record is None:
+            return ""
+        return ", ".join(f"{name}={value}ms" for name, value in zip(self.spans, record) if value is not None)
+
+
+# ===================== 电脑端汇总 =====================
+def percentile(values, p):
+    """最近秩法"""
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * p // 100) - 1)]
+
+
+def load(lines):
+    """读JSON行，串口日志中的其他输出跳过，带前缀的行取第一个{之后的部分"""
+    items = []
+    for line in lines:
+        start = line.find("{")
+        if start >= 0 and '"turn"' in line:
+            items.append(json.loads(line[start:]))
+    return items
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python tracer.py trace.jsonl [更多文件]")
+        return
+    items = []
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            items.extend(load(f))
+    print(f"共{len(items)}轮")
+    names = [name for name in TURN_SPANS if any(name in item for item in items)]
+    names += sorted({key for item in items for key in item} - set(names) - {"turn", "t"})
+    print(f"{'节点（从起点起）':<16s}{'轮数':>6s}{'p50':>8s}{'p95':>8s}{'最大':>8s}")
+    for name in names:
+        values = [item[name] for item in items if name in item]
+        print(f"{name:<16s}{len(values):>6d}{percentile(values, 50):>6d}ms{percentile(values, 95):>6d}ms{max(values):>6d}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import sys
+
+# TTS事件快速提取：直接在原始事件字节上定位output.audio.data的base64范围和finish_reason，
+# 不对整条事件做json.loads（base64占事件的绝大部分，转成str会在堆上再复制一份）
+# 事件形状不符合预期时返回None，调用方回退到完整JSON解析
+
+IS_MICROPYTHON = sys.implementation.name == "micropython"
+
+if IS_MICROPYTHON:
+    from viper_kernels import find_byte, find_seq
+else:
+    def find_byte(buf, start, end, value):
+        return buf.find(value, start, end)
+
+    def find_seq(buf, start, end, pat):
+        return buf.find(pat, start, end)
+
+OUTPUT_KEY = b'"output":'
+AUDIO_KEY = b'"audio":'
+DATA_KEY = b'"data":'
+FINISH_KEY = b'"finish_reason":'
+STOP = b'"stop"'
+
+
+def _value(buf, key, start, end):
+    """key之后第一个非空白字符的位置，没有key返回-1"""
+    pos = find_seq(buf, start, end, key)
+    if pos < 0:
+        return -1
+    pos += len(key)
+    while pos < end and buf[pos] == 32:
+        pos += 1
+    return pos
+
+
+def _is_stop(buf, start, end):
+    pos = _value(buf, FINISH_KEY, start, end)
+    return 0 <= pos <= end - len(STOP) and find_seq(buf, pos, pos + len(STOP), STOP) == pos
+
+
+def parse_event(buf, start, end):
+    """解析buf[start:end]中的一条TTS事件，返回(base64起点, base64终点, 是否结束)，没有音频时起止相同
+    不是预期形状（没有output、data不是普通字符串、含转义字符）时返回None"""
+    if find_seq(buf, start, end, OUTPUT_KEY) < 0:
+        return None
+    audio = _value(buf, AUDIO_KEY, start, end)
+    if audio < 0 or audio >= end or buf[audio] != 123:  # 123: '{'，没有音频对象（或为null）
+        return start, start, _is_stop(buf, start, end)
+    data = _value(buf, DATA_KEY, audio, end)
+    if data < 0 or data >= end or buf[data] != 34:  # 34: '"'
+        return None
+    data += 1
+    data_end = find_byte(buf, data, end, 34)
+    if data_end < 0 or find_byte(buf, data, data_end, 92) >= 0:  # 92: '\\'，有转义交给json处理
+        return None
+    # finish_reason在base64前后都可能出现，跳过base64本身查找
+    finished = _is_stop(buf, start, data) or _is_stop(buf, data_end, end)
+    return data, data_end, finished
@@ -0,0 +1,98 @@
+# 自适应VAD状态机：持续跟踪底噪，起始/结束使用不同阈值（迟滞）
+#   空闲时底噪随每帧能量缓慢上升、快速下降，环境变吵几秒后阈值自动跟上
+#   录音中不更新底噪，避免说话声把底噪抬高
+
+VAD_START = 1  # 确认开始说话
+VAD_END = 2  # 确认说话结束
+VAD_FULL = 3  # 录音缓冲区已满，强制结束
+
+SILENT = 0
+SPEAKING = 1
+
+
+class AdaptiveVAD:
+    def __init__(self, noise_floor, voice_frames=10, silence_frames=10, onset_ratio=1.5, release_ratio=1.2,
+                 rise=0.02, fall=0.1, min_floor=50):
+        self.floor = max(noise_floor, min_floor)
+        self.voice_frames = voice_frames  # 连续多少帧超过起始阈值才算开始
+        self.silence_frames = silence_frames  # 连续多少帧低于结束阈值才算结束
+        self.onset_ratio = onset_ratio
+        self.release_ratio = release_ratio
+        self.rise = rise
+        self.fall = fall
+        self.min_floor = min_floor
+        # 统计
+        self.segments = 0  # 确认的语音段数
+        self.false_starts = 0  # 超过起始阈值但未持续到voice_frames就回落的次数
+        self.reset()
+
+    def reset(self):
+        """回到空闲状态，保留底噪与统计"""
+        self.state = SILENT
+        self.voice_count = 0
+        self.silence_count = 0
+        self.voiced = False
+        self.threshold = self.floor * self.onset_ratio
+
+    def update(self, rms):
+        """输入一帧能量，返回VAD_START/VAD_END或None"""
+        if self.state == SILENT:
+            self.threshold = self.floor * self.onset_ratio
+            self.voiced = rms > self.threshold
+            self._track(rms)
+            if not self.voiced:
+                if self.voice_count:
+                    self.false_starts += 1
+                self.voice_count = 0
+                return None
+            self.voice_count += 1
+            if self.voice_count < self.voice_frames:
+                return None
+            self.state = SPEAKING
+            self.voice_count = 0
+            self.silence_count = 0
+            self.segments += 1
+            return VAD_START
+
+        self.threshold = self.floor * self.release_ratio
+        self.voiced = rms > self.threshold
+        if self.voiced:
+            self.silence_count = 0
+            return None
+        self.silence_count += 1
+        if self.silence_count < self.silence_frames:
+            return None
+        self.state = SILENT
+        self.silence_count = 0
+        return VAD_END
+
+    def _track(self, rms):
+        rate = self.rise if rms > self.floor else self.fall
+        self.floor += (rms - self.floor) * rate
+        if self.floor < self.min_floor:
+            self.floor = self.min_floor
+
+    def stats(self):
+        return f"底噪={self.floor:.2f}, 语音段={self.segments}, 误触发={self.false_starts}"
+
+
+def vad_frames(source, capture, vad, energy):
+    """把任意带readinto的音频源（I2S麦克风、PyAudio、录音文件）接到VAD和录音缓冲区上
+    逐chunk产出 (chunk, 能量, 事件)；一段结束后继续迭代即开始下一段，音源读完时结束"""
+    capture.reset()
+    vad.reset()
+    while True:
+        chunk = capture.slot()
+        if not source.readinto(chunk):
+            return
+        rms = energy(chunk)
+        event = vad.update(rms)
+        has_room = capture.advance()
+        if event == VAD_START:
+            capture.start_recording()
+        elif capture.recording and not has_room and event != VAD_END:
+            vad.reset()
+            event = VAD_FULL
+        yield chunk, rms, event
+        if event == VAD_END or event == VAD_FULL:
+            capture.reset()
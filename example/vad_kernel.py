@@ -0,0 +1,121 @@
+import sys
+import array
+
+# VAD能量计算内核：设备上用viper/array，PC上用numpy，接口一致
+#   rms_i32(chunk)    INMP441 32位样本，取高16位计算RMS
+#   energy_i16(chunk) 16位PCM样本的均方能量
+
+IS_MICROPYTHON = sys.implementation.name == "micropython"
+
+
+def _as_array(chunk, typecode):
+    """把字节缓冲区按原始字节解释为整数数组"""
+    if IS_MICROPYTHON:
+        return array.array(typecode, chunk)  # MicroPython按原始字节初始化
+    samples = array.array(typecode)
+    samples.frombytes(chunk)
+    return samples
+
+
+# ===================== array后端（纯Python，任何环境可用） =====================
+def _rms_i32_array(chunk):
+    samples = _as_array(chunk, 'i')
+    if not samples:
+        return 0.0
+    acc = 0
+    for s in samples:
+        s >>= 16
+        acc += s * s
+    return (acc / len(samples)) ** 0.5
+
+
+def _energy_i16_array(chunk):
+    samples = _as_array(chunk, 'h')
+    if not samples:
+        return 0.0
+    acc = 0
+    for s in samples:
+        acc += s * s
+    return acc / len(samples)
+
+
+# ===================== viper后端（MicroPython原生代码） =====================
+_low = array.array('i', [0])  # viper内核写回每块平方和的低8位部分
+
+
+def _sum_blocks(kernel, chunk, count, block=0):
+    """按块调用内核，合并高低两部分，得到与array后端完全相同的整数平方和"""
+    if not block:
+        from viper_kernels import SUM_SQ_BLOCK as block
+    acc = 0
+    low = 0
+    start = 0
+    while start < count:
+        n = min(block, count - start)
+        acc += kernel(chunk, start, n, _low)
+        low += _low[0]
+        start += n
+    return (acc << 8) + low
+
+
+def _rms_i32_viper(chunk):
+    from viper_kernels import sum_sq_hi16
+    count = len(chunk) // 4
+    if not count:
+        return 0.0
+    return (_sum_blocks(sum_sq_hi16, chunk, count) / count) ** 0.5
+
+
+def _energy_i16_viper(chunk):
+    from viper_kernels import sum_sq_i16
+    count = len(chunk) // 2
+    if not count:
+        return 0.0
+    return _sum_blocks(sum_sq_i16, chunk, count) / count
+
+
+# ===================== numpy后端（CPython） =====================
+def _rms_i32_numpy(chunk):
+    import numpy as np
+    samples = (np.frombuffer(chunk, dtype='<i4') >> 16).astype(np.float64)
+    if not samples.size:
+        return 0.0
+    return float(np.sqrt(np.dot(samples, samples) / samples.size))
+
+
+def _energy_i16_numpy(chunk):
+    import numpy as np
+    samples = np.frombuffer(chunk, dtype='<i2').astype(np.float64)
+    if not samples.size:
+        return 0.0
+    return float(np.dot(samples, samples) / samples.size)
+
+
+BACKENDS = {
+    "array": (_rms_i32_array, _energy_i16_array),
+    "viper": (_rms_i32_viper, _energy_i16_viper),
+    "numpy": (_rms_i32_numpy, _energy_i16_numpy),
+}
+
+
+def available_backends():
+    """当前环境可用的后端，按优先级排序"""
+    if IS_MICROPYTHON:
+        return ["viper", "array"]
+    import importlib.util
+    if importlib.util.find_spec("numpy"):
+        return ["numpy", "array"]
+    return ["array"]
+
+
+def use_backend(name):
+    """切换能量计算后端"""
+    global BACKEND, rms_i32, energy_i16
+    rms_i32, energy_i16 = BACKENDS[name]
+    BACKEND = name
+
+
+BACKEND = None
+rms_i32 = None
+energy_i16 = None
+use_backend(available_backends()[0])
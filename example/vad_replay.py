@@ -0,0 +1,159 @@
+import argparse
+import io
+import math
+import random
+import struct
+import time
+
+import vad_kernel
+from capture_buffer import CaptureBuffer
+from vad import AdaptiveVAD, VAD_START, VAD_END, VAD_FULL, vad_frames
+
+# 离线VAD回放：用录音文件驱动与设备相同的VAD状态机，不按实时节奏，尽可能快地跑完
+#   python vad_replay.py rec.wav [--labels rec.txt]
+#   python vad_replay.py --synth        # 生成带标注的合成录音
+# 标注文件每行 "开始秒 结束秒"
+
+
+class PCMFileSource:
+    """WAV或裸PCM文件音源，readinto接口与I2S一致，读完返回0"""
+
+    def __init__(self, f, bits=32, sample_rate=16000):
+        self.f = f
+        self.bits = bits
+        self.sample_rate = sample_rate
+        if f.read(4) == b"RIFF":
+            self._parse_wav()
+        else:
+            f.seek(0)
+
+    def _parse_wav(self):
+        self.f.read(8)  # RIFF大小 + "WAVE"
+        while True:
+            chunk_id = self.f.read(4)
+            size = int.from_bytes(self.f.read(4), 'little')
+            if chunk_id == b"data":
+                return
+            body = self.f.read(size + (size & 1))
+            if chunk_id == b"fmt ":
+                channels, self.sample_rate = struct.unpack('<HI', body[2:8])
+                self.bits = int.from_bytes(body[14:16], 'little')
+                if channels != 1 or self.bits not in (16, 32):
+                    raise ValueError(f"只支持16/32位单声道，文件为{channels}声道{self.bits}位")
+
+    def readinto(self, buf):
+        n = self.f.readinto(buf)
+        if n and n < len(buf):
+            buf[n:] = bytes(len(buf) - n)
+        return n
+
+
+def synth_recording(seconds=20, sample_rate=16000, seed=0):
+    """合成32位录音：底噪 + 若干段调幅正弦语音，中途底噪抬高一次，返回(音源文件, 标注)"""
+    rng = random.Random(seed)
+    labels = []
+    t = 2.5
+    while t < seconds - 2:
+        length = rng.uniform(0.6, 2.5)
+        labels.append((t, t + length))
+        t += length + rng.uniform(1.0, 3.0)
+    samples = []
+    for i in range(int(seconds * sample_rate)):
+        now = i / sample_rate
+        noise = 150 if now < seconds / 2 else 400
+        value = rng.gauss(0, noise)
+        for start, end in labels:
+            if start <= now < end:
+                value += 6000 * math.sin(2 * math.pi * 220 * now) * (0.7 + 0.3 * math.sin(2 * math.pi * 3 * now))
+        samples.append(max(-32768, min(32767, int(value))) << 16)
+    return io.BytesIO(struct.pack(f'<{len(samples)}i', *samples)), labels
+
+
+def load_labels(path):
+    with open(path) as f:
+        return [tuple(float(x) for x in line.split()[:2]) for line in f if line.strip()]
+
+
+def replay(source, args):
+    chunk_size = source.sample_rate * args.chunk_ms // 1000 * source.bits // 8
+    if source.bits == 32:
+        energy = vad_kernel.rms_i32
+    else:
+        energy = lambda chunk: vad_kernel.energy_i16(chunk) ** 0.5  # 16位文件与设备RMS口径一致
+
+    # 与设备一致：先用开头几秒标定底噪
+    calib = bytearray(chunk_size)
+    calib_chunks = int(args.calibrate_seconds * 1000 / args.chunk_ms)
+    floor = sum(energy(calib) for _ in range(calib_chunks) if source.readinto(calib)) / max(calib_chunks, 1)
+
+    vad = AdaptiveVAD(floor, args.voice_frames, args.silence_frames, args.onset_ratio, args.release_ratio)
+    capture = CaptureBuffer(chunk_size, args.pre_roll, args.max_seconds * 1000 // args.chunk_ms)
+    segments = []
+    index = calib_chunks - 1
+    last_voiced = 0
+    start = time.perf_counter()
+    for chunk, rms, event in vad_frames(source, capture, vad, energy):
+        index += 1
+        if event == VAD_START:
+            onset_at = index
+            first_voiced = index - args.voice_frames + 1
+        elif vad.state and vad.voiced:
+            last_voiced = index
+        if event == VAD_END or event == VAD_FULL:
+            begin = index + 1 - len(capture.data()) // chunk_size
+            segments.append((first_voiced, onset_at, last_voiced, index, begin, event == VAD_FULL))
+    elapsed = time.perf_counter() - start
+    return segments, index + 1 - calib_chunks, elapsed, vad
+
+
+def report(segments, chunks, elapsed, vad, labels, chunk_ms):
+    ms = lambda n: n * chunk_ms
+    print(f"{'#':>3} {'录音段(秒)':>17} {'起始延迟':>8} {'结束延迟':>8} {'标注起点差':>10} {'标注终点差':>10}")
+    for i, (first, onset, last, end, begin, full) in enumerate(segments):
+        line = (f"{i + 1:>3} {ms(begin) / 1000:8.2f}-{ms(end + 1) / 1000:<8.2f} "
+                f"{ms(onset - first + 1):6.0f}ms {ms(end - last):6.0f}ms")
+        match = [lab for lab in labels if lab[0] * 1000 < ms(end + 1) and lab[1] * 1000 > ms(first)]
+        if match:
+            line += f" {ms(onset + 1) - match[0][0] * 1000:8.0f}ms {ms(end + 1) - match[-1][1] * 1000:8.0f}ms"
+        print(line + (" [达到最长录音]" if full else ""))
+    if labels:
+        hit = sum(1 for lab in labels if any(ms(s[0]) < lab[1] * 1000 and ms(s[3] + 1) > lab[0] * 1000 for s in segments))
+        print(f"标注语音段: {len(labels)}, 命中: {hit}, 漏检: {len(labels) - hit}")
+    print(f"VAD统计: {vad.stats()}")
+    print(f"处理 {chunks} 个chunk，耗时 {elapsed * 1000:.1f}ms，{chunks / elapsed:.0f} chunk/s，"
+          f"{ms(chunks) / 1000 / elapsed:.0f}倍实时 (后端: {vad_kernel.BACKEND})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线VAD回放")
+    parser.add_argument("path", nargs="?", help="WAV或裸PCM文件")
+    parser.add_argument("--synth", action="store_true", help="使用合成录音")
+    parser.add_argument("--labels", help="标注文件")
+    parser.add_argument("--bits", type=int, default=32, help="裸PCM的采样位数")
+    parser.add_argument("--rate", type=int, default=16000, help="裸PCM的采样率")
+    parser.add_argument("--chunk-ms", type=int, default=50)
+    parser.add_argument("--calibrate-seconds", type=float, default=2)
+    parser.add_argument("--voice-frames", type=int, default=10)
+    parser.add_argument("--silence-frames", type=int, default=10)
+    parser.add_argument("--onset-ratio", type=float, default=1.5)
+    parser.add_argument("--release-ratio", type=float, default=1.2)
+    parser.add_argument("--pre-roll", type=int, default=10)
+    parser.add_argument("--max-seconds", type=int, default=5)
+    parser.add_argument("--backend", choices=vad_kernel.available_backends())
+    args = parser.parse_args()
+
+    if args.backend:
+        vad_kernel.use_backend(args.backend)
+    if args.synth:
+        f, labels = synth_recording()
+    else:
+        f, labels = open(args.path, "rb"), []
+    if args.labels:
+        labels = load_labels(args.labels)
+
+    source = PCMFileSource(f, args.bits, args.rate)
+    report(*replay(source, args), labels, args.chunk_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import micropython
+
+# MicroPython viper热点内核，仅在设备上导入（CPython无法编译viper代码）
+# 32位平台上viper的int是机器字，调用方负责按块调用避免溢出
+
+SUM_SQ_BLOCK = 256  # 每次最多处理的样本数：256 * 2^22 < 2^31
+
+# 平方和按2^8拆成高低两部分分别累加，返回高位部分之和，低8位部分之和写进low[0]（array('i')）
+#   调用方按(高 << 8) + 低合并，结果与逐项整数平方和完全一致，安静时的小样本也不会被舍掉
+
+
+@micropython.viper
+def sum_sq_hi16(buf, start: int, count: int, low) -> int:
+    """32位样本取高16位后的平方和"""
+    p = ptr32(buf)
+    acc = 0
+    rem = 0
+    i = start
+    end = start + count
+    while i < end:
+        s = int(p[i]) >> 16
+        sq = s * s
+        acc += sq >> 8
+        rem += sq & 0xFF
+        i += 1
+    out = ptr32(low)
+    out[0] = rem
+    return acc
+
+
+@micropython.viper
+def sum_sq_i16(buf, start: int, count: int, low) -> int:
+    """16位样本的平方和"""
+    p = ptr16(buf)
+    acc = 0
+    rem = 0
+    i = start
+    end = start + count
+    while i < end:
+        s = int(p[i])
+        if s > 32767:
+            s -= 65536
+        sq = s * s
+        acc += sq >> 8
+        rem += sq & 0xFF
+        i += 1
+    out = ptr32(low)
+    out[0] = rem
+    return acc
+
+
+@micropython.viper
+def pcm32_to_pcm16(buf, count: int, shift: int):
+    """原地把count个32位样本右移shift位并饱和为16位，写回缓冲区前半段"""
+    src = ptr32(buf)
+    dst = ptr16(buf)
+    i = 0
+    while i < count:
+        s = int(src[i]) >> shift
+        if s > 32767:
+            s = 32767
+        elif s < -32768:
+            s = -32768
+        dst[i] = s
+        i += 1
+
+
+@micropython.viper
+def find_byte(buf, start: int, end: int, value: int) -> int:
+    """在buf[start:end]中查找字节value，返回位置，没有返回-1（MicroPython的bytearray没有find）"""
+    p = ptr8(buf)
+    i = start
+    while i < end:
+        if p[i] == value:
+            return i
+        i += 1
+    return -1
+
+
+@micropython.viper
+def find_seq(buf, start: int, end: int, pat) -> int:
+    """在buf[start:end]中查找字节串pat，返回位置，没有返回-1"""
+    p = ptr8(buf)
+    q = ptr8(pat)
+    n = int(len(pat))
+    last = end - n
+    first = q[0]
+    i = start
+    while i <= last:
+        if p[i] == first:
+            j = 1
+            while j < n and p[i + j] == q[j]:
+                j += 1
+            if j == n:
+                return i
+        i += 1
+    return -1
+
+
+@micropython.viper
+def b64_decode(src, start: int, end: int, dst) -> int:
+    """把src[start:end]中的base64解码写入dst，遇到'='或其他字符结束，返回写入的字节数（不分配内存）"""
+    s = ptr8(src)
+    d = ptr8(dst)
+    acc = 0
+    bits = 0
+    o = 0
+    i = start
+    while i < end:
+        c = s[i]
+        if c >= 65 and c <= 90:  # A-Z
+            v = c - 65
+        elif c >= 97 and c <= 122:  # a-z
+            v = c - 71
+        elif c >= 48 and c <= 57:  # 0-9
+            v = c + 4
+        elif c == 43:  # +
+            v = 62
+        elif c == 47:  # /
+            v = 63
+        else:
+            break
+        acc = ((acc << 6) | v) & 0xFFFFFF
+        bits += 6
+        if bits >= 8:
+            bits -= 8
+            d[o] = acc >> bits
+            o += 1
+        i += 1
+    return o
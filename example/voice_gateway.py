@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import binascii
+import json
+
+import chatbot_async
+from chatbot_async import VoicePipeline, AsyncPool, API_HOST, PREWARM_CONNECTIONS
+from gateway_proto import HELLO, AUDIO, END, TEXT, PCM, DONE, header, parse_header
+from jitter_buffer import ticks_ms, ticks_diff
+
+# 局域网语音网关（PC端运行）：TLS、base64、JSON都留在这里，ESP32只收发原始音频
+#   设备经明文TCP推送录音chunk（gateway_client.py），网关边收边流式上传ASR，
+#   再用chatbot_async的流水线完成流式对话、分句合成，把解码好的24kHz PCM直接发回设备
+#   多个设备同时连接，每个连接一个会话，共用一个DashScope长连接池
+#   每轮打印该设备的 说话结束到识别结果 / 首个PCM帧 / 回复发完 的耗时，断开时打印汇总
+#     python voice_gateway.py --port 9000
+#     python voice_gateway.py --mock  # 用mock_dashscope替身代替云端
+
+POOL_SIZE = 8  # 所有设备共用的长连接数上限
+
+
+class GatewaySession(VoicePipeline):
+    """一个设备的会话：录音来自设备的AUDIO帧，合成的音频以PCM帧发回设备"""
+
+    def __init__(self, reader, writer, pool, host):
+        super().__init__(None, None, pool, host)
+        self.reader = reader
+        self.writer = writer
+        self.device = writer.get_extra_info("peername")[0]
+        self.speech_end = 0
+        self.first_pcm = -1
+        self.latency = []  # 每轮(识别, 首个PCM帧, 发完)毫秒数
+
+    async def read_frame(self):
+        """返回(类型, 负载)，设备断开返回(None, None)"""
+        kind = await self.reader.read(1)
+        if not kind:
+            return None, None
+        _, length = parse_header(kind + await self.reader.readexactly(4))
+        return kind[0], await self.reader.readexactly(length) if length else b""
+
+    def send(self, kind, payload=b""):
+        self.writer.write(header(kind, len(payload)))
+        if payload:
+            self.writer.write(payload)
+
+    async def listen(self):
+        """收一句话：第一个AUDIO帧即开始流式上传ASR，END帧为说话结束；设备断开返回(None, None)
+        说话中途断开时取消上传任务，recognize关闭手上的连接，不会带着半个请求回到连接池"""
+        capture = self.capture
+        asr = None
+        try:
+            while True:
+                kind, payload = await self.read_frame()
+                if kind is None:
+                    return None, None
+                if kind == HELLO:
+                    self.device = payload.decode()
+                    print(f"[Gateway] 设备上线: {self.device}")
+                elif kind == AUDIO:
+                    if asr is None:
+                        capture.reset()
+                        capture.start_recording()
+                        self.ended = False
+                        self.pool.prewarm(PREWARM_CONNECTIONS)
+                        asr = asyncio.create_task(self.recognize())
+                    if capture.head < capture.slots:
+                        capture.slot()[:] = payload
+                        capture.advance()
+                        self.captured.set()
+                elif kind == END:
+                    break
+            self.speech_end = ticks_ms()
+            if asr is None:
+                return self.speech_end, ""
+            self.ended = True
+            self.captured.set()
+            return self.speech_end, await asr
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            print(f"[Gateway] 设备连接中断: {self.device}, {e!r}")
+            return None, None
+        finally:
+            if asr is not None and not asr.done():
+                asr.cancel()
+                try:
+                    await asr
+                except asyncio.CancelledError:
+                    pass
+
+    async def put_audio(self, src, start, end):
+        """TTS事件的base64在网关解码，PCM帧直接发给设备，drain等设备读走（设备缓冲区满时形成背压）"""
+        if self.first_pcm < 0:
+            self.first_pcm = ticks_diff(ticks_ms(), self.speech_end)
+        self.send(PCM, binascii.a2b_base64(src[start:end]))
+        await self.writer.drain()
+
+    async def run(self):
+        try:
+            while True:
+                speech_end, text = await self.listen()
+                if speech_end is None:
+                    break
+                asr_ms = ticks_diff(ticks_ms(), speech_end)
+                self.first_pcm = -1
+                self.send(TEXT, json.dumps({"asr": text}).encode('utf-8'))
+                if text:
+                    reply = await self.reply(text)
+                    self.send(TEXT, json.dumps({"reply": reply}).encode('utf-8'))
+                self.send(DONE)
+                await self.writer.drain()
+                self.latency.append((asr_ms, self.first_pcm, ticks_diff(ticks_ms(), speech_end)))
+                print(f"[Gateway] {self.device}: 识别={asr_ms}ms, 首个PCM={self.first_pcm}ms, 发完={self.latency[-1][2]}ms")
+        except ConnectionError as e:  # 回复发到一半设备断开
+            print(f"[Gateway] 设备连接中断: {self.device}, {e!r}")
+        finally:
+            self.writer.close()
+        print(f"[Gateway] 设备断开: {self.device}, {self.stats()}")
+
+    def stats(self):
+        if not self.latency:
+            return "0轮"
+        turns = len(self.latency)
+        avg = [sum(item[i] for item in self.latency) // turns for i in range(3)]
+        return f"{turns}轮, 平均识别={avg[0]}ms, 平均首个PCM={avg[1]}ms, 平均发完={avg[2]}ms"
+
+
+async def serve(port, pool, host):
+    async def handle(reader, writer):
+        await GatewaySession(reader, writer, pool, host).run()
+        print(f"[Pool] {pool.stats()}")
+
+    server = await asyncio.start_server(handle, "0.0.0.0", port)
+    print(f"[Gateway] 监听端口 {port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="局域网语音网关")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--api-key", default=chatbot_async.API_KEY)
+    parser.add_argument("--mock", action="store_true", help="使用本地mock_dashscope替身")
+    args = parser.parse_args()
+
+    chatbot_async.API_KEY = args.api_key
+    if args.mock:
+        from mock_dashscope import start_server
+        _, mock_port = start_server()
+        pool, host = AsyncPool("127.0.0.1", mock_port, tls=False, size=POOL_SIZE), "127.0.0.1"
+    else:
+        pool, host = AsyncPool(API_HOST, size=POOL_SIZE), API_HOST
+    asyncio.run(serve(args.port, pool, host))
+
+
+if __name__ == "__main__":
+    main()
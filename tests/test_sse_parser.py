@@ -0,0 +1,62 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "example"))
+
+from sse_parser import SSEParser  # noqa: E402
+
+# PC端运行：python -m pytest tests
+
+
+def parse(chunks, size=16384):
+    parser = SSEParser(size)
+    return [bytes(payload) for payload in parser.parse(chunks)]
+
+
+def split_everywhere(body):
+    """同一段正文在每个位置切成两块，验证事件跨读取边界"""
+    for i in range(len(body) + 1):
+        yield [body[:i], body[i:]]
+
+
+def test_events():
+    assert parse([b"data: a\n\ndata: b\n\n"]) == [b"a", b"b"]
+
+
+def test_last_event_without_blank_line():
+    assert parse([b"data: a\n\ndata: b\n"]) == [b"a", b"b"]
+
+
+def test_last_line_without_newline():
+    assert parse([b"data: a\n\ndata: b"]) == [b"a", b"b"]
+
+
+def test_crlf_and_multiline_data():
+    body = b"event: result\r\ndata: a\r\ndata: b\r\n\r\ndata: c\r\ndata:d"
+    for chunks in split_everywhere(body):
+        assert parse(chunks) == [b"a\nb", b"c\nd"]
+
+
+def test_done_stops_parsing():
+    assert parse([b"data: a\n\ndata: [DONE]\n\ndata: b\n\n"]) == [b"a"]
+    assert parse([b"data: a\n\ndata: [DONE]"]) == [b"a"]
+
+
+def test_comments_and_empty_body():
+    assert parse([b": keep-alive\n\n", b": tail"]) == []
+    assert parse([]) == []
+
+
+def test_event_larger_than_buffer():
+    data = b"x" * 100
+    for chunks in split_everywhere(b"data: " + data + b"\n\ndata: " + data):
+        assert parse(chunks, size=16) == [data, data]
+
+
+def test_finish_once_per_response():
+    parser = SSEParser()
+    assert [bytes(p) for p in parser.feed(b"data: a\n\ndata: b")] == [b"a"]
+    assert [bytes(p) for p in parser.finish()] == [b"b"]
+    parser.reset()
+    assert [bytes(p) for p in parser.feed(b"data: c\n")] == []
+    assert [bytes(p) for p in parser.finish()] == [b"c"]